@@ -0,0 +1,88 @@
+import argparse
+import time
+
+import numpy as np
+
+from utils.minhash import LshIndex, band_buckets, minhash_signature
+
+parser = argparse.ArgumentParser(
+    description="Benchmark near-duplicate detection on a synthetic corpus: random "
+    "abstracts, some of them lightly edited copies of earlier ones."
+)
+parser.add_argument("--articles", type=int, default=100_000, help="corpus size")
+parser.add_argument(
+    "--duplicate-rate",
+    type=float,
+    default=0.05,
+    help="fraction of articles which copy an earlier one (default: 0.05)",
+)
+parser.add_argument(
+    "--edit-rate",
+    type=float,
+    default=0.02,
+    help="fraction of the words of a copy replaced at random (default: 0.02)",
+)
+parser.add_argument("--words", type=int, default=150, help="words per abstract")
+parser.add_argument("--vocabulary", type=int, default=20_000, help="distinct words")
+parser.add_argument("--threshold", type=float, default=0.8, help="match threshold")
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
+
+rng = np.random.default_rng(args.seed)
+vocabulary = np.array([f"w{i}" for i in range(args.vocabulary)])
+# Zipf-like word frequencies, as in natural text
+weights = 1 / np.arange(1, args.vocabulary + 1)
+weights /= weights.sum()
+
+corpus = []
+# index in corpus of the article each planted duplicate copies
+planted = {}
+for i in range(args.articles):
+    if corpus and rng.random() < args.duplicate_rate:
+        source = int(rng.integers(len(corpus)))
+        words = corpus[source].copy()
+        edited = rng.random(len(words)) < args.edit_rate
+        words[edited] = rng.choice(vocabulary, edited.sum(), p=weights)
+        planted[i] = source
+    else:
+        words = rng.choice(vocabulary, args.words, p=weights)
+    corpus.append(words)
+abstracts = [" ".join(words) for words in corpus]
+
+started_at = time.perf_counter()
+signatures = [minhash_signature(abstract) for abstract in abstracts]
+signing_seconds = time.perf_counter() - started_at
+
+started_at = time.perf_counter()
+index = LshIndex()
+found = {}
+for i, signature in enumerate(signatures):
+    buckets = band_buckets(signature)
+    match = index.best_match(signature, buckets, args.threshold)
+    if match is not None:
+        found[i] = match[0]
+    index.add(i, signature, buckets)
+matching_seconds = time.perf_counter() - started_at
+
+
+def same_cluster(i: int, j: int) -> bool:
+    # follows planted copies back to the original article
+    while i in planted:
+        i = planted[i]
+    while j in planted:
+        j = planted[j]
+    return i == j
+
+
+true_positives = sum(same_cluster(i, j) for i, j in found.items())
+print(f"articles:        {args.articles} ({len(planted)} planted duplicates)")
+print(
+    f"signatures:      {args.articles / signing_seconds:,.0f} articles/s "
+    f"({signing_seconds:.1f}s)"
+)
+print(
+    f"LSH matching:    {args.articles / matching_seconds:,.0f} articles/s "
+    f"({matching_seconds:.1f}s)"
+)
+print(f"precision:       {true_positives / max(len(found), 1):.3f}")
+print(f"recall:          {true_positives / max(len(planted), 1):.3f}")
@@ -0,0 +1,22 @@
+import argparse
+
+from db.connection import STREAM_BATCH_SIZE, Pg8000Connection
+from services.columnar import build_columnar_snapshot
+from utils.logger import configure_logging
+
+parser = argparse.ArgumentParser(
+    description="Write the articles, their categories and keyword counts to a "
+    "directory of NumPy column files, for offline analysis."
+)
+parser.add_argument("output_dir", help="directory to write the .npy files to")
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=STREAM_BATCH_SIZE,
+    help=f"rows fetched from the database at a time (default: {STREAM_BATCH_SIZE})",
+)
+args = parser.parse_args()
+configure_logging()
+
+with Pg8000Connection() as conn:
+    build_columnar_snapshot(conn, args.output_dir, batch_size=args.batch_size)
@@ -1,16 +1,92 @@
-import sys
+import argparse
 from datetime import datetime
 
 from db.connection import Pg8000Connection
-from etl import etl_backfill
+from etl import ARTICLE_SOURCES, etl_backfill
 from services import reset_db
+from services.extractors import API_RATE_LIMIT_KEY, API_RATE_LIMIT_SECONDS
+from services.rate_limit import PgRateLimiter
+from utils.logger import configure_logging
+
+parser = argparse.ArgumentParser(
+    description="Backfill arXiv articles between two dates."
+)
+parser.add_argument(
+    "dates",
+    nargs=6,
+    type=int,
+    metavar="N",
+    help="start and end dates as: YYYY MM DD YYYY MM DD",
+)
+parser.add_argument(
+    "--source",
+    choices=ARTICLE_SOURCES,
+    default="api",
+    help="upstream source to ingest from (default: api)",
+)
+parser.add_argument(
+    "--writers",
+    type=int,
+    default=1,
+    help="number of database connections to write articles with (default: 1)",
+)
+parser.add_argument(
+    "--commit-every",
+    type=int,
+    default=1,
+    help="number of articles to commit per transaction (default: 1)",
+)
+parser.add_argument(
+    "--category",
+    action="append",
+    dest="categories",
+    help="only ingest articles in this category, e.g. cs.* or stat.ML (repeatable)",
+)
+parser.add_argument(
+    "--shared-rate-limit",
+    action="store_true",
+    help="claim request slots from the database, to share the rate limit with "
+    "other running ingestions",
+)
+parser.add_argument(
+    "--bulk-mode",
+    action="store_true",
+    help="drop indexes and foreign keys while loading and rebuild them afterwards, "
+    "for a first backfill (stop other ingestions first)",
+)
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="profile the run with cProfile, writing reports to log/profiles",
+)
+parser.add_argument(
+    "--profile-memory-every",
+    type=int,
+    default=0,
+    metavar="N",
+    help="with --profile, also snapshot memory allocations every N pages",
+)
+args = parser.parse_args()
+configure_logging()
 
 # dangerous!
 if False:
     reset_db(Pg8000Connection())
 
+rate_limiter = None
+if args.shared_rate_limit:
+    rate_limiter = PgRateLimiter(API_RATE_LIMIT_KEY, API_RATE_LIMIT_SECONDS)
+
 # backfill based on input dates
 etl_backfill(
-    datetime(int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])),
-    datetime(int(sys.argv[4]), int(sys.argv[5]), int(sys.argv[6])),
+    datetime(args.dates[0], args.dates[1], args.dates[2]),
+    datetime(args.dates[3], args.dates[4], args.dates[5]),
+    source=args.source,
+    writers=args.writers,
+    commit_every=args.commit_every,
+    categories=args.categories,
+    rate_limiter=rate_limiter,
+    bulk_mode=args.bulk_mode,
+    profile=args.profile,
+    profile_memory_every=args.profile_memory_every,
 )
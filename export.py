@@ -0,0 +1,54 @@
+import argparse
+from datetime import datetime
+
+from db.connection import Pg8000Connection
+from services.export import EXPORT_CHUNKS, EXPORT_FORMATS, EXPORT_TABLES, export_tables
+from utils.logger import configure_logging
+
+parser = argparse.ArgumentParser(
+    description="Export the normalized tables to compressed files, chunked by "
+    "created_at. Rerun to resume an interrupted export."
+)
+parser.add_argument("output_dir", help="directory to write one folder per table to")
+parser.add_argument(
+    "--table",
+    action="append",
+    dest="tables",
+    choices=EXPORT_TABLES,
+    help="table to export (repeatable, default: all)",
+)
+parser.add_argument(
+    "--format",
+    choices=EXPORT_FORMATS,
+    default="csv",
+    help="file format (default: csv)",
+)
+parser.add_argument(
+    "--chunk",
+    choices=EXPORT_CHUNKS,
+    default="year",
+    help="created_at span of each file (default: year)",
+)
+parser.add_argument(
+    "--start",
+    type=datetime.fromisoformat,
+    help="export the chunks from this date on, as YYYY-MM-DD (default: oldest)",
+)
+parser.add_argument(
+    "--end",
+    type=datetime.fromisoformat,
+    help="export the chunks up to this date, as YYYY-MM-DD (default: newest)",
+)
+args = parser.parse_args()
+configure_logging()
+
+with Pg8000Connection() as conn:
+    export_tables(
+        conn,
+        args.output_dir,
+        tables=args.tables,
+        fmt=args.format,
+        chunk=args.chunk,
+        start=args.start,
+        end=args.end,
+    )
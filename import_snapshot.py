@@ -0,0 +1,49 @@
+import argparse
+
+from etl import etl_import_snapshot
+from services.bulk_load import BULK_LOAD_BATCH_SIZE
+from utils.logger import configure_logging
+
+parser = argparse.ArgumentParser(
+    description="Bootstrap the database from an arXiv metadata snapshot file."
+)
+parser.add_argument("snapshot_path", help="JSON lines snapshot, optionally gzipped")
+parser.add_argument(
+    "--no-catch-up",
+    action="store_true",
+    help="skip the API backfill from the newest snapshot record to now",
+)
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=BULK_LOAD_BATCH_SIZE,
+    help=f"articles loaded per COPY batch (default: {BULK_LOAD_BATCH_SIZE})",
+)
+parser.add_argument(
+    "--bulk-mode",
+    action="store_true",
+    help="drop indexes and foreign keys while loading and rebuild them afterwards",
+)
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="profile the run with cProfile, writing reports to log/profiles",
+)
+parser.add_argument(
+    "--profile-memory-every",
+    type=int,
+    default=0,
+    metavar="N",
+    help="with --profile, also snapshot memory allocations every N batches",
+)
+args = parser.parse_args()
+configure_logging()
+
+etl_import_snapshot(
+    args.snapshot_path,
+    catch_up=not args.no_catch_up,
+    batch_size=args.batch_size,
+    bulk_mode=args.bulk_mode,
+    profile=args.profile,
+    profile_memory_every=args.profile_memory_every,
+)
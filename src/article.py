@@ -11,6 +11,7 @@ class Article:
         updated_at: datetime,
         categories: list[str] = [],
         abstract: str = "",
+        authors: list[str] = [],
     ):
         self.id = id_
         self.title = title
@@ -18,3 +19,5 @@ class Article:
         self.updated_at = updated_at
         self.categories = categories
         self.abstract = abstract
+        # author names, in the order listed on the article
+        self.authors = authors
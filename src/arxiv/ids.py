@@ -0,0 +1,89 @@
+from arxiv.parser import validate_arxiv_id_new_fmt, validate_arxiv_id_old_fmt
+
+# archives which issued pre-2007 ids ([archive]/YYMMNNN). The scheme is closed, so the
+# list is fixed; an archive's position is its code in encoded ids, so only ever append
+OLD_FORMAT_ARCHIVES = (
+    "acc-phys",
+    "adap-org",
+    "alg-geom",
+    "ao-sci",
+    "astro-ph",
+    "atom-ph",
+    "bayes-an",
+    "chao-dyn",
+    "chem-ph",
+    "cmp-lg",
+    "comp-gas",
+    "cond-mat",
+    "cs",
+    "dg-ga",
+    "funct-an",
+    "gr-qc",
+    "hep-ex",
+    "hep-lat",
+    "hep-ph",
+    "hep-th",
+    "math",
+    "math-ph",
+    "mtrl-th",
+    "nlin",
+    "nucl-ex",
+    "nucl-th",
+    "patt-sol",
+    "physics",
+    "plasm-ph",
+    "q-alg",
+    "q-bio",
+    "quant-ph",
+    "solv-int",
+    "supr-con",
+)
+OLD_FORMAT_ARCHIVE_CODES = {archive: i for i, archive in enumerate(OLD_FORMAT_ARCHIVES)}
+
+# layout of encoded ids
+#   new format YYMM.NNNNN: (YYMMNNNNN << 1) | (1 if the number has 5 digits else 0)
+#   old format archive/YYMMNNN: OLD_FORMAT_FLAG | (archive code << 24) | YYMMNNN
+# new format ids sort in submission order, and every encoded id fits in a BIGINT
+OLD_FORMAT_FLAG = 1 << 40
+OLD_FORMAT_NUMBER_BITS = 24
+
+
+def encode_arxiv_id(id_: str) -> int:
+    """
+    Encodes an arXiv id (without version suffix) into a 64-bit integer, reversibly.
+    Raises a ValueError if the id is malformed or from an unknown archive.
+    """
+
+    if validate_arxiv_id_new_fmt(id_):
+        yymm, number = id_.split(".")
+        wide = len(number) == 5
+        return (int(yymm + number.zfill(5)) << 1) | int(wide)
+
+    if validate_arxiv_id_old_fmt(id_):
+        archive, number = id_.split("/")
+        if archive not in OLD_FORMAT_ARCHIVE_CODES:
+            raise ValueError(f"arXiv id from unknown archive: {id_}")
+        return (
+            OLD_FORMAT_FLAG
+            | (OLD_FORMAT_ARCHIVE_CODES[archive] << OLD_FORMAT_NUMBER_BITS)
+            | int(number)
+        )
+
+    raise ValueError(f"arXiv id is malformed: {id_}")
+
+
+def decode_arxiv_id(num_id: int) -> str:
+    """
+    Decodes an integer produced by encode_arxiv_id back into the arXiv id.
+    """
+
+    if num_id & OLD_FORMAT_FLAG:
+        archive_code = (num_id & ~OLD_FORMAT_FLAG) >> OLD_FORMAT_NUMBER_BITS
+        number = num_id & ((1 << OLD_FORMAT_NUMBER_BITS) - 1)
+        return f"{OLD_FORMAT_ARCHIVES[archive_code]}/{number:07d}"
+
+    digits = f"{num_id >> 1:09d}"
+    yymm, number = digits[:4], digits[4:]
+    if not num_id & 1:
+        number = number[1:]
+    return f"{yymm}.{number}"
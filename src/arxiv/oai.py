@@ -0,0 +1,198 @@
+import re
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from urllib.parse import quote
+
+import requests
+
+from article import Article
+from arxiv.parser import validate_arxiv_id_new_fmt, validate_arxiv_id_old_fmt
+
+OAI_BASE_URL = "http://export.arxiv.org/oai2"
+
+# namespaces used by the OAI-PMH envelope and the two supported metadata formats
+OAI_NS = "{http://www.openarchives.org/OAI/2.0/}"
+ARXIV_NS = "{http://arxiv.org/OAI/arXiv/}"
+ARXIV_RAW_NS = "{http://arxiv.org/OAI/arXivRaw/}"
+OAI_METADATA_PREFIXES = ("arXiv", "arXivRaw")
+# arXiv records only date articles to the day, while arXivRaw version dates carry
+# the full timestamps the API and snapshots store; harvesting arXiv records over
+# articles stored from those would change their created_at, which is refused
+OAI_DEFAULT_METADATA_PREFIX = "arXivRaw"
+
+OAI_DATE_FMT = "%Y-%m-%d"
+# e.g. Mon, 2 Apr 2007 19:18:42 GMT
+OAI_RAW_VERSION_DATE_FMT = "%a, %d %b %Y %H:%M:%S %Z"
+
+# separates the names in the plain text author lists of arXivRaw records
+OAI_RAW_AUTHOR_SEPARATOR = re.compile(r",\s*|\s+and\s+")
+
+# the OAI server answers 503 + Retry-After when it wants clients to back off
+OAI_MAX_RETRIES = 5
+
+
+def build_oai_list_records_url(
+    start_time: datetime,
+    end_time: datetime,
+    metadata_prefix: str = OAI_DEFAULT_METADATA_PREFIX,
+    resumption_token: str | None = None,
+    base_url: str = OAI_BASE_URL,
+) -> str:
+    """
+    Builds a ListRecords query url targeting the arXiv OAI-PMH interface.
+
+    Follow-up pages are requested with only the resumption token, as required by the
+    protocol. Dates are matched with day granularity.
+
+    Interface docs: https://info.arxiv.org/help/oa/index.html
+    """
+
+    if resumption_token is not None:
+        return (
+            f"{base_url}?verb=ListRecords"
+            f"&resumptionToken={quote(resumption_token, safe='')}"
+        )
+
+    if metadata_prefix not in OAI_METADATA_PREFIXES:
+        raise ValueError(f"unsupported OAI metadata prefix {metadata_prefix}")
+
+    if end_time < start_time:
+        raise ValueError("arXiv OAI invalid time range (end_time < start_time)")
+
+    return (
+        f"{base_url}?verb=ListRecords"
+        f"&metadataPrefix={metadata_prefix}"
+        f"&from={start_time.strftime(OAI_DATE_FMT)}"
+        f"&until={end_time.strftime(OAI_DATE_FMT)}"
+    )
+
+
+def fetch_oai_page(query_url: str) -> ET.Element:
+    """
+    Fetches a single page from the OAI-PMH interface and returns the resulting XML.
+    Waits and retries when the server asks for it with a 503 + Retry-After.
+    """
+
+    for _ in range(OAI_MAX_RETRIES):
+        response = requests.get(query_url)
+        if response.status_code != 503:
+            break
+        time.sleep(int(response.headers.get("Retry-After", 10)))
+
+    response.raise_for_status()
+    return ET.fromstring(response.content)
+
+
+def extract_oai_records(xml_response: ET.Element) -> list[ET.Element]:
+    """
+    Takes as input the root XML element of an OAI-PMH response and returns the
+    <record> elements it contains. A noRecordsMatch error yields an empty list.
+    """
+
+    error = xml_response.find(f"{OAI_NS}error")
+    if error is not None:
+        if error.get("code") == "noRecordsMatch":
+            return []
+        raise ValueError(f"arXiv OAI error {error.get('code')}: {error.text}")
+
+    return xml_response.findall(f"{OAI_NS}ListRecords/{OAI_NS}record")
+
+
+def extract_resumption_token(xml_response: ET.Element) -> str | None:
+    """
+    Takes as input the root XML element of an OAI-PMH response and returns the
+    resumption token for the next page, or None if this is the last page.
+    """
+
+    token = xml_response.find(f"{OAI_NS}ListRecords/{OAI_NS}resumptionToken")
+    if token is None or not token.text:
+        return None
+    return token.text.strip()
+
+
+def is_oai_record_deleted(record: ET.Element) -> bool:
+    """Checks whether an OAI <record> only announces the deletion of an article."""
+    header = record.find(f"{OAI_NS}header")
+    return header is not None and header.get("status") == "deleted"
+
+
+def extract_oai_authors(node: ET.Element, ns: str) -> list[str]:
+    """
+    Extracts the author names of an OAI metadata node, in order. arXiv records list
+    structured names, while arXivRaw records only carry the author line as typed by
+    the submitter, which is split on commas and "and".
+    """
+
+    if ns == ARXIV_NS:
+        authors = []
+        for author in node.iterfind(f"{ns}authors/{ns}author"):
+            parts = [
+                author.findtext(f"{ns}forenames"),
+                author.findtext(f"{ns}keyname"),
+                author.findtext(f"{ns}suffix"),
+            ]
+            authors.append(" ".join(part for part in parts if part))
+        return authors
+
+    text = " ".join(node.findtext(f"{ns}authors", "").split())
+    return [name for name in OAI_RAW_AUTHOR_SEPARATOR.split(text) if name]
+
+
+def parse_oai_record_to_article(record: ET.Element) -> Article:
+    """
+    Takes as input an OAI-PMH <record> element in either the arXiv or the arXivRaw
+    metadata format, and extracts the relevant fields into an Article object.
+
+    Raises a ValueError if the record is malformed.
+    """
+
+    metadata = record.find(f"{OAI_NS}metadata")
+    if metadata is None or len(metadata) == 0:
+        raise ValueError("arXiv OAI record has no metadata")
+    node = metadata[0]
+
+    if node.tag == f"{ARXIV_NS}arXiv":
+        ns = ARXIV_NS
+        created_at = datetime.strptime(node.findtext(f"{ns}created"), OAI_DATE_FMT)
+        # the updated field is omitted for articles which only have one version
+        updated_text = node.findtext(f"{ns}updated")
+        updated_at = (
+            datetime.strptime(updated_text, OAI_DATE_FMT)
+            if updated_text
+            else created_at
+        )
+    elif node.tag == f"{ARXIV_RAW_NS}arXivRaw":
+        ns = ARXIV_RAW_NS
+        version_dates = [
+            datetime.strptime(version.findtext(f"{ns}date"), OAI_RAW_VERSION_DATE_FMT)
+            for version in node.findall(f"{ns}version")
+        ]
+        if not version_dates:
+            raise ValueError("arXivRaw record has no versions")
+        created_at = version_dates[0]
+        updated_at = version_dates[-1]
+    else:
+        raise ValueError(f"unsupported OAI metadata format {node.tag}")
+
+    id_ = node.findtext(f"{ns}id")
+    if id_ is None or not (
+        validate_arxiv_id_new_fmt(id_) or validate_arxiv_id_old_fmt(id_)
+    ):
+        raise ValueError(f"arXiv OAI record is malformed (bad id): {id_}")
+
+    if created_at > updated_at:
+        raise ValueError(
+            "arXiv OAI record has invalid timestamps: "
+            f"created {created_at} > updated {updated_at}"
+        )
+
+    return Article(
+        id_,
+        node.findtext(f"{ns}title"),
+        created_at,
+        updated_at,
+        node.findtext(f"{ns}categories", "").split(),
+        node.findtext(f"{ns}abstract", ""),
+        extract_oai_authors(node, ns),
+    )
@@ -51,12 +51,29 @@ def extract_updated_at_from_entry(node: ET.Element) -> datetime | None:
     return None
 
 
+def extract_id_from_entry(node: ET.Element) -> str | None:
+    """
+    Takes as input an XML <entry> element representing an arXiv article, and extracts
+    its arXiv id without parsing the rest of the entry. Returns None if the id is
+    missing or malformed.
+    """
+    for child in node:
+        if child.tag.endswith("id"):
+            try:
+                return parse_arxiv_url_to_id(child.text)
+            except ValueError:
+                return None
+
+    return None
+
+
 def parse_entry_to_article(node: ET.Element) -> Article:
     """
     Takes as input an XML <entry> element representing an arXiv article, and extracts
     the relevant fields into an Article object.
     """
     categories = []
+    authors = []
     for child in node:
         if child.tag.endswith("id"):
             url = child.text
@@ -71,6 +88,10 @@ def parse_entry_to_article(node: ET.Element) -> Article:
             categories.append(child.get("term"))
         elif child.tag.endswith("summary"):
             abstract = child.text
+        elif child.tag.endswith("author"):
+            name = child.findtext(f"{XML_NS}name")
+            if name:
+                authors.append(name)
 
     if created_at > updated_at:
         raise ValueError(
@@ -78,7 +99,7 @@ def parse_entry_to_article(node: ET.Element) -> Article:
             f"published_at {created_at} > updated_at {updated_at}"
         )
 
-    return Article(id_, title, created_at, updated_at, categories, abstract)
+    return Article(id_, title, created_at, updated_at, categories, abstract, authors)
 
 
 def validate_arxiv_id_old_fmt(id_: str) -> bool:
@@ -1,20 +1,55 @@
+import re
+import time
 import xml.etree.ElementTree as ET
+import zlib
 from datetime import datetime
 
 import requests
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 
-# hardcoded cap on the max_results param in API queries
-# the API can technically support up to 30000 but smaller values run faster and are easier to test
-API_RESULTS_CAP = 1000
+from utils.stats import RunStats
+
+# cap on the max_results param in API queries, as documented by the API
+# large pages are slow and less reliable, see services.page_size for how it's chosen
+API_RESULTS_CAP = 30000
+API_DEFAULT_RESULTS = 1000
+
+# large pages can take a while to generate, but a stalled request should not hang
+API_TIMEOUT_SECONDS = 60
+
+# size of the chunks read off the socket while streaming a response into the parser
+API_STREAM_CHUNK_BYTES = 64 * 1024
+
+# a category filter is either a full category code (stat.ML, hep-th) or a whole
+# archive by wildcard (cs.*)
+API_CATEGORY_PATTERN = re.compile(r"^[a-z][a-z\-]*(\.([A-Za-z][A-Za-z\-]*|\*))?$")
+
+
+def build_category_query(categories: list[str]) -> str:
+    """
+    Builds the search_query clause matching articles in any of the given categories,
+    e.g. %28cat:cs.*+OR+cat:stat.ML%29.
+    """
+
+    for category in categories:
+        if not API_CATEGORY_PATTERN.match(category):
+            raise ValueError(f"invalid arXiv category filter {category}")
+
+    clause = "+OR+".join(f"cat:{category}" for category in categories)
+    return f"%28{clause}%29" if len(categories) > 1 else clause
 
 
 def build_arxiv_query_url(
     start_time: datetime,
     end_time: datetime,
     max_results: int,
+    offset: int = 0,
+    categories: list[str] | None = None,
 ) -> str:
     """
     Builds a valid query url targeting the arXiv API.
+    A nonzero offset skips that many results of the query, and categories restricts
+    it to articles listed in any of the given categories.
 
     API manual: https://info.arxiv.org/help/api/user-manual.html
     """
@@ -30,11 +65,14 @@ def build_arxiv_query_url(
         error_msg = "arXiv API invalid time range (end_time < start_time)"
         raise ValueError(error_msg)
 
+    category_filter = f"{build_category_query(categories)}+AND+" if categories else ""
+
     time_fmt = "%Y%m%d%H%M"
     return (
         f"{arxiv_api_base_url}?"
-        "search_query=lastUpdatedDate:"
+        f"search_query={category_filter}lastUpdatedDate:"
         f"[{start_time.strftime(time_fmt)}+TO+{end_time.strftime(time_fmt)}]"
+        f"{f'&start={offset}' if offset else ''}"
         f"&max_results={max_results}"
         "&sortBy=lastUpdatedDate&sortOrder=ascending"
     )
@@ -43,15 +81,90 @@ def build_arxiv_query_url(
 def fetch_articles_from_arxiv_api(
     start_time: datetime,
     end_time: datetime,
-    max_results: int = API_RESULTS_CAP,
+    max_results: int = API_DEFAULT_RESULTS,
+    offset: int = 0,
+    timeout: float = API_TIMEOUT_SECONDS,
+    stats: RunStats | None = None,
+    categories: list[str] | None = None,
 ) -> ET.Element:
     """
     Fetches a list of article entries from the arXiv API date
     which were last updated within the given time range.
 
-    Returns the resulting XML.
+    Returns the resulting XML. Raises requests.Timeout if the API takes longer than
+    timeout seconds to respond (or stalls mid-body), and requests.ConnectionError if
+    the connection drops. The response is requested gzipped and parsed while it
+    streams in; transfer sizes and decompression time are recorded in stats, if given.
+    """
+    query_url = build_arxiv_query_url(
+        start_time, end_time, max_results, offset, categories
+    )
+    response = requests.get(
+        query_url,
+        timeout=timeout,
+        stream=True,
+        headers={"Accept-Encoding": "gzip"},
+    )
+    try:
+        return parse_xml_stream(response, stats)
+    finally:
+        response.close()
+
+
+def read_raw_chunks(response: requests.Response):
+    """
+    Yields the raw (still encoded) chunks of a streamed HTTP response body. Reading
+    off the socket directly bypasses requests' error handling, so the urllib3 read
+    errors are translated here into the requests exceptions callers expect.
     """
-    query_url = build_arxiv_query_url(start_time, end_time, max_results)
-    response = requests.get(query_url)
 
-    return ET.fromstring(response.text)
+    try:
+        # read the raw bytes so the decompression can be done (and measured) here
+        yield from response.raw.stream(API_STREAM_CHUNK_BYTES, decode_content=False)
+    except ReadTimeoutError as e:
+        raise requests.Timeout(f"arXiv API response stalled: {e}") from e
+    except ProtocolError as e:
+        raise requests.ConnectionError(f"arXiv API connection dropped: {e}") from e
+
+
+def parse_xml_stream(
+    response: requests.Response, stats: RunStats | None = None
+) -> ET.Element:
+    """
+    Parses a streamed HTTP response body into XML, chunk by chunk. A gzipped body is
+    decompressed incrementally, so neither the compressed nor the decoded body is
+    ever held in memory as a whole.
+    """
+
+    decompressor = None
+    if response.headers.get("Content-Encoding", "").lower() == "gzip":
+        # wbits offset of 16 expects a gzip header and trailer
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    parser = ET.XMLParser()
+    bytes_received = 0
+    bytes_decoded = 0
+    decompress_seconds = 0.0
+    for chunk in read_raw_chunks(response):
+        bytes_received += len(chunk)
+        if decompressor is not None:
+            decompress_started_at = time.perf_counter()
+            try:
+                chunk = decompressor.decompress(chunk)
+            except zlib.error as e:
+                # surfaces like any other malformed response
+                raise ET.ParseError(f"corrupt gzip response body: {e}") from e
+            decompress_seconds += time.perf_counter() - decompress_started_at
+        bytes_decoded += len(chunk)
+        parser.feed(chunk)
+    if decompressor is not None:
+        tail = decompressor.flush()
+        bytes_decoded += len(tail)
+        parser.feed(tail)
+
+    if stats is not None:
+        stats.bytes_received += bytes_received
+        stats.bytes_decoded += bytes_decoded
+        stats.decompress_seconds += decompress_seconds
+
+    return parser.close()
@@ -0,0 +1,77 @@
+import gzip
+import json
+from datetime import datetime
+from typing import Generator
+
+from article import Article
+from arxiv.parser import validate_arxiv_id_new_fmt, validate_arxiv_id_old_fmt
+
+# e.g. Mon, 2 Apr 2007 19:18:42 GMT
+SNAPSHOT_VERSION_DATE_FMT = "%a, %d %b %Y %H:%M:%S %Z"
+
+
+def read_snapshot_lines(snapshot_path: str) -> Generator[str]:
+    """
+    Streams the non-empty lines of an arXiv metadata snapshot file (JSON lines, as
+    published at https://www.kaggle.com/datasets/Cornell-University/arxiv).
+    Files ending in .gz are decompressed on the fly.
+
+    Only one line is held in memory at a time.
+    """
+
+    if snapshot_path.endswith(".gz"):
+        f = gzip.open(snapshot_path, "rt", encoding="utf-8")
+    else:
+        f = open(snapshot_path, encoding="utf-8")
+
+    with f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def parse_snapshot_line_to_article(line: str) -> Article:
+    """
+    Takes as input a single JSON line from the arXiv metadata snapshot, and extracts
+    the relevant fields into an Article object.
+
+    created_at and updated_at are taken from the first and last entries of the
+    versions list, matching the published/updated fields of the search API.
+    Raises a ValueError if the record is malformed.
+    """
+
+    try:
+        record = json.loads(line)
+        id_ = record["id"]
+        version_dates = [
+            datetime.strptime(version["created"], SNAPSHOT_VERSION_DATE_FMT)
+            for version in record["versions"]
+        ]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"arXiv snapshot record is malformed: {e}") from e
+
+    if not (validate_arxiv_id_new_fmt(id_) or validate_arxiv_id_old_fmt(id_)):
+        raise ValueError(f"arXiv snapshot record is malformed (bad id): {id_}")
+    if not version_dates:
+        raise ValueError(f"arXiv snapshot record {id_} has no versions")
+
+    created_at = version_dates[0]
+    updated_at = version_dates[-1]
+    if created_at > updated_at:
+        raise ValueError(
+            "arXiv snapshot record has invalid timestamps: "
+            f"created {created_at} > updated {updated_at}"
+        )
+
+    return Article(
+        id_,
+        record.get("title"),
+        created_at,
+        updated_at,
+        (record.get("categories") or "").split(),
+        record.get("abstract") or "",
+        [
+            " ".join(part for part in (forenames, keyname, *suffix) if part)
+            for keyname, forenames, *suffix in record.get("authors_parsed") or []
+        ],
+    )
@@ -1,7 +1,13 @@
+import itertools
 import os
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 import pg8000.native as pg8000
+from pg8000.core import IDLE
+
+# rows fetched per round trip by Connection.stream
+STREAM_BATCH_SIZE = 1000
 
 
 class Connection(ABC):
@@ -14,6 +20,17 @@ class Connection(ABC):
         Keyword arguments can be supplied for parameterized queries.
         """
 
+    @abstractmethod
+    def stream(
+        self, query_str: str, batch_size: int = STREAM_BATCH_SIZE, **kwargs
+    ) -> Iterator[list[list]]:
+        """
+        Runs the given query string, yielding its rows in batches of up to
+        batch_size instead of returning them all at once, so only a batch is held in
+        memory at a time.
+        Keyword arguments can be supplied for parameterized queries.
+        """
+
     @abstractmethod
     def close(self):
         """Closes the connection."""
@@ -44,9 +61,48 @@ class Pg8000Connection(Connection):
         url = url or os.environ["ARXIN_DB_URL"]
         conn = pg8000.Connection(user=user, password=password, host=url, port=port)
         self.pg8000_conn = conn
+        self._cursor_ids = itertools.count()
 
     def run(self, query_str: str, **kwargs):
         return self.pg8000_conn.run(query_str, **kwargs)
 
+    def stream(
+        self, query_str: str, batch_size: int = STREAM_BATCH_SIZE, **kwargs
+    ) -> Iterator[list[list]]:
+        """
+        Streams the rows through a server-side cursor, fetching batch_size rows per
+        round trip.
+
+        Cursors only live within a transaction: the stream runs in the current one
+        if there is one (which must then not be committed before the stream is
+        exhausted or closed), and in its own otherwise, committed once the stream
+        ends. Queries run between batches are part of that transaction.
+        """
+
+        cursor = f"stream_{next(self._cursor_ids)}"
+        # pg8000 tracks the server's transaction status, but doesn't expose it
+        own_transaction = self.pg8000_conn._transaction_status == IDLE
+        if own_transaction:
+            self.run("START TRANSACTION;")
+        failed = False
+        try:
+            self.run(f"DECLARE {cursor} NO SCROLL CURSOR FOR {query_str}", **kwargs)
+            while True:
+                rows = self.run(f"FETCH FORWARD {batch_size} FROM {cursor};")
+                if rows:
+                    yield rows
+                if len(rows) < batch_size:
+                    break
+        except Exception:
+            # an aborted transaction has dropped the cursor already
+            failed = True
+            if own_transaction:
+                self.run("ROLLBACK;")
+            raise
+        finally:
+            # also reached when the consumer stops early and the stream is closed
+            if not failed:
+                self.run("COMMIT;" if own_transaction else f"CLOSE {cursor};")
+
     def close(self):
         self.pg8000_conn.close()
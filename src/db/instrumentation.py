@@ -0,0 +1,215 @@
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Iterator
+
+from db.connection import STREAM_BATCH_SIZE, Connection
+from utils.logger import LOG
+
+# set ARXIN_QUERY_STATS=1 to time every query of the ETL connections
+QUERY_STATS_ENABLED = os.environ.get("ARXIN_QUERY_STATS", "") == "1"
+# queries slower than this are logged along with their plan
+SLOW_QUERY_SECONDS = float(os.environ.get("ARXIN_SLOW_QUERY_MS", "500")) / 1000
+
+# upper bounds (in milliseconds) of the latency histogram buckets, plus an overflow
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# statements which can be EXPLAINed
+_EXPLAINABLE = ("select", "insert", "update", "delete", "merge", "with")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_query(query_str: str) -> str:
+    """
+    Normalizes a query string so that runs of the same statement share a key:
+    string and number literals are replaced by ?, and whitespace is collapsed.
+    Named parameters (:name) are kept, as they're part of the statement.
+    """
+
+    fingerprint = _STRING_LITERAL.sub("?", query_str)
+    fingerprint = _NUMBER_LITERAL.sub("?", fingerprint)
+    return _WHITESPACE.sub(" ", fingerprint).strip()
+
+
+class QueryStats:
+    """Count, total and latency histogram of the runs of one query fingerprint."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+
+    def percentile_ms(self, fraction: float) -> float:
+        """
+        Upper bound of the bucket holding the given fraction of runs (the maximum,
+        for the overflow bucket).
+        """
+
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                if i < len(LATENCY_BUCKETS_MS):
+                    return LATENCY_BUCKETS_MS[i]
+                break
+        return self.max_seconds * 1000
+
+
+class QueryStatsRegistry:
+    """
+    QueryStats per fingerprint, shared by every InstrumentedConnection of the
+    process (including those of writer threads).
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.fingerprints = {}
+        self.explained = set()
+        self.lock = threading.Lock()
+
+    def fingerprint(self, query_str: str) -> str:
+        # queries are mostly built from constant strings, so this is a dict lookup
+        fingerprint = self.fingerprints.get(query_str)
+        if fingerprint is None:
+            fingerprint = fingerprint_query(query_str)
+            self.fingerprints[query_str] = fingerprint
+        return fingerprint
+
+    def record(self, fingerprint: str, seconds: float):
+        with self.lock:
+            stats = self.stats.get(fingerprint)
+            if stats is None:
+                stats = self.stats[fingerprint] = QueryStats()
+            stats.add(seconds)
+
+    def claim_explain(self, fingerprint: str) -> bool:
+        """Tells whether a fingerprint's plan is yet to be logged, and claims it."""
+        with self.lock:
+            if fingerprint in self.explained:
+                return False
+            self.explained.add(fingerprint)
+            return True
+
+    def summary(self, top: int = 20) -> str:
+        """Formats the top fingerprints by total time spent, one per line."""
+
+        with self.lock:
+            ranked = sorted(
+                self.stats.items(), key=lambda item: item[1].total_seconds, reverse=True
+            )[:top]
+            lines = [
+                f"{stats.total_seconds:9.3f}s total {stats.count:8d} runs "
+                f"p50<={stats.percentile_ms(0.5):g}ms "
+                f"p95<={stats.percentile_ms(0.95):g}ms "
+                f"max={stats.max_seconds * 1000:.1f}ms  {fingerprint[:200]}"
+                for fingerprint, stats in ranked
+            ]
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.explained.clear()
+
+
+QUERY_STATS = QueryStatsRegistry()
+
+
+class InstrumentedConnection(Connection):
+    """
+    Decorates a Connection to time every query, recording the latency under the
+    query's fingerprint in registry. Queries slower than slow_query_seconds are
+    logged, with their EXPLAIN plan the first time their fingerprint is slow.
+    """
+
+    def __init__(
+        self,
+        conn: Connection,
+        registry: QueryStatsRegistry = QUERY_STATS,
+        slow_query_seconds: float = SLOW_QUERY_SECONDS,
+    ):
+        self.conn = conn
+        self.registry = registry
+        self.slow_query_seconds = slow_query_seconds
+
+    def run(self, query_str: str, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return self.conn.run(query_str, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            fingerprint = self.registry.fingerprint(query_str)
+            self.registry.record(fingerprint, elapsed)
+            if elapsed >= self.slow_query_seconds:
+                self._log_slow_query(fingerprint, elapsed, query_str, kwargs)
+
+    def stream(
+        self, query_str: str, batch_size: int = STREAM_BATCH_SIZE, **kwargs
+    ) -> Iterator[list[list]]:
+        """
+        Streams from the wrapped connection, recording the time taken by each batch
+        fetch (not by its consumer) under the query's fingerprint.
+        """
+
+        fingerprint = self.registry.fingerprint(query_str)
+        batches = self.conn.stream(query_str, batch_size, **kwargs)
+        try:
+            while True:
+                started_at = time.perf_counter()
+                try:
+                    rows = next(batches)
+                except StopIteration:
+                    return
+                finally:
+                    self.registry.record(fingerprint, time.perf_counter() - started_at)
+                yield rows
+        finally:
+            batches.close()
+
+    def _log_slow_query(
+        self, fingerprint: str, elapsed: float, query_str: str, kwargs: dict
+    ):
+        message = f"slow query ({elapsed * 1000:.0f}ms): {fingerprint}"
+        if (
+            "stream" not in kwargs
+            and fingerprint.lower().startswith(_EXPLAINABLE)
+            and self.registry.claim_explain(fingerprint)
+        ):
+            try:
+                plan = self.conn.run(f"EXPLAIN {query_str}", **kwargs)
+                message += "\n" + "\n".join(row[0] for row in plan)
+            except Exception as e:
+                # e.g. the transaction was aborted by the query itself
+                message += f"\n(no plan: {e})"
+        LOG.warning(message)
+
+    def close(self):
+        self.conn.close()
+
+
+def instrument(conn: Connection, enabled: bool = QUERY_STATS_ENABLED) -> Connection:
+    """
+    Wraps conn in an InstrumentedConnection if enabled, and returns it untouched
+    otherwise, so disabled instrumentation costs nothing per query.
+    """
+    return InstrumentedConnection(conn) if enabled else conn
+
+
+def log_query_summary(
+    registry: QueryStatsRegistry = QUERY_STATS, enabled: bool = QUERY_STATS_ENABLED
+):
+    """Logs the queries which took the most time overall, if enabled."""
+    if enabled and registry.stats:
+        LOG.info(f"query stats (by total time):\n{registry.summary()}")
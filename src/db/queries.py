@@ -1,20 +1,57 @@
-from datetime import datetime
+import csv
+import io
+from datetime import date, datetime
+from typing import Iterable, Iterator
 
 from article import Article
-from db.connection import Connection
+from arxiv.ids import OLD_FORMAT_ARCHIVES, decode_arxiv_id, encode_arxiv_id
+from db.connection import STREAM_BATCH_SIZE, Connection
+from utils.fingerprint import article_fingerprint
 
 PG_TIME_FMT = "%Y-%m-%d %H:%M:%S"
 
 
+def _partition_clause(partitioned: bool) -> str:
+    # partitioned tables are split into yearly created_at ranges (see
+    # create_year_partition), and carry created_at in their unique keys
+    return " PARTITION BY RANGE (created_at)" if partitioned else ""
+
+
+def _article_reference(partitioned: bool) -> str:
+    # a unique key of a partitioned table must include the partition key, so
+    # children of a partitioned Article reference it through (num_id, created_at)
+    if partitioned:
+        return "FOREIGN KEY (article_id, created_at) REFERENCES Article (num_id, created_at)"
+    return "FOREIGN KEY (article_id) REFERENCES Article (num_id)"
+
+
 def drop_all_tables(conn: Connection):
     """
-    Drops the Article, Category, and Keyword dimension tables, as well as the
-    Article_Category and KeywordOccurrence tables.
+    Drops the Article, Category, Author and Keyword dimension tables, as well as the
+    Article_Category, Article_Author and KeywordOccurrence (or KeywordCounts) tables
+    (with their partitions), the trend rollups, the ingest checkpoints and ledger,
+    the duplicate detection tables, the rate limit slots, the archive prefixes and
+    any deferred DDL.
 
     Fails silently (no-op) if the table does not exist.
     """
 
+    conn.run("DROP TABLE IF EXISTS DuplicateArticle;")
+    conn.run("DROP TABLE IF EXISTS ArticleSignatureBand;")
+    conn.run("DROP TABLE IF EXISTS ArticleSignature;")
+    conn.run("DROP TABLE IF EXISTS IngestPage;")
+    conn.run("DROP TABLE IF EXISTS IngestRun;")
+    conn.run("DROP TABLE IF EXISTS DeferredDdl;")
+    conn.run("DROP TABLE IF EXISTS ArchivePrefix;")
+    conn.run("DROP TABLE IF EXISTS RateLimit;")
+    conn.run("DROP TABLE IF EXISTS IngestCheckpoint;")
+    conn.run("DROP TABLE IF EXISTS KeywordTrend;")
+    conn.run("DROP TABLE IF EXISTS CategoryTrend;")
     conn.run("DROP TABLE IF EXISTS Article_Category CASCADE;")
+    conn.run("DROP TABLE IF EXISTS Article_Author;")
+    conn.run("DROP TABLE IF EXISTS Author;")
+    # also drops the KeywordOccurrence view of the array layout
+    conn.run("DROP TABLE IF EXISTS KeywordCounts CASCADE;")
     conn.run("DROP TABLE IF EXISTS KeywordOccurrence CASCADE;")
     conn.run("DROP TABLE IF EXISTS Article;")
     conn.run("DROP TABLE IF EXISTS Category;")
@@ -22,26 +59,63 @@ def drop_all_tables(conn: Connection):
 
 
 # creates Article table with the columns shown below
-def create_article_table(conn: Connection):
+def create_article_table(conn: Connection, partitioned: bool = False):
     """
-    Builds the Article table.
+    Builds the Article table. If partitioned, it is range partitioned by created_at
+    year, and (id, created_at) and (num_id, created_at) are its unique keys instead
+    of id and num_id; partitions must then be created with create_year_partition.
 
     Schema:
         id:             VARCHAR(20) PK
+        num_id:         BIGINT UNIQUE (id encoded by arxiv.ids, keys child tables)
         title:          VARCHAR(255)
         created_at:     TIMESTAMP
         updated_at:     TIMESTAMP
+        abstract:       TEXT
+        content_hash:   CHAR(32) (see utils.fingerprint)
+        search_vector:  TSVECTOR (generated from title and abstract)
 
     Errors if the table already exists.
     """
 
+    # title terms are weighted above abstract terms when ranking search results
+    if partitioned:
+        keys = "PRIMARY KEY (id, created_at), UNIQUE (num_id, created_at)"
+    else:
+        keys = "PRIMARY KEY (id), UNIQUE (num_id)"
     query_str = (
         "CREATE TABLE Article ("
-        "   id             VARCHAR(20) PRIMARY KEY,"
+        "   id             VARCHAR(20),"
+        "   num_id         BIGINT NOT NULL,"
         "   title          VARCHAR(255),"
         "   created_at     TIMESTAMP,"
-        "   updated_at     TIMESTAMP"
-        ");"
+        "   updated_at     TIMESTAMP,"
+        "   abstract       TEXT,"
+        "   content_hash   CHAR(32),"
+        "   search_vector  TSVECTOR GENERATED ALWAYS AS ("
+        "       setweight(to_tsvector('english', coalesce(title, '')), 'A') ||"
+        "       setweight(to_tsvector('english', coalesce(abstract, '')), 'B')"
+        "   ) STORED,"
+        ""
+        f"   {keys}"
+        f"){_partition_clause(partitioned)};"
+    )
+
+    conn.run(query_str)
+    # trend rollups are refreshed one created_at month at a time
+    conn.run("CREATE INDEX article_created_at_idx ON Article (created_at);")
+
+
+def create_article_search_index(conn: Connection):
+    """
+    Builds the GIN index backing full-text search over Article titles and abstracts.
+
+    Fails silently if the index already exists.
+    """
+
+    query_str = (
+        "CREATE INDEX IF NOT EXISTS article_search_vector_idx "
+        "ON Article USING GIN (search_vector);"
     )
 
     conn.run(query_str)
@@ -53,15 +127,20 @@ def insert_article(conn: Connection, article: Article):
     """
 
     query_str = (
-        "INSERT INTO Article (id, title, created_at, updated_at) "
-        "VALUES (:id, :title, :created_at, :updated_at)"
+        "INSERT INTO Article "
+        "(id, num_id, title, created_at, updated_at, abstract, content_hash) "
+        "VALUES (:id, :num_id, :title, :created_at, :updated_at, :abstract, "
+        ":content_hash)"
     )
 
     param_kwargs = {
         "id": article.id,
+        "num_id": encode_arxiv_id(article.id),
         "title": article.title,
         "created_at": article.created_at.strftime(PG_TIME_FMT),
         "updated_at": article.updated_at.strftime(PG_TIME_FMT),
+        "abstract": article.abstract,
+        "content_hash": article_fingerprint(article),
     }
 
     conn.run(query_str, **param_kwargs)
@@ -72,7 +151,9 @@ def select_article(conn: Connection, id_: str) -> Article | None:
     Selects a row from the Article table by its ID.
     """
 
-    query_str = "SELECT id, title, created_at, updated_at FROM Article WHERE id=:id"
+    query_str = (
+        "SELECT id, title, created_at, updated_at, abstract FROM Article WHERE id=:id"
+    )
 
     res = conn.run(query_str, id=id_)
 
@@ -82,11 +163,63 @@ def select_article(conn: Connection, id_: str) -> Article | None:
             title=res[0][1],
             created_at=res[0][2],
             updated_at=res[0][3],
+            abstract=res[0][4],
         )
     else:
         return None
 
 
+def select_article_fingerprints(
+    conn: Connection, ids: list[str]
+) -> dict[str, tuple[datetime, str]]:
+    """
+    Retrieves the updated_at and content_hash of every stored article among the given
+    ids, in a single query. Ids which are not stored are absent from the result.
+    """
+
+    query_str = "SELECT id, updated_at, content_hash FROM Article WHERE id = ANY(:ids)"
+
+    res = conn.run(query_str, ids=ids)
+
+    return {row[0]: (row[1], row[2]) for row in res}
+
+
+def iter_articles_updated_between(
+    conn: Connection,
+    start: datetime,
+    end: datetime,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[list[Article]]:
+    """
+    Yields the articles updated within [start, end), in batches of up to batch_size
+    ordered by updated_at. Rows are streamed through a server-side cursor, so the
+    range can span the whole table.
+    """
+
+    query_str = (
+        "SELECT id, title, created_at, updated_at, abstract FROM Article "
+        "WHERE updated_at >= :start AND updated_at < :end "
+        "ORDER BY updated_at, id"
+    )
+
+    for rows in conn.stream(
+        query_str,
+        batch_size,
+        start=start.strftime(PG_TIME_FMT),
+        end=end.strftime(PG_TIME_FMT),
+    ):
+        yield [
+            Article(
+                id_=row[0],
+                title=row[1],
+                created_at=row[2],
+                updated_at=row[3],
+                abstract=row[4],
+            )
+            for row in rows
+        ]
+
+
 def select_most_recent_updated_at(conn: Connection) -> datetime | None:
     """
     Retrieves the most recent value of update_at from the Article table.
@@ -105,6 +238,8 @@ def update_article(
     title: str = None,
     created_at: datetime = None,
     updated_at: datetime = None,
+    abstract: str = None,
+    content_hash: str = None,
 ):
     """
     Updates a row in the Article table with a new set of parameters.
@@ -121,9 +256,14 @@ def update_article(
         created_at = article.created_at
     if updated_at is None:
         updated_at = article.updated_at
+    if abstract is None:
+        abstract = article.abstract
 
+    # the stored fingerprint is kept as-is unless a new one is given
     query_str = (
-        "UPDATE Article SET title=:title, created_at=:created_at, updated_at=:updated_at "
+        "UPDATE Article SET title=:title, created_at=:created_at, "
+        "updated_at=:updated_at, abstract=:abstract, "
+        "content_hash=COALESCE(:content_hash, content_hash) "
         "WHERE id=:id"
     )
     conn.run(
@@ -132,8 +272,74 @@ def update_article(
         title=title,
         created_at=created_at,
         updated_at=updated_at,
+        abstract=abstract,
+        content_hash=content_hash,
+    )
+
+
+def search_articles(
+    conn: Connection,
+    search_query: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    category_codes: list[str] | None = None,
+    limit: int = 50,
+) -> list[tuple[Article, float]]:
+    """
+    Runs a ranked full-text search over Article titles and abstracts.
+
+    The query accepts web search syntax ("quoted phrases", OR, -excluded terms).
+    Results can be restricted to articles created within [start, end) and to articles
+    belonging to any of the given category codes (e.g. ['cs.LG', 'stat.ML']).
+
+    Returns (article, rank) pairs, best match first.
+    """
+
+    # filters are only added when requested so the planner sees the simplest query
+    filters = ["a.search_vector @@ q"]
+    param_kwargs = {"search_query": search_query, "limit": limit}
+
+    if start is not None:
+        filters.append("a.created_at >= :start")
+        param_kwargs["start"] = start
+    if end is not None:
+        filters.append("a.created_at < :end")
+        param_kwargs["end"] = end
+    if category_codes:
+        filters.append(
+            "EXISTS ("
+            "   SELECT 1 FROM Article_Category ac "
+            "   JOIN Category c ON c.id = ac.category_id "
+            "   WHERE ac.article_id = a.num_id AND c.code = ANY(:category_codes)"
+            ")"
+        )
+        param_kwargs["category_codes"] = category_codes
+
+    query_str = (
+        "SELECT a.id, a.title, a.created_at, a.updated_at, a.abstract, "
+        "   ts_rank_cd(a.search_vector, q) AS rank "
+        "FROM Article a, websearch_to_tsquery('english', :search_query) q "
+        f"WHERE {' AND '.join(filters)} "
+        "ORDER BY rank DESC "
+        "LIMIT :limit"
     )
 
+    res = conn.run(query_str, **param_kwargs)
+
+    return [
+        (
+            Article(
+                id_=row[0],
+                title=row[1],
+                created_at=row[2],
+                updated_at=row[3],
+                abstract=row[4],
+            ),
+            row[5],
+        )
+        for row in res
+    ]
+
 
 def create_category_table(conn: Connection):
     """
@@ -170,37 +376,93 @@ def insert_categories(conn: Connection, categories: list[dict]):
         conn.run(query_str, id=cat["id"], code=cat["code"], name=cat["name"])
 
 
-def create_article_category_table(conn: Connection):
+def create_archive_prefix_table(conn: Connection):
+    """
+    Builds the ArchivePrefix reference table, mapping the archive codes embedded in
+    encoded old-format article ids (see arxiv.ids) back to the archive names, so
+    Article.num_id can be decoded in SQL.
+
+    Schema:
+        code:           SMALLINT PK
+        archive:        VARCHAR(20)
+
+    Fails silently if the table already exists.
+    """
+
+    query_str = (
+        "CREATE TABLE IF NOT EXISTS ArchivePrefix ("
+        "   code           SMALLINT PRIMARY KEY,"
+        "   archive        VARCHAR(20) NOT NULL UNIQUE"
+        ");"
+    )
+
+    conn.run(query_str)
+
+
+def insert_archive_prefixes(conn: Connection):
     """
-    Builds the join table between Article and Category
+    Inserts the old-format archive prefixes into the ArchivePrefix table, skipping
+    those already present.
+    """
+
+    query_str = (
+        "INSERT INTO ArchivePrefix (code, archive) "
+        "SELECT * FROM unnest(CAST(:codes AS SMALLINT[]), CAST(:archives AS VARCHAR[])) "
+        "ON CONFLICT (code) DO NOTHING;"
+    )
+
+    conn.run(
+        query_str,
+        codes=list(range(len(OLD_FORMAT_ARCHIVES))),
+        archives=list(OLD_FORMAT_ARCHIVES),
+    )
+
+
+def create_article_category_table(conn: Connection, partitioned: bool = False):
+    """
+    Builds the join table between Article and Category. created_at is copied from
+    the article, so the table can be partitioned like Article (if partitioned) and
+    filtered by time without a join.
 
     Fails silently if the table already exists.
     """
 
     query_str = (
         "CREATE TABLE IF NOT EXISTS Article_Category ("
-        "   article_id     VARCHAR(20),"
+        "   article_id     BIGINT,"
         "   category_id    INTEGER,"
+        "   created_at     TIMESTAMP,"
         ""
-        "   FOREIGN KEY (article_id) REFERENCES Article (id),"
+        f"   {_article_reference(partitioned)},"
         "   FOREIGN KEY (category_id) REFERENCES Category (id)"
-        ");"
+        f"){_partition_clause(partitioned)};"
     )
 
     conn.run(query_str)
+    conn.run(
+        "CREATE INDEX IF NOT EXISTS article_category_article_id_idx "
+        "ON Article_Category (article_id);"
+    )
 
 
-def insert_article_category(conn: Connection, article_id: str, category_id: int):
+def insert_article_category(
+    conn: Connection, article_id: str, category_id: int, created_at: datetime
+):
     """
-    Inserts a join entry between an article (id) and category (id)
+    Inserts a join entry between an article (id, created_at) and category (id)
     """
 
     query_str = (
-        "INSERT INTO Article_Category (article_id, category_id) "
-        "VALUES (:article_id, :category_id);"
+        "INSERT INTO Article_Category (article_id, category_id, created_at) "
+        "VALUES (:article_id, :category_id, :created_at);"
     )
 
-    conn.run(query_str, article_id=article_id, category_id=category_id)
+    conn.run(
+        query_str,
+        article_id=encode_arxiv_id(article_id),
+        category_id=category_id,
+        created_at=created_at,
+    )
 
 
 def delete_article_category_for_article(conn: Connection, article_id: str):
@@ -210,7 +472,129 @@ def delete_article_category_for_article(conn: Connection, article_id: str):
 
     query_str = "DELETE FROM Article_Category WHERE article_id=:article_id;"
 
-    conn.run(query_str, article_id=article_id)
+    conn.run(query_str, article_id=encode_arxiv_id(article_id))
+
+
+def create_author_table(conn: Connection):
+    """
+    Builds the Author dimension table. Authors are deduplicated on their normalized
+    name (see services.authors), keeping the first spelling seen for display.
+
+    Schema:
+        id:               SERIAL PK
+        name:             TEXT
+        normalized_name:  TEXT UNIQUE
+
+    Fails silently if the table already exists.
+    """
+
+    query_str = (
+        "CREATE TABLE IF NOT EXISTS Author ("
+        "   id               SERIAL PRIMARY KEY,"
+        "   name             TEXT NOT NULL,"
+        "   normalized_name  TEXT NOT NULL UNIQUE"
+        ");"
+    )
+
+    conn.run(query_str)
+
+
+def upsert_authors(
+    conn: Connection, names: list[str], normalized_names: list[str]
+) -> dict[str, int]:
+    """
+    Creates the authors which don't exist yet, in a single statement, and returns a
+    map from each given normalized name to its author id. normalized_names must not
+    contain duplicates.
+    """
+
+    # the no-op update makes existing rows show up in RETURNING, and waits out
+    # concurrent inserts of the same author instead of skipping them
+    query_str = (
+        "INSERT INTO Author (name, normalized_name) "
+        "SELECT * FROM unnest(CAST(:names AS TEXT[]), CAST(:normalized AS TEXT[])) "
+        "ON CONFLICT (normalized_name) DO UPDATE "
+        "   SET normalized_name = EXCLUDED.normalized_name "
+        "RETURNING normalized_name, id;"
+    )
+
+    res = conn.run(query_str, names=names, normalized=normalized_names)
+
+    return {row[0]: row[1] for row in res}
+
+
+def create_article_author_table(conn: Connection, partitioned: bool = False):
+    """
+    Builds the join table between Article and Author, partitioned like Article if
+    partitioned.
+
+    Schema:
+        article_id:     BIGINT (Article.num_id)
+        position:       SMALLINT (0 for the first listed author)
+        author_id:      INTEGER
+        created_at:     TIMESTAMP (Article.created_at)
+
+    Fails silently if the table already exists.
+    """
+
+    key = "article_id, position" + (", created_at" if partitioned else "")
+    query_str = (
+        "CREATE TABLE IF NOT EXISTS Article_Author ("
+        "   article_id     BIGINT,"
+        "   position       SMALLINT,"
+        "   author_id      INTEGER NOT NULL,"
+        "   created_at     TIMESTAMP,"
+        ""
+        f"   PRIMARY KEY ({key}),"
+        f"   {_article_reference(partitioned)},"
+        "   FOREIGN KEY (author_id) REFERENCES Author (id)"
+        f"){_partition_clause(partitioned)};"
+    )
+
+    conn.run(query_str)
+    conn.run(
+        "CREATE INDEX IF NOT EXISTS article_author_author_id_idx "
+        "ON Article_Author (author_id);"
+    )
+
+
+def insert_article_authors(
+    conn: Connection, rows: list[tuple[str, int, int, datetime]]
+):
+    """
+    Inserts (article id, position, author id, article created_at) join entries, in a
+    single statement.
+    """
+
+    query_str = (
+        "INSERT INTO Article_Author (article_id, position, author_id, created_at) "
+        "SELECT * FROM unnest("
+        "   CAST(:article_ids AS BIGINT[]),"
+        "   CAST(:positions AS SMALLINT[]),"
+        "   CAST(:author_ids AS INTEGER[]),"
+        "   CAST(:created_ats AS TIMESTAMP[])"
+        ");"
+    )
+
+    conn.run(
+        query_str,
+        article_ids=[encode_arxiv_id(row[0]) for row in rows],
+        positions=[row[1] for row in rows],
+        author_ids=[row[2] for row in rows],
+        created_ats=[row[3] for row in rows],
+    )
+
+
+def delete_article_authors_for_articles(conn: Connection, article_ids: list[str]):
+    """
+    Deletes all author join entries of the given articles, in a single statement.
+    """
+
+    query_str = (
+        "DELETE FROM Article_Author WHERE article_id = ANY(CAST(:ids AS BIGINT[]));"
+    )
+
+    conn.run(query_str, ids=[encode_arxiv_id(id_) for id_ in article_ids])
 
 
 def create_keyword_table(conn: Connection):
@@ -243,30 +627,37 @@ def insert_keywords(conn: Connection, keywords: list[dict]):
         conn.run(query_str, id=kw["id"], name=kw["name"])
 
 
-def create_keyword_occurrence_table(conn: Connection):
+def create_keyword_occurrence_table(conn: Connection, partitioned: bool = False):
     """
-    Builds the occurrence table tracking keyword usage in articles.
+    Builds the occurrence table tracking keyword usage in articles, partitioned like
+    Article if partitioned.
 
     Schema:
-        article_id:     VARCHAR(20)
+        article_id:     BIGINT (Article.num_id)
         keyword_id:     INTEGER
         total:          INTEGER
+        created_at:     TIMESTAMP (Article.created_at)
 
     Fails silently if the table already exists.
     """
 
     query_str = (
         "CREATE TABLE IF NOT EXISTS KeywordOccurrence ("
-        "   article_id     VARCHAR(20),"
+        "   article_id     BIGINT,"
         "   keyword_id     INTEGER,"
         "   total          INTEGER,"
+        "   created_at     TIMESTAMP,"
         ""
-        "   FOREIGN KEY (article_id) REFERENCES Article (id),"
+        f"   {_article_reference(partitioned)},"
         "   FOREIGN KEY (keyword_id) REFERENCES Keyword (id)"
-        ");"
+        f"){_partition_clause(partitioned)};"
     )
 
     conn.run(query_str)
+    conn.run(
+        "CREATE INDEX IF NOT EXISTS keyword_occurrence_article_id_idx "
+        "ON KeywordOccurrence (article_id);"
+    )
 
 
 def insert_keyword_occurrence(
@@ -274,21 +665,23 @@ def insert_keyword_occurrence(
     article_id: str,
     keyword_id: int,
     total: int,
+    created_at: datetime,
 ):
     """
     Inserts an occurrence entry for a specific article/keyword.
     """
 
     query_str = (
-        "INSERT INTO KeywordOccurrence (article_id, keyword_id, total) "
-        "VALUES (:article_id, :keyword_id, :total);"
+        "INSERT INTO KeywordOccurrence (article_id, keyword_id, total, created_at) "
+        "VALUES (:article_id, :keyword_id, :total, :created_at);"
     )
 
     conn.run(
         query_str,
-        article_id=article_id,
+        article_id=encode_arxiv_id(article_id),
         keyword_id=keyword_id,
         total=total,
+        created_at=created_at,
     )
 
 
@@ -299,4 +692,1464 @@ def delete_keyword_occurrences_for_article(conn: Connection, article_id: str):
 
     query_str = "DELETE FROM KeywordOccurrence WHERE article_id=:article_id;"
 
-    conn.run(query_str, article_id=article_id)
+    conn.run(query_str, article_id=encode_arxiv_id(article_id))
+
+
+def create_keyword_counts_table(conn: Connection, partitioned: bool = False):
+    """
+    Builds the KeywordCounts table, the compact alternative to KeywordOccurrence which
+    stores one row per article holding the counts of every keyword. Partitioned like
+    Article if partitioned.
+
+    Schema:
+        article_id:     BIGINT PK (Article.num_id)
+        counts:         SMALLINT[] (count of keyword k at index k + 1)
+        created_at:     TIMESTAMP (Article.created_at, also in the PK if partitioned)
+
+    Articles without any keyword hits have no row. Fails silently if the table
+    already exists.
+    """
+
+    key = "article_id" + (", created_at" if partitioned else "")
+    query_str = (
+        "CREATE TABLE IF NOT EXISTS KeywordCounts ("
+        "   article_id     BIGINT,"
+        "   counts         SMALLINT[] NOT NULL,"
+        "   created_at     TIMESTAMP,"
+        ""
+        f"   PRIMARY KEY ({key}),"
+        f"   {_article_reference(partitioned)}"
+        f"){_partition_clause(partitioned)};"
+    )
+
+    conn.run(query_str)
+
+
+def create_keyword_occurrence_view(conn: Connection):
+    """
+    Builds a KeywordOccurrence view over KeywordCounts, presenting the same
+    (article_id, keyword_id, total, created_at) rows as the KeywordOccurrence table,
+    so readers work unchanged on either layout.
+
+    Errors if a KeywordOccurrence table exists.
+    """
+
+    query_str = (
+        "CREATE OR REPLACE VIEW KeywordOccurrence AS "
+        "SELECT kc.article_id, CAST(c.ord - 1 AS INTEGER) AS keyword_id, "
+        "   CAST(c.total AS INTEGER) AS total, kc.created_at "
+        "FROM KeywordCounts kc "
+        "CROSS JOIN LATERAL unnest(kc.counts) WITH ORDINALITY AS c(total, ord) "
+        "WHERE c.total > 0;"
+    )
+
+    conn.run(query_str)
+
+
+def drop_keyword_occurrence_view(conn: Connection):
+    """
+    Drops the KeywordOccurrence view of the array layout.
+
+    Fails silently (no-op) if the view does not exist.
+    """
+
+    conn.run("DROP VIEW IF EXISTS KeywordOccurrence;")
+
+
+def upsert_keyword_counts(
+    conn: Connection, article_id: str, counts: list[int], created_at: datetime
+):
+    """
+    Stores the keyword counts of an article, indexed by keyword id, replacing any
+    previously stored counts.
+    """
+
+    # MERGE needs no conflict target, so it works whether or not created_at is part
+    # of the primary key
+    query_str = (
+        "MERGE INTO KeywordCounts kc "
+        "USING (SELECT CAST(:article_id AS BIGINT) AS article_id, "
+        "   CAST(:created_at AS TIMESTAMP) AS created_at) s "
+        "ON kc.article_id = s.article_id AND kc.created_at = s.created_at "
+        "WHEN MATCHED THEN UPDATE SET counts = CAST(:counts AS SMALLINT[]) "
+        "WHEN NOT MATCHED THEN INSERT (article_id, counts, created_at) "
+        "   VALUES (s.article_id, CAST(:counts AS SMALLINT[]), s.created_at);"
+    )
+
+    conn.run(
+        query_str,
+        article_id=encode_arxiv_id(article_id),
+        counts=counts,
+        created_at=created_at,
+    )
+
+
+def delete_keyword_counts_for_article(conn: Connection, article_id: str):
+    """
+    Deletes the keyword counts of a given article.
+    """
+
+    query_str = "DELETE FROM KeywordCounts WHERE article_id=:article_id;"
+
+    conn.run(query_str, article_id=encode_arxiv_id(article_id))
+
+
+def select_keyword_totals(
+    conn: Connection,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> dict[int, tuple[int, int]]:
+    """
+    Aggregates keyword usage over the articles created within the given (inclusive)
+    bounds, straight from KeywordCounts. Returns a map from keyword id to (articles
+    mentioning it, sum of all occurrences).
+    """
+
+    # bounds apply to the created_at copied into KeywordCounts, which needs no join
+    # and prunes the partitions outside them
+    filters = []
+    params = {}
+    if start is not None:
+        filters.append("kc.created_at >= :start")
+        params["start"] = start.strftime(PG_TIME_FMT)
+    if end is not None:
+        filters.append("kc.created_at <= :end")
+        params["end"] = end.strftime(PG_TIME_FMT)
+
+    query_str = (
+        "SELECT CAST(c.ord - 1 AS INTEGER), COUNT(*), SUM(c.total) "
+        "FROM KeywordCounts kc "
+        "CROSS JOIN LATERAL unnest(kc.counts) WITH ORDINALITY AS c(total, ord) "
+        "WHERE c.total > 0 " + "".join(f"AND {f} " for f in filters) + "GROUP BY c.ord;"
+    )
+
+    res = conn.run(query_str, **params)
+
+    return {row[0]: (int(row[1]), int(row[2])) for row in res}
+
+
+def iter_keyword_occurrences(
+    conn: Connection, batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[list[tuple[str, int, int]]]:
+    """
+    Yields every (article id, keyword id, total) occurrence, grouped by article, in
+    batches of up to batch_size. Reads the KeywordOccurrence table or view, so works
+    with either keyword layout.
+    """
+
+    query_str = (
+        "SELECT article_id, keyword_id, total FROM KeywordOccurrence "
+        "ORDER BY article_id, keyword_id"
+    )
+
+    for rows in conn.stream(query_str, batch_size):
+        yield [(decode_arxiv_id(row[0]), row[1], row[2]) for row in rows]
+
+
+# densifies (article_id, keyword_id, total) rows into one (article_id, counts,
+# created_at) row per article
+KEYWORD_COUNTS_FROM_OCCURRENCES = (
+    "SELECT ids.article_id, "
+    "   CAST(array_agg(coalesce(o.total, 0) ORDER BY k) AS SMALLINT[]), "
+    "   ids.created_at "
+    "FROM (SELECT DISTINCT occ.article_id, a.created_at FROM {occurrences} AS occ "
+    "   JOIN Article a ON a.num_id = occ.article_id) ids "
+    "CROSS JOIN generate_series(0, (SELECT MAX(id) FROM Keyword)) k "
+    "LEFT JOIN {occurrences} AS o "
+    "   ON o.article_id = ids.article_id AND o.keyword_id = k "
+    "GROUP BY ids.article_id, ids.created_at"
+)
+
+
+def migrate_keyword_occurrences_to_counts(conn: Connection, partitioned: bool = False):
+    """
+    Converts the KeywordOccurrence table into KeywordCounts, and replaces it with the
+    compatibility view. A partitioned KeywordCounts gets the partitions of every
+    created_at year of Article first. Should be run inside a transaction.
+    """
+
+    create_keyword_counts_table(conn, partitioned)
+    if partitioned:
+        for year in sorted({month.year for month in select_article_months(conn)}):
+            create_year_partition(conn, "KeywordCounts", year)
+    conn.run(
+        "INSERT INTO KeywordCounts (article_id, counts, created_at) "
+        + KEYWORD_COUNTS_FROM_OCCURRENCES.format(occurrences="KeywordOccurrence")
+        + ";"
+    )
+    conn.run("DROP TABLE KeywordOccurrence;")
+    create_keyword_occurrence_view(conn)
+
+
+def create_trend_tables(conn: Connection):
+    """
+    Builds the CategoryTrend and KeywordTrend rollup tables, which hold precomputed
+    counts per created_at month.
+
+    CategoryTrend schema:
+        month:          DATE
+        category_id:    INTEGER
+        articles:       INTEGER
+
+    KeywordTrend schema:
+        month:          DATE
+        category_id:    INTEGER
+        keyword_id:     INTEGER
+        articles:       INTEGER (articles mentioning the keyword)
+        total:          INTEGER (sum of all occurrences)
+
+    Fails silently if the tables already exist.
+    """
+
+    conn.run(
+        "CREATE TABLE IF NOT EXISTS CategoryTrend ("
+        "   month          DATE,"
+        "   category_id    INTEGER,"
+        "   articles       INTEGER,"
+        ""
+        "   PRIMARY KEY (month, category_id)"
+        ");"
+    )
+    conn.run(
+        "CREATE TABLE IF NOT EXISTS KeywordTrend ("
+        "   month          DATE,"
+        "   category_id    INTEGER,"
+        "   keyword_id     INTEGER,"
+        "   articles       INTEGER,"
+        "   total          INTEGER,"
+        ""
+        "   PRIMARY KEY (month, category_id, keyword_id)"
+        ");"
+    )
+
+
+def select_article_months(conn: Connection) -> list[date]:
+    """
+    Retrieves every distinct created_at month (as the first day of the month) present
+    in the Article table.
+    """
+
+    query_str = (
+        "SELECT DISTINCT CAST(date_trunc('month', created_at) AS DATE) FROM Article"
+    )
+
+    return [row[0] for row in conn.run(query_str)]
+
+
+# keeps the article a out of the rollups if it duplicates another
+NOT_DUPLICATE = (
+    "NOT EXISTS (SELECT 1 FROM DuplicateArticle d WHERE d.article_id = a.num_id)"
+)
+
+
+def refresh_trends_for_months(conn: Connection, months: list[date]):
+    """
+    Recomputes the CategoryTrend and KeywordTrend rows for the given months, which
+    must be given as the first day of each month.
+
+    Only the articles created within those months are read, and those recorded as
+    duplicates of another (in DuplicateArticle) are left out.
+    """
+
+    if not months:
+        return
+
+    # expands each month into a half-open created_at range so the index is usable
+    months_cte = (
+        "WITH m AS ("
+        "   SELECT month, month + INTERVAL '1 month' AS next_month "
+        "   FROM unnest(CAST(:months AS DATE[])) AS month"
+        ") "
+    )
+    # constant bounds around all the months, which let the planner skip the
+    # partitions of other years (it cannot derive them from the m ranges)
+    last = max(months)
+    bounds = {
+        "first": min(months),
+        "after_last": date(last.year + last.month // 12, last.month % 12 + 1, 1),
+    }
+
+    conn.run("DELETE FROM CategoryTrend WHERE month = ANY(:months);", months=months)
+    conn.run("DELETE FROM KeywordTrend WHERE month = ANY(:months);", months=months)
+
+    conn.run(
+        months_cte + "INSERT INTO CategoryTrend (month, category_id, articles) "
+        "SELECT m.month, ac.category_id, COUNT(*) "
+        "FROM m "
+        "JOIN Article a ON a.created_at >= m.month AND a.created_at < m.next_month "
+        "JOIN Article_Category ac "
+        "   ON ac.article_id = a.num_id AND ac.created_at = a.created_at "
+        "WHERE a.created_at >= :first AND a.created_at < :after_last "
+        "   AND ac.created_at >= :first AND ac.created_at < :after_last "
+        f"  AND {NOT_DUPLICATE} "
+        "GROUP BY m.month, ac.category_id;",
+        months=months,
+        **bounds,
+    )
+    conn.run(
+        months_cte
+        + "INSERT INTO KeywordTrend (month, category_id, keyword_id, articles, total) "
+        "SELECT m.month, ac.category_id, ko.keyword_id, COUNT(*), SUM(ko.total) "
+        "FROM m "
+        "JOIN Article a ON a.created_at >= m.month AND a.created_at < m.next_month "
+        "JOIN Article_Category ac "
+        "   ON ac.article_id = a.num_id AND ac.created_at = a.created_at "
+        "JOIN KeywordOccurrence ko "
+        "   ON ko.article_id = a.num_id AND ko.created_at = a.created_at "
+        "WHERE a.created_at >= :first AND a.created_at < :after_last "
+        "   AND ac.created_at >= :first AND ac.created_at < :after_last "
+        "   AND ko.created_at >= :first AND ko.created_at < :after_last "
+        f"  AND {NOT_DUPLICATE} "
+        "GROUP BY m.month, ac.category_id, ko.keyword_id;",
+        months=months,
+        **bounds,
+    )
+
+
+def select_keyword_trend(
+    conn: Connection,
+    keyword_id: int,
+    category_id: int | None = None,
+) -> list[tuple[date, int, int]]:
+    """
+    Reads the monthly trend for a keyword from the KeywordTrend rollup, either within
+    one category or summed over all categories.
+
+    Returns (month, articles, total) tuples in chronological order. Note that an
+    article listed under several categories is counted once per category.
+    """
+
+    if category_id is None:
+        query_str = (
+            "SELECT month, SUM(articles), SUM(total) FROM KeywordTrend "
+            "WHERE keyword_id=:keyword_id "
+            "GROUP BY month ORDER BY month"
+        )
+        res = conn.run(query_str, keyword_id=keyword_id)
+    else:
+        query_str = (
+            "SELECT month, articles, total FROM KeywordTrend "
+            "WHERE keyword_id=:keyword_id AND category_id=:category_id "
+            "ORDER BY month"
+        )
+        res = conn.run(query_str, keyword_id=keyword_id, category_id=category_id)
+
+    return [(row[0], int(row[1]), int(row[2])) for row in res]
+
+
+def create_staging_tables(conn: Connection):
+    """
+    Builds the session-local staging tables used for bulk loads. They mirror Article,
+    Article_Category, Article_Author and KeywordOccurrence without constraints (and
+    without created_at, copied from Article on merge), and are emptied whenever the
+    enclosing transaction commits.
+
+    Fails silently if the tables already exist.
+    """
+
+    conn.run(
+        "CREATE TEMP TABLE IF NOT EXISTS Staging_Article ("
+        "   id             VARCHAR(20),"
+        "   num_id         BIGINT,"
+        "   title          VARCHAR(255),"
+        "   created_at     TIMESTAMP,"
+        "   updated_at     TIMESTAMP,"
+        "   abstract       TEXT,"
+        "   content_hash   CHAR(32)"
+        ") ON COMMIT DELETE ROWS;"
+    )
+    conn.run(
+        "CREATE TEMP TABLE IF NOT EXISTS Staging_Article_Category ("
+        "   article_id     BIGINT,"
+        "   category_id    INTEGER"
+        ") ON COMMIT DELETE ROWS;"
+    )
+    conn.run(
+        "CREATE TEMP TABLE IF NOT EXISTS Staging_Article_Author ("
+        "   article_id     BIGINT,"
+        "   position       SMALLINT,"
+        "   author_id      INTEGER"
+        ") ON COMMIT DELETE ROWS;"
+    )
+    conn.run(
+        "CREATE TEMP TABLE IF NOT EXISTS Staging_KeywordOccurrence ("
+        "   article_id     BIGINT,"
+        "   keyword_id     INTEGER,"
+        "   total          INTEGER"
+        ") ON COMMIT DELETE ROWS;"
+    )
+
+
+def copy_rows_into_table(
+    conn: Connection,
+    table: str,
+    columns: list[str],
+    rows: Iterable[tuple],
+):
+    """
+    Loads rows into a table with COPY FROM STDIN, which is far faster than issuing
+    one INSERT per row. None values are loaded as NULL.
+    """
+
+    buffer = io.StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_STRINGS, lineterminator="\n").writerows(rows)
+    buffer.seek(0)
+
+    query_str = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+    conn.run(query_str, stream=buffer)
+
+
+def copy_query_to_stream(conn: Connection, query: str, stream, fmt: str = "csv"):
+    """
+    Streams the rows of a query into a (binary or text) file-like object with COPY
+    TO STDOUT, without holding the result in memory. The query can't take
+    parameters, so any values must be inlined by the caller.
+
+    Formats:
+        csv:    CSV with a header row
+        jsonl:  one JSON object per row
+    """
+
+    if fmt == "jsonl":
+        # control characters never appear unescaped in JSON, so using them as
+        # quote and delimiter leaves each object as is
+        copy_str = (
+            f"COPY (SELECT row_to_json(r) FROM ({query}) r) TO STDOUT "
+            "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+        )
+    elif fmt == "csv":
+        copy_str = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)"
+    else:
+        raise ValueError(f"unknown export format {fmt}")
+
+    conn.run(copy_str, stream=stream)
+
+
+def select_article_created_at_range(
+    conn: Connection,
+) -> tuple[datetime | None, datetime | None]:
+    """
+    Retrieves the oldest and newest created_at of the Article table (None, None if
+    it is empty).
+    """
+
+    res = conn.run("SELECT MIN(created_at), MAX(created_at) FROM Article")
+
+    return res[0][0], res[0][1]
+
+
+def iter_article_columns(
+    conn: Connection, batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[list[list]]:
+    """
+    Yields one row per article, in num_id order and batches of up to batch_size:
+        num_id, created_at, updated_at,
+        title code:     rank of the title among the distinct titles (from 0), in
+                        iter_distinct_titles order
+        category ids:   sorted
+        keyword ids:    sorted, for the keywords occurring in the article
+        keyword totals: matching the keyword ids
+
+    Works with either keyword layout. To match iter_distinct_titles, both should be
+    read in the same REPEATABLE READ transaction.
+    """
+
+    query_str = (
+        "SELECT a.num_id, a.created_at, a.updated_at, "
+        "   CAST(DENSE_RANK() OVER (ORDER BY a.title) - 1 AS INTEGER), "
+        "   ARRAY(SELECT c.category_id FROM Article_Category c "
+        "       WHERE c.article_id = a.num_id AND c.created_at = a.created_at "
+        "       ORDER BY c.category_id), "
+        "   k.ids, k.totals "
+        "FROM Article a "
+        "LEFT JOIN LATERAL ("
+        "   SELECT array_agg(o.keyword_id ORDER BY o.keyword_id) AS ids, "
+        "       array_agg(o.total ORDER BY o.keyword_id) AS totals "
+        "   FROM KeywordOccurrence o "
+        "   WHERE o.article_id = a.num_id AND o.created_at = a.created_at "
+        "       AND o.total > 0"
+        ") k ON true "
+        "ORDER BY a.num_id"
+    )
+
+    for rows in conn.stream(query_str, batch_size):
+        yield [row[:5] + [row[5] or [], row[6] or []] for row in rows]
+
+
+def iter_distinct_titles(
+    conn: Connection, batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[list[str]]:
+    """
+    Yields the distinct article titles in sorted order, in batches of up to
+    batch_size, so the position of a title is its code in iter_article_columns.
+    """
+
+    query_str = "SELECT DISTINCT title FROM Article ORDER BY title"
+
+    for rows in conn.stream(query_str, batch_size):
+        yield [row[0] for row in rows]
+
+
+def merge_staged_articles(conn: Connection, keyword_layout: str = "rows"):
+    """
+    Moves the contents of the staging tables into Article, Article_Category,
+    Article_Author and KeywordOccurrence (or KeywordCounts, with the "array"
+    keyword_layout). Staged articles replace stored ones (including their category,
+    author and keyword rows) unless the stored copy has a newer updated_at, in which
+    case the staged copy is discarded. created_at is never modified.
+
+    Expects at most one staged row per article id, and the partitions of the staged
+    created_at years to exist if the tables are partitioned.
+    """
+
+    conn.run(
+        "DELETE FROM Staging_Article s USING Article a "
+        "WHERE a.id = s.id AND a.updated_at > s.updated_at;"
+    )
+    # MERGE rather than INSERT ... ON CONFLICT (id), as id alone is not a unique key
+    # of a partitioned Article
+    conn.run(
+        "MERGE INTO Article a USING Staging_Article s ON a.id = s.id "
+        "WHEN MATCHED THEN UPDATE SET "
+        "   title = s.title,"
+        "   updated_at = s.updated_at,"
+        "   abstract = s.abstract,"
+        "   content_hash = s.content_hash "
+        "WHEN NOT MATCHED THEN INSERT "
+        "(id, num_id, title, created_at, updated_at, abstract, content_hash) "
+        "VALUES (s.id, s.num_id, s.title, s.created_at, s.updated_at, s.abstract, "
+        "   s.content_hash);"
+    )
+    # children must carry the stored created_at, which the merge kept
+    conn.run(
+        "UPDATE Staging_Article s SET created_at = a.created_at FROM Article a "
+        "WHERE a.id = s.id AND a.created_at IS DISTINCT FROM s.created_at;"
+    )
+    conn.run(
+        "DELETE FROM Article_Category ac USING Staging_Article s "
+        "WHERE ac.article_id = s.num_id;"
+    )
+    conn.run(
+        "INSERT INTO Article_Category (article_id, category_id, created_at) "
+        "SELECT sc.article_id, sc.category_id, s.created_at "
+        "FROM Staging_Article_Category sc "
+        "JOIN Staging_Article s ON s.num_id = sc.article_id;"
+    )
+    conn.run(
+        "DELETE FROM Article_Author aa USING Staging_Article s "
+        "WHERE aa.article_id = s.num_id;"
+    )
+    conn.run(
+        "INSERT INTO Article_Author (article_id, position, author_id, created_at) "
+        "SELECT sa.article_id, sa.position, sa.author_id, s.created_at "
+        "FROM Staging_Article_Author sa "
+        "JOIN Staging_Article s ON s.num_id = sa.article_id;"
+    )
+    if keyword_layout == "array":
+        conn.run(
+            "DELETE FROM KeywordCounts kc USING Staging_Article s "
+            "WHERE kc.article_id = s.num_id;"
+        )
+        conn.run(
+            "INSERT INTO KeywordCounts (article_id, counts, created_at) "
+            + KEYWORD_COUNTS_FROM_OCCURRENCES.format(
+                occurrences="(SELECT sk.* FROM Staging_KeywordOccurrence sk "
+                "JOIN Staging_Article s ON s.num_id = sk.article_id)"
+            )
+            + ";"
+        )
+        return
+
+    conn.run(
+        "DELETE FROM KeywordOccurrence ko USING Staging_Article s "
+        "WHERE ko.article_id = s.num_id;"
+    )
+    conn.run(
+        "INSERT INTO KeywordOccurrence (article_id, keyword_id, total, created_at) "
+        "SELECT sk.article_id, sk.keyword_id, sk.total, s.created_at "
+        "FROM Staging_KeywordOccurrence sk "
+        "JOIN Staging_Article s ON s.num_id = sk.article_id;"
+    )
+
+
+def create_ingest_checkpoint_table(conn: Connection):
+    """
+    Builds the IngestCheckpoint table, which records how far each ingestion scope
+    (e.g. the full corpus, or a set of categories) has been synced.
+
+    Schema:
+        scope:          VARCHAR(255) PK
+        watermark:      TIMESTAMP (updated_at up to which the scope is synced)
+        synced_at:      TIMESTAMP (when the watermark was last moved)
+
+    Fails silently if the table already exists.
+    """
+
+    query_str = (
+        "CREATE TABLE IF NOT EXISTS IngestCheckpoint ("
+        "   scope          VARCHAR(255) PRIMARY KEY,"
+        "   watermark      TIMESTAMP NOT NULL,"
+        "   synced_at      TIMESTAMP NOT NULL"
+        ");"
+    )
+
+    conn.run(query_str)
+
+
+def select_ingest_checkpoint(conn: Connection, scope: str) -> datetime | None:
+    """
+    Retrieves the watermark of an ingestion scope, or None if it was never synced.
+    """
+
+    query_str = "SELECT watermark FROM IngestCheckpoint WHERE scope=:scope"
+
+    res = conn.run(query_str, scope=scope)
+
+    return res[0][0] if len(res) > 0 else None
+
+
+def seed_ingest_checkpoint(conn: Connection, scope: str):
+    """
+    Records the most recent updated_at of the Article table as the watermark of an
+    ingestion scope, as long as no scope has a checkpoint yet, so that articles
+    loaded before checkpoints were kept are not fetched again. Does nothing once any
+    checkpoint exists or if the table is empty.
+    """
+
+    query_str = (
+        "INSERT INTO IngestCheckpoint (scope, watermark, synced_at) "
+        "SELECT :scope, MAX(updated_at), now() FROM Article "
+        "WHERE NOT EXISTS (SELECT 1 FROM IngestCheckpoint) "
+        "HAVING MAX(updated_at) IS NOT NULL "
+        "ON CONFLICT (scope) DO NOTHING;"
+    )
+
+    conn.run(query_str, scope=scope)
+
+
+def upsert_ingest_checkpoint(conn: Connection, scope: str, watermark: datetime):
+    """
+    Records the watermark of an ingestion scope. The watermark never moves backwards.
+    """
+
+    query_str = (
+        "INSERT INTO IngestCheckpoint (scope, watermark, synced_at) "
+        "VALUES (:scope, :watermark, now()) "
+        "ON CONFLICT (scope) DO UPDATE SET "
+        "   watermark = GREATEST(IngestCheckpoint.watermark, EXCLUDED.watermark),"
+        "   synced_at = EXCLUDED.synced_at;"
+    )
+
+    conn.run(query_str, scope=scope, watermark=watermark.strftime(PG_TIME_FMT))
+
+
+def create_rate_limit_table(conn: Connection):
+    """
+    Builds the RateLimit table, which spaces out requests to an upstream service
+    across every process sharing the database.
+
+    Schema:
+        key:            VARCHAR(64) PK (one row per rate-limited service)
+        next_slot:      TIMESTAMPTZ (earliest time the next request may be made)
+
+    Fails silently if the table already exists.
+    """
+
+    query_str = (
+        "CREATE TABLE IF NOT EXISTS RateLimit ("
+        "   key            VARCHAR(64) PRIMARY KEY,"
+        "   next_slot      TIMESTAMPTZ NOT NULL"
+        ");"
+    )
+
+    conn.run(query_str)
+
+
+def claim_rate_limit_slot(conn: Connection, key: str, interval_seconds: float) -> float:
+    """
+    Claims the next request slot of a rate-limited service, and returns the number of
+    seconds to wait until that slot (zero or negative if it's already open).
+
+    The claim is a single upsert: concurrent claimers are serialised by the row lock,
+    so each gets a distinct slot at least interval_seconds after the previous one.
+    Times come from the database clock, so claimers don't need synchronised clocks.
+    Must not run inside a longer transaction, or the row stays locked until it ends.
+    """
+
+    query_str = (
+        "INSERT INTO RateLimit AS r (key, next_slot) "
+        "VALUES (:key, clock_timestamp() + make_interval(secs => :interval)) "
+        "ON CONFLICT (key) DO UPDATE SET "
+        "   next_slot = GREATEST(r.next_slot, clock_timestamp())"
+        "       + make_interval(secs => :interval) "
+        "RETURNING EXTRACT(EPOCH FROM r.next_slot - clock_timestamp()) - :interval"
+    )
+
+    res = conn.run(query_str, key=key, interval=interval_seconds)
+
+    return float(res[0][0])
+
+
+def create_ingest_ledger_tables(conn: Connection):
+    """
+    Builds the IngestRun and IngestPage tables, a ledger of ingestion runs and of
+    every page they fetched.
+
+    IngestRun schema:
+        id:             UUID PK
+        scope:          VARCHAR(255) (see IngestCheckpoint)
+        source:         VARCHAR(16) (upstream source name)
+        window_start:   TIMESTAMP (requested updated_at window)
+        window_end:     TIMESTAMP
+        started_at:     TIMESTAMP
+        finished_at:    TIMESTAMP (NULL while running)
+        status:         VARCHAR(16) ('running', 'finished' or 'failed')
+        pages, fetched, inserted, updated, skipped, rejected, commits: INTEGER
+
+    IngestPage schema:
+        run_id:         UUID (IngestRun.id)
+        page:           INTEGER (1 for the first page of the run)
+        window_start:   TIMESTAMP (oldest updated_at parsed from the page)
+        window_end:     TIMESTAMP (newest updated_at parsed from the page)
+        entries, inserted, updated, skipped, rejected: INTEGER
+        fetch_seconds, parse_seconds, load_seconds: REAL
+
+    Fails silently if the tables already exist.
+    """
+
+    conn.run(
+        "CREATE TABLE IF NOT EXISTS IngestRun ("
+        "   id             UUID PRIMARY KEY,"
+        "   scope          VARCHAR(255) NOT NULL,"
+        "   source         VARCHAR(16) NOT NULL,"
+        "   window_start   TIMESTAMP,"
+        "   window_end     TIMESTAMP,"
+        "   started_at     TIMESTAMP NOT NULL,"
+        "   finished_at    TIMESTAMP,"
+        "   status         VARCHAR(16) NOT NULL,"
+        "   pages          INTEGER,"
+        "   fetched        INTEGER,"
+        "   inserted       INTEGER,"
+        "   updated        INTEGER,"
+        "   skipped        INTEGER,"
+        "   rejected       INTEGER,"
+        "   commits        INTEGER"
+        ");"
+    )
+    conn.run(
+        "CREATE INDEX IF NOT EXISTS ingest_run_started_at_idx "
+        "ON IngestRun (started_at);"
+    )
+    conn.run(
+        "CREATE TABLE IF NOT EXISTS IngestPage ("
+        "   run_id         UUID,"
+        "   page           INTEGER,"
+        "   window_start   TIMESTAMP,"
+        "   window_end     TIMESTAMP,"
+        "   entries        INTEGER,"
+        "   inserted       INTEGER,"
+        "   updated        INTEGER,"
+        "   skipped        INTEGER,"
+        "   rejected       INTEGER,"
+        "   fetch_seconds  REAL,"
+        "   parse_seconds  REAL,"
+        "   load_seconds   REAL,"
+        ""
+        "   PRIMARY KEY (run_id, page),"
+        "   FOREIGN KEY (run_id) REFERENCES IngestRun (id) ON DELETE CASCADE"
+        ");"
+    )
+
+
+def insert_ingest_run(
+    conn: Connection,
+    run_id: str,
+    scope: str,
+    source: str,
+    window_start: datetime,
+    window_end: datetime,
+):
+    """
+    Records the start of an ingestion run, with status 'running'.
+    """
+
+    query_str = (
+        "INSERT INTO IngestRun "
+        "(id, scope, source, window_start, window_end, started_at, status) "
+        "VALUES (CAST(:id AS UUID), :scope, :source, :window_start, :window_end, "
+        "   now(), 'running');"
+    )
+
+    conn.run(
+        query_str,
+        id=run_id,
+        scope=scope,
+        source=source,
+        window_start=window_start.strftime(PG_TIME_FMT),
+        window_end=window_end.strftime(PG_TIME_FMT),
+    )
+
+
+def finish_ingest_run(conn: Connection, run_id: str, status: str, totals: dict):
+    """
+    Records the end of an ingestion run, with its final status and totals (a map
+    of the IngestRun counter columns to their values).
+    """
+
+    query_str = (
+        "UPDATE IngestRun SET "
+        "   finished_at = now(), status = :status, "
+        + ", ".join(f"{column} = :{column}" for column in totals)
+        + " WHERE id = CAST(:id AS UUID);"
+    )
+
+    conn.run(query_str, id=run_id, status=status, **totals)
+
+
+def insert_ingest_pages(conn: Connection, run_id: str, pages: list[tuple]):
+    """
+    Inserts the (page, window_start, window_end, entries, inserted, updated, skipped,
+    rejected, fetch_seconds, parse_seconds, load_seconds) rows of a run's pages, in a
+    single statement.
+    """
+
+    query_str = (
+        "INSERT INTO IngestPage (run_id, page, window_start, window_end, entries, "
+        "   inserted, updated, skipped, rejected, "
+        "   fetch_seconds, parse_seconds, load_seconds) "
+        "SELECT CAST(:run_id AS UUID), * FROM unnest("
+        "   CAST(:page AS INTEGER[]),"
+        "   CAST(:window_start AS TIMESTAMP[]),"
+        "   CAST(:window_end AS TIMESTAMP[]),"
+        "   CAST(:entries AS INTEGER[]),"
+        "   CAST(:inserted AS INTEGER[]),"
+        "   CAST(:updated AS INTEGER[]),"
+        "   CAST(:skipped AS INTEGER[]),"
+        "   CAST(:rejected AS INTEGER[]),"
+        "   CAST(:fetch_seconds AS REAL[]),"
+        "   CAST(:parse_seconds AS REAL[]),"
+        "   CAST(:load_seconds AS REAL[])"
+        ");"
+    )
+    columns = [
+        "page",
+        "window_start",
+        "window_end",
+        "entries",
+        "inserted",
+        "updated",
+        "skipped",
+        "rejected",
+        "fetch_seconds",
+        "parse_seconds",
+        "load_seconds",
+    ]
+
+    conn.run(
+        query_str,
+        run_id=run_id,
+        **{column: [row[i] for row in pages] for i, column in enumerate(columns)},
+    )
+
+
+def select_ingest_throughput(
+    conn: Connection, since: datetime
+) -> list[tuple[date, int, int, int, float]]:
+    """
+    Summarizes the finished ingestion runs started since a given time, per day.
+
+    Returns (day, runs, fetched, written, seconds) tuples in chronological order,
+    where written counts inserted and updated articles and seconds is the total
+    duration of the runs.
+    """
+
+    query_str = (
+        "SELECT CAST(date_trunc('day', started_at) AS DATE), COUNT(*), "
+        "   SUM(fetched), SUM(inserted + updated), "
+        "   SUM(EXTRACT(EPOCH FROM finished_at - started_at)) "
+        "FROM IngestRun "
+        "WHERE started_at >= :since AND status = 'finished' "
+        "GROUP BY 1 ORDER BY 1;"
+    )
+
+    res = conn.run(query_str, since=since.strftime(PG_TIME_FMT))
+
+    return [
+        (row[0], int(row[1]), int(row[2]), int(row[3]), float(row[4])) for row in res
+    ]
+
+
+def select_slow_pages(
+    conn: Connection, limit: int = 20, run_id: str | None = None
+) -> list[tuple]:
+    """
+    Lists the slowest pages ingested (by fetch, parse and load time combined), of
+    one run or of every run.
+
+    Returns (run_id, page, entries, fetch_seconds, parse_seconds, load_seconds)
+    tuples, slowest first.
+    """
+
+    query_str = (
+        "SELECT CAST(run_id AS TEXT), page, entries, "
+        "   fetch_seconds, parse_seconds, load_seconds "
+        "FROM IngestPage "
+        + ("WHERE run_id = CAST(:run_id AS UUID) " if run_id is not None else "")
+        + "ORDER BY fetch_seconds + parse_seconds + load_seconds DESC "
+        "LIMIT :limit;"
+    )
+    params = {"limit": limit}
+    if run_id is not None:
+        params["run_id"] = run_id
+
+    res = conn.run(query_str, **params)
+
+    return [tuple(row) for row in res]
+
+
+def create_duplicate_tables(conn: Connection):
+    """
+    Builds the tables of near-duplicate detection: the MinHash signature of every
+    article, the LSH banding index over them, and the articles found to duplicate
+    another (see services.duplicates).
+
+    ArticleSignature schema:
+        article_id:     BIGINT PK (Article.num_id)
+        signature:      INTEGER[] (MinHash values, as signed 32 bit integers)
+
+    ArticleSignatureBand schema:
+        band:           SMALLINT
+        bucket:         BIGINT (hash of the band's signature values)
+        article_id:     BIGINT (Article.num_id)
+
+    DuplicateArticle schema:
+        article_id:     BIGINT PK (Article.num_id, excluded from the trend rollups)
+        canonical_id:   BIGINT (Article.num_id of the first article of its cluster)
+        similarity:     REAL (estimated Jaccard similarity of the abstracts)
+        detected_at:    TIMESTAMP
+
+    Fails silently if the tables already exist.
+    """
+
+    conn.run(
+        "CREATE TABLE IF NOT EXISTS ArticleSignature ("
+        "   article_id     BIGINT PRIMARY KEY,"
+        "   signature      INTEGER[] NOT NULL"
+        ");"
+    )
+    conn.run(
+        "CREATE TABLE IF NOT EXISTS ArticleSignatureBand ("
+        "   band           SMALLINT,"
+        "   bucket         BIGINT,"
+        "   article_id     BIGINT,"
+        ""
+        "   PRIMARY KEY (band, bucket, article_id)"
+        ");"
+    )
+    conn.run(
+        "CREATE INDEX IF NOT EXISTS article_signature_band_article_id_idx "
+        "ON ArticleSignatureBand (article_id);"
+    )
+    conn.run(
+        "CREATE TABLE IF NOT EXISTS DuplicateArticle ("
+        "   article_id     BIGINT PRIMARY KEY,"
+        "   canonical_id   BIGINT NOT NULL,"
+        "   similarity     REAL NOT NULL,"
+        "   detected_at    TIMESTAMP NOT NULL DEFAULT now()"
+        ");"
+    )
+    conn.run(
+        "CREATE INDEX IF NOT EXISTS duplicate_article_canonical_id_idx "
+        "ON DuplicateArticle (canonical_id);"
+    )
+
+
+def delete_article_signatures(conn: Connection, article_ids: list[int]):
+    """
+    Deletes the signatures, bands and duplicate status of the given articles (by
+    num_id), before they are recomputed for a new version of the articles.
+    """
+
+    conn.run(
+        "DELETE FROM ArticleSignatureBand WHERE article_id = ANY(:ids);",
+        ids=article_ids,
+    )
+    conn.run(
+        "DELETE FROM ArticleSignature WHERE article_id = ANY(:ids);", ids=article_ids
+    )
+    conn.run(
+        "DELETE FROM DuplicateArticle WHERE article_id = ANY(:ids);", ids=article_ids
+    )
+
+
+def insert_article_signatures(
+    conn: Connection, article_ids: list[int], signatures: list[list[int]]
+):
+    """
+    Inserts the signatures of the given articles (by num_id) in a single statement.
+    Signatures are lists of signed 32 bit integers, all of the same length.
+    """
+
+    if not article_ids:
+        return
+
+    # a two dimensional array would be flattened by unnest, so signatures are sent
+    # back to back and sliced apart
+    width = len(signatures[0])
+    conn.run(
+        "INSERT INTO ArticleSignature (article_id, signature) "
+        "SELECT ids.article_id, (CAST(:signatures AS INTEGER[]))"
+        "   [(ids.ord - 1) * :width + 1 : ids.ord * :width] "
+        "FROM unnest(CAST(:ids AS BIGINT[])) WITH ORDINALITY AS ids(article_id, ord);",
+        ids=article_ids,
+        signatures=[value for signature in signatures for value in signature],
+        width=width,
+    )
+
+
+def insert_signature_bands(
+    conn: Connection, article_ids: list[int], buckets: list[list[int]]
+):
+    """
+    Adds the given articles (by num_id) to the LSH banding index, buckets holding
+    the bucket of each of their bands.
+    """
+
+    rows = [
+        (article_id, band, bucket)
+        for article_id, article_buckets in zip(article_ids, buckets)
+        for band, bucket in enumerate(article_buckets)
+    ]
+    if not rows:
+        return
+
+    conn.run(
+        "INSERT INTO ArticleSignatureBand (article_id, band, bucket) "
+        "SELECT * FROM unnest("
+        "   CAST(:ids AS BIGINT[]),"
+        "   CAST(:bands AS SMALLINT[]),"
+        "   CAST(:buckets AS BIGINT[])"
+        ") ON CONFLICT DO NOTHING;",
+        ids=[row[0] for row in rows],
+        bands=[row[1] for row in rows],
+        buckets=[row[2] for row in rows],
+    )
+
+
+def select_band_matches(
+    conn: Connection, bands: list[int], buckets: list[int]
+) -> list[tuple[int, int, int]]:
+    """
+    Looks up the articles indexed under any of the given (band, bucket) pairs, as
+    (band, bucket, article num_id) rows. One primary key lookup per pair.
+    """
+
+    if not bands:
+        return []
+
+    query_str = (
+        "SELECT b.band, b.bucket, b.article_id "
+        "FROM unnest(CAST(:bands AS SMALLINT[]), CAST(:buckets AS BIGINT[])) "
+        "   AS q(band, bucket) "
+        "JOIN ArticleSignatureBand b ON b.band = q.band AND b.bucket = q.bucket;"
+    )
+
+    res = conn.run(query_str, bands=bands, buckets=buckets)
+
+    return [tuple(row) for row in res]
+
+
+def select_article_signatures(
+    conn: Connection, article_ids: list[int]
+) -> dict[int, tuple[list[int], int | None]]:
+    """
+    Retrieves the signature of each of the given articles (by num_id), along with
+    the canonical article of its duplicate cluster if it is a duplicate itself.
+    Articles without a signature are absent from the result.
+    """
+
+    if not article_ids:
+        return {}
+
+    query_str = (
+        "SELECT s.article_id, s.signature, d.canonical_id "
+        "FROM ArticleSignature s "
+        "LEFT JOIN DuplicateArticle d ON d.article_id = s.article_id "
+        "WHERE s.article_id = ANY(:ids);"
+    )
+
+    res = conn.run(query_str, ids=article_ids)
+
+    return {row[0]: (row[1], row[2]) for row in res}
+
+
+def insert_duplicate_articles(
+    conn: Connection, duplicates: list[tuple[int, int, float]]
+):
+    """
+    Records (article num_id, canonical num_id, similarity) duplicates, replacing any
+    previous record of the same articles.
+    """
+
+    if not duplicates:
+        return
+
+    conn.run(
+        "INSERT INTO DuplicateArticle (article_id, canonical_id, similarity) "
+        "SELECT * FROM unnest("
+        "   CAST(:ids AS BIGINT[]),"
+        "   CAST(:canonical_ids AS BIGINT[]),"
+        "   CAST(:similarities AS REAL[])"
+        ") ON CONFLICT (article_id) DO UPDATE SET "
+        "   canonical_id = EXCLUDED.canonical_id,"
+        "   similarity = EXCLUDED.similarity,"
+        "   detected_at = now();",
+        ids=[row[0] for row in duplicates],
+        canonical_ids=[row[1] for row in duplicates],
+        similarities=[row[2] for row in duplicates],
+    )
+
+
+def update_duplicate_canonicals(
+    conn: Connection, old_ids: list[int], new_ids: list[int]
+):
+    """
+    Moves the duplicates recorded under each of old_ids (num_ids of canonical
+    articles) to the matching entry of new_ids, in a single statement.
+    """
+
+    if not old_ids:
+        return
+
+    conn.run(
+        "UPDATE DuplicateArticle d SET canonical_id = m.new_id "
+        "FROM unnest(CAST(:old_ids AS BIGINT[]), CAST(:new_ids AS BIGINT[])) "
+        "   AS m(old_id, new_id) "
+        "WHERE d.canonical_id = m.old_id;",
+        old_ids=old_ids,
+        new_ids=new_ids,
+    )
+
+
+def select_duplicate_clusters(
+    conn: Connection, limit: int = 20
+) -> list[tuple[str, list[str]]]:
+    """
+    Retrieves the largest duplicate clusters, as (canonical article id, ids of its
+    duplicates) tuples.
+    """
+
+    query_str = (
+        "SELECT canonical_id, array_agg(article_id ORDER BY article_id) "
+        "FROM DuplicateArticle GROUP BY canonical_id "
+        "ORDER BY COUNT(*) DESC, canonical_id LIMIT :limit;"
+    )
+
+    res = conn.run(query_str, limit=limit)
+
+    return [
+        (decode_arxiv_id(row[0]), [decode_arxiv_id(id_) for id_ in row[1]])
+        for row in res
+    ]
+
+
+def add_article_num_id_column(conn: Connection):
+    """
+    Adds the (initially empty) num_id column to an Article table created before ids
+    were encoded. Fails silently if the column already exists.
+    """
+
+    conn.run("ALTER TABLE Article ADD COLUMN IF NOT EXISTS num_id BIGINT;")
+
+
+def select_article_ids_after(conn: Connection, after: str, limit: int) -> list[str]:
+    """
+    Fetches up to limit article ids greater than after, in id order. Walks the
+    primary key index, so the whole table can be paged through cheaply.
+    """
+
+    query_str = "SELECT id FROM Article WHERE id > :after ORDER BY id LIMIT :limit;"
+
+    res = conn.run(query_str, after=after, limit=limit)
+
+    return [row[0] for row in res]
+
+
+def update_article_num_ids(conn: Connection, ids: list[str], num_ids: list[int]):
+    """
+    Sets the num_id of each article in ids to the matching entry of num_ids, in a
+    single statement.
+    """
+
+    query_str = (
+        "UPDATE Article a SET num_id = m.num_id "
+        "FROM unnest(CAST(:ids AS VARCHAR[]), CAST(:num_ids AS BIGINT[])) "
+        "   AS m(id, num_id) "
+        "WHERE a.id = m.id;"
+    )
+
+    conn.run(query_str, ids=ids, num_ids=num_ids)
+
+
+def constrain_article_num_id(conn: Connection):
+    """
+    Makes Article.num_id mandatory and unique, once every article has one, so it can
+    be referenced by foreign keys.
+    """
+
+    conn.run(
+        "ALTER TABLE Article "
+        "   ALTER COLUMN num_id SET NOT NULL,"
+        "   ADD CONSTRAINT article_num_id_key UNIQUE (num_id);"
+    )
+
+
+def rekey_on_article_num_id(conn: Connection, table: str, primary_key: bool = False):
+    """
+    Replaces the VARCHAR article_id column of a child table by a BIGINT one holding
+    Article.num_id, referencing Article (num_id). Indexes on the old column are
+    dropped with it, and must be recreated by the caller. With primary_key, the new
+    column is made the table's primary key.
+    """
+
+    conn.run(f"ALTER TABLE {table} ADD COLUMN article_num_id BIGINT;")
+    conn.run(
+        f"UPDATE {table} t SET article_num_id = a.num_id "
+        "FROM Article a WHERE a.id = t.article_id;"
+    )
+    conn.run(f"ALTER TABLE {table} DROP COLUMN article_id;")
+    conn.run(f"ALTER TABLE {table} RENAME COLUMN article_num_id TO article_id;")
+    conn.run(
+        f"ALTER TABLE {table} "
+        + ("ADD PRIMARY KEY (article_id), " if primary_key else "")
+        + "ADD FOREIGN KEY (article_id) REFERENCES Article (num_id);"
+    )
+
+
+def create_deferred_ddl_table(conn: Connection):
+    """
+    Builds the DeferredDdl table, which holds the definitions of the indexes and
+    foreign keys dropped for a bulk load (see services.bulk_mode) until they are
+    rebuilt, so they survive a load that crashes midway.
+
+    Schema:
+        name:           VARCHAR(63) PK (index or constraint name)
+        table_name:     VARCHAR(63)
+        kind:           VARCHAR(16) ('index' or 'foreign_key')
+        definition:     TEXT (CREATE INDEX statement, or constraint definition)
+
+    Fails silently if the table already exists.
+    """
+
+    query_str = (
+        "CREATE TABLE IF NOT EXISTS DeferredDdl ("
+        "   name           VARCHAR(63) PRIMARY KEY,"
+        "   table_name     VARCHAR(63) NOT NULL,"
+        "   kind           VARCHAR(16) NOT NULL,"
+        "   definition     TEXT NOT NULL"
+        ");"
+    )
+
+    conn.run(query_str)
+
+
+# oids of the named tables which exist, for matching against the system catalogs
+_TABLE_OIDS = "(SELECT to_regclass(t) FROM unnest(CAST(:tables AS TEXT[])) t)"
+
+
+def select_secondary_indexes(
+    conn: Connection, tables: list[str]
+) -> list[tuple[str, str, str]]:
+    """
+    Lists the (name, table, CREATE INDEX statement) of the non-unique indexes on the
+    given tables. Primary keys and unique indexes are left out, as they enforce
+    constraints rather than only speed up reads. Indexes of partitioned tables are
+    listed once, with a statement building them on every partition.
+    """
+
+    query_str = (
+        "SELECT i.relname, CAST(CAST(x.indrelid AS regclass) AS TEXT), "
+        "   replace(pg_get_indexdef(x.indexrelid), ' ON ONLY ', ' ON ') "
+        "FROM pg_index x "
+        "JOIN pg_class i ON i.oid = x.indexrelid "
+        f"WHERE x.indrelid IN {_TABLE_OIDS} AND NOT x.indisunique "
+        "ORDER BY 1;"
+    )
+
+    res = conn.run(query_str, tables=tables)
+
+    return [tuple(row) for row in res]
+
+
+def select_foreign_keys(
+    conn: Connection, tables: list[str]
+) -> list[tuple[str, str, str]]:
+    """
+    Lists the (name, table, constraint definition) of the foreign keys declared on
+    the given tables. Those Postgres derives for partitions are left out, as they
+    come and go with the declared ones.
+    """
+
+    query_str = (
+        "SELECT c.conname, CAST(CAST(c.conrelid AS regclass) AS TEXT), "
+        "   pg_get_constraintdef(c.oid) "
+        "FROM pg_constraint c "
+        f"WHERE c.contype = 'f' AND c.conrelid IN {_TABLE_OIDS} "
+        "   AND c.conparentid = 0 "
+        "ORDER BY 1;"
+    )
+
+    res = conn.run(query_str, tables=tables)
+
+    return [tuple(row) for row in res]
+
+
+def insert_deferred_ddl(conn: Connection, kind: str, rows: list[tuple[str, str, str]]):
+    """
+    Records (name, table, definition) rows of the given kind in DeferredDdl. Rows
+    already recorded are kept as they are.
+    """
+
+    query_str = (
+        "INSERT INTO DeferredDdl (name, table_name, kind, definition) "
+        "VALUES (:name, :table_name, :kind, :definition) "
+        "ON CONFLICT (name) DO NOTHING;"
+    )
+
+    for name, table_name, definition in rows:
+        conn.run(
+            query_str,
+            name=name,
+            table_name=table_name,
+            kind=kind,
+            definition=definition,
+        )
+
+
+def select_deferred_ddl(conn: Connection, kind: str) -> list[tuple[str, str, str]]:
+    """
+    Lists the (name, table, definition) of the deferred DDL of the given kind.
+    """
+
+    query_str = (
+        "SELECT name, table_name, definition FROM DeferredDdl "
+        "WHERE kind = :kind ORDER BY name;"
+    )
+
+    res = conn.run(query_str, kind=kind)
+
+    return [tuple(row) for row in res]
+
+
+def delete_deferred_ddl(conn: Connection, name: str):
+    """
+    Forgets a deferred index or foreign key, once it has been rebuilt.
+    """
+
+    conn.run("DELETE FROM DeferredDdl WHERE name = :name;", name=name)
+
+
+def drop_index(conn: Connection, name: str):
+    """
+    Drops an index. Fails silently (no-op) if the index does not exist.
+    """
+
+    conn.run(f'DROP INDEX IF EXISTS "{name}";')
+
+
+def drop_constraint(conn: Connection, table: str, name: str):
+    """
+    Drops a constraint of a table. Fails silently (no-op) if it does not exist.
+    """
+
+    conn.run(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS "{name}";')
+
+
+def add_constraint(conn: Connection, table: str, name: str, definition: str):
+    """
+    Adds a constraint, checking the existing rows in a single pass. Errors if any
+    row violates it.
+    """
+
+    conn.run(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition};')
+
+
+def add_constraint_not_valid(conn: Connection, table: str, name: str, definition: str):
+    """
+    Adds a foreign key constraint without checking the existing rows, which is
+    instant. New rows are checked right away, existing ones by validate_constraint.
+    """
+
+    conn.run(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition} NOT VALID;')
+
+
+def validate_constraint(conn: Connection, table: str, name: str):
+    """
+    Checks the existing rows of a table against a constraint added as NOT VALID, in
+    a single set-based pass (a join, for a foreign key) rather than row by row.
+    Errors if any row violates it, in which case it stays NOT VALID.
+    """
+
+    conn.run(f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}";')
+
+
+def analyze_tables(conn: Connection, tables: list[str]):
+    """
+    Refreshes the planner statistics of the given tables.
+    """
+
+    conn.run(f"ANALYZE {', '.join(tables)};")
+
+
+def is_partitioned_table(conn: Connection, table: str) -> bool:
+    """
+    Tells whether a table exists and is partitioned.
+    """
+
+    query_str = (
+        "SELECT relkind = 'p' FROM pg_class "
+        "WHERE oid = to_regclass(CAST(:table AS TEXT));"
+    )
+
+    res = conn.run(query_str, table=table)
+
+    return len(res) > 0 and res[0][0]
+
+
+def create_year_partition(conn: Connection, table: str, year: int):
+    """
+    Creates the partition of a created_at partitioned table holding the rows
+    created during the given year, named {table}_y{year}.
+
+    Fails silently if the partition already exists.
+    """
+
+    query_str = (
+        f"CREATE TABLE IF NOT EXISTS {table}_y{year} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01');"
+    )
+
+    conn.run(query_str)
+
+
+def vacuum_freeze_tables(conn: Connection, tables: list[str]):
+    """
+    Freezes the rows of the given tables and refreshes their statistics, so later
+    vacuums can skip their pages. Cannot run inside a transaction.
+    """
+
+    conn.run(f"VACUUM (FREEZE, ANALYZE) {', '.join(tables)};")
+
+
+def add_created_at_column(conn: Connection, table: str):
+    """
+    Adds the created_at column copied from Article to a child table created before
+    it had one, and fills it in. Should be run inside a transaction.
+    """
+
+    conn.run(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS created_at TIMESTAMP;")
+    conn.run(
+        f"UPDATE {table} t SET created_at = a.created_at "
+        "FROM Article a WHERE a.num_id = t.article_id AND t.created_at IS NULL;"
+    )
@@ -1,79 +1,531 @@
+import time
 import traceback
 import xml.etree.ElementTree as ET
+from contextlib import nullcontext
 from datetime import datetime
+from itertools import batched
+from typing import Generator
 from uuid import uuid4
 
 from pg8000 import DatabaseError
 
+from article import Article
+from arxiv.oai import parse_oai_record_to_article
 from arxiv.parser import parse_entry_to_article
-from db.connection import Pg8000Connection
-from db.queries import select_most_recent_updated_at
-from services.extractors import fetch_article_entries
-from services.sync_article import sync_article
-from utils.logger import LOG
+from arxiv.snapshot import parse_snapshot_line_to_article, read_snapshot_lines
+from db.connection import Connection, Pg8000Connection
+from db.instrumentation import instrument, log_query_summary
+from db.queries import (
+    seed_ingest_checkpoint,
+    select_ingest_checkpoint,
+    upsert_ingest_checkpoint,
+)
+from services.authors import AuthorInterner
+from services.batch_writer import BATCH_COMMIT_SECONDS, BATCH_COMMIT_SIZE, BatchWriter
+from services.bulk_load import BULK_LOAD_BATCH_SIZE, bulk_load_articles
+from services.bulk_mode import bulk_load_mode
+from services.duplicates import DuplicateDetector
+from services.extractors import fetch_article_pages, fetch_oai_pages
+from services.ingest_ledger import IngestLedger, PageStats
+from services.partitions import YearPartitions
+from services.rate_limit import RateLimiter
+from services.refresh_trends import month_of, refresh_trends
+from services.sync_article import find_changed_articles, sync_article
+from services.writer_pool import WRITER_BATCH_SIZE, WriteResult, WriterPool
+from utils.logger import LOG, log_context, set_log_stage
+from utils.profiling import RunProfiler
+from utils.stats import RunStats
 
 # the first arXiv articles were last updated in 1986
 DEFAULT_BACKFILL_START_DATE = datetime(1986, 1, 1)
 LOG_REJECTED_DIR = "log/rejected"
+# checkpoint scope of unfiltered ingestion runs
+INGEST_SCOPE_ALL = "all"
 
+# extractor and parser pairs for each supported upstream source
+#   api: the arXiv search API (minute granularity, one request per 3 seconds)
+#   oai: the arXiv OAI-PMH interface (day granularity, recommended for bulk harvests)
+ARTICLE_SOURCES = {
+    "api": (fetch_article_pages, parse_entry_to_article),
+    "oai": (fetch_oai_pages, parse_oai_record_to_article),
+}
 
-def etl_backfill(backfill_start: datetime, backfill_end: datetime):
+
+def store_reject(content: str, message: str, trace: str | None = None):
+    """
+    Writes a record which could not be ingested to the rejects directory and logs
+    the reason alongside the traceback (by default, the one currently being handled).
+    """
+
+    if trace is None:
+        trace = traceback.format_exc()
+    reject_filepath = f"{LOG_REJECTED_DIR}/{str(uuid4())}"
+    LOG.error(
+        f"ERR: {message}, storing failed record in {reject_filepath}\n"
+        f"Full trace: {trace}"
+    )
+    with open(reject_filepath, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def check_duplicates(
+    conn: Connection, detector: DuplicateDetector, articles: list[Article]
+):
+    """
+    Checks committed articles for near-duplicates, logging (rather than raising)
+    database errors, as the articles themselves are stored either way.
+    """
+
+    try:
+        detector.check(articles)
+    except DatabaseError:
+        conn.run("ROLLBACK;")
+        LOG.error(
+            f"ERR: Failed to check {len(articles)} articles for duplicates\n"
+            f"Full trace: {traceback.format_exc()}"
+        )
+
+
+def etl_backfill(
+    backfill_start: datetime,
+    backfill_end: datetime,
+    source: str = "api",
+    writers: int = 1,
+    commit_every: int = 1,
+    commit_interval: float = BATCH_COMMIT_SECONDS,
+    categories: list[str] | None = None,
+    rate_limiter: RateLimiter | None = None,
+    bulk_mode: bool = False,
+    profile: bool = False,
+    profile_memory_every: int = 0,
+) -> RunStats:
     """
     Runs a backfill ETL process which ingests all arXiv articles between two dates and
-    loads them into the Article table.
+    loads them into the Article table. The upstream source is picked by name from
+    ARTICLE_SOURCES. With categories, only articles listed in any of those categories
+    are fetched (api source only). Requests are spaced out by rate_limiter, which
+    defaults to a limiter local to this process.
+
+    Each fetched page is checked against the stored articles in one query, and only
+    new or changed articles are written. With writers > 1, articles are written by a
+    WriterPool of that many connections while the next pages are being fetched.
+
+    By default each article is committed on its own. With commit_every > 1, articles
+    are committed in batches of that many (or every commit_interval seconds), each
+    within a savepoint so a failing article is rejected without losing the batch.
+
+    Authors are resolved to ids ahead of each page (see AuthorInterner) and written
+    in the same transaction as their article, so an article is never stored without
+    them. Once a page's articles are written, they are checked for near-duplicates
+    with a constant number of queries (see DuplicateDetector). Author resolution,
+    duplicate checks and the ledger run on a connection of their own, so a batch
+    may stay open across pages.
+
+    With bulk_mode, secondary indexes and foreign keys are dropped for the duration
+    of the load and rebuilt afterwards (see services.bulk_mode), and articles are
+    committed in batches of BATCH_COMMIT_SIZE unless commit_every says otherwise.
+    Use it for a first backfill or a rebuild after reset_db, with no other writers.
+
+    The run and the statistics of each page (counts, and time spent fetching,
+    parsing and loading) are recorded in the IngestRun and IngestPage tables. With a
+    writer pool, a page is recorded once all of its writes are reported.
+
+    With profile, the run is profiled with cProfile, and memory allocations are
+    snapshotted every profile_memory_every pages (if set); see RunProfiler.
 
     Makes many HTTP requests so it may take some time to complete.
+    Trend rollups are refreshed afterwards for the months touched by the run.
     """
 
-    conn = Pg8000Connection()
+    if source not in ARTICLE_SOURCES:
+        raise ValueError(f"unknown article source {source}")
+    fetch_pages, parse_entry = ARTICLE_SOURCES[source]
+    fetch_kwargs = {"rate_limiter": rate_limiter}
+    if categories:
+        if source != "api":
+            raise ValueError(f"article source {source} can't filter by category")
+        fetch_kwargs["categories"] = categories
 
-    # extraction loop
-    for entry in fetch_article_entries(backfill_start, backfill_end):
-        # parse and validate
-        try:
-            article = parse_entry_to_article(entry)
-        except ValueError:
-            reject_filepath = f"{LOG_REJECTED_DIR}/{str(uuid4())}"
-            LOG.error(
-                f"ERR: Failed to parse record, storing failed xml in {reject_filepath}\n"
-                f"Full trace: {traceback.format_exc()}"
+    if bulk_mode and commit_every == 1:
+        commit_every = BATCH_COMMIT_SIZE
+
+    conn = instrument(Pg8000Connection())
+    stats = RunStats()
+    # created_at months of every successfully synced article
+    touched_months = set()
+    # articles committed since they were last checked for duplicates
+    written = []
+    # resolves authors and checks duplicates outside of the transactions the
+    # articles are written in, which may stay open across pages
+    side_conn = instrument(Pg8000Connection())
+    interner = AuthorInterner(side_conn)
+    detector = DuplicateDetector(side_conn)
+    partitions = YearPartitions(conn)
+    ledger = IngestLedger(
+        side_conn, ingest_scope(categories), source, backfill_start, backfill_end
+    )
+    pool = None
+    batch_writer = None
+    if writers > 1:
+        pool = WriterPool(
+            writers,
+            lambda: instrument(Pg8000Connection()),
+            batch_size=commit_every if commit_every > 1 else WRITER_BATCH_SIZE,
+        )
+    elif commit_every > 1:
+        batch_writer = BatchWriter(conn, commit_every, commit_interval)
+
+    # write outcomes of the pages not recorded in the ledger yet, by page number, as
+    # [inserted, updated, rejected, writes not reported yet]; with a writer pool, the
+    # writes of a page are reported while later pages are fetched
+    page_writes = {}
+    # statistics of those pages, in page order, waiting for their writes
+    waiting_pages = []
+
+    def record_result(result: WriteResult):
+        # the payload of a write is the number of its page and the source entry
+        page, entry = result.payload
+        writes = page_writes[page]
+        writes[3] -= 1
+        if result.inserted is None:
+            stats.rejected += 1
+            writes[2] += 1
+            store_reject(
+                ET.tostring(entry, encoding="unicode"),
+                f"Failed to persist record (article id: {result.article.id})",
+                result.error,
+            )
+            return
+        if result.inserted:
+            stats.inserted += 1
+            writes[0] += 1
+        else:
+            stats.updated += 1
+            writes[1] += 1
+        touched_months.add(month_of(result.article.created_at))
+        stats.advance_watermark(result.article.updated_at)
+        written.append(result.article)
+
+    def check_written():
+        check_duplicates(side_conn, detector, written)
+        written.clear()
+
+    def record_pages():
+        # records the waiting pages whose writes have all been reported, in order
+        while waiting_pages and page_writes[waiting_pages[0].page][3] == 0:
+            page_stats = waiting_pages.pop(0)
+            inserted, updated, rejected, _ = page_writes.pop(page_stats.page)
+            ledger.record_page(
+                page_stats._replace(
+                    inserted=inserted,
+                    updated=updated,
+                    rejected=page_stats.rejected + rejected,
+                )
+            )
+
+    with (
+        log_context(run_id=ledger.run_id, stage="fetch"),
+        RunProfiler(ledger.run_id, profile, profile_memory_every) as profiler,
+        bulk_load_mode(conn) if bulk_mode else nullcontext(),
+        ledger.recording(stats),
+    ):
+        # extraction loop
+        fetch_started_at = time.perf_counter()
+        for page in fetch_pages(
+            backfill_start, backfill_end, stats=stats, **fetch_kwargs
+        ):
+            parse_started_at = time.perf_counter()
+            set_log_stage("parse")
+            stats.pages += 1
+            stats.fetched += len(page)
+            writes = page_writes[stats.pages] = [0, 0, 0, 0]
+
+            # parse and validate
+            parsed = []
+            parse_rejected = 0
+            for entry in page:
+                try:
+                    parsed.append((entry, parse_entry(entry)))
+                except ValueError:
+                    stats.rejected += 1
+                    parse_rejected += 1
+                    store_reject(
+                        ET.tostring(entry, encoding="unicode"), "Failed to parse record"
+                    )
+
+            # skip articles identical to their stored copy
+            load_started_at = time.perf_counter()
+            set_log_stage("load")
+            changed = find_changed_articles(conn, [article for _, article in parsed])
+            changed_ids = {article.id for article in changed}
+            skipped = len(parsed) - len(changed)
+            stats.skipped += skipped
+            # unchanged articles are as good as written, which lets a scope whose
+            # articles were all written by another one move its checkpoint too
+            for _, article in parsed:
+                if article.id not in changed_ids:
+                    stats.advance_watermark(article.updated_at)
+            created_ats = [article.created_at for article in changed]
+            if batch_writer is not None and partitions.missing(created_ats):
+                # the partition DDL waits for transactions writing the parent tables
+                batch_writer.commit()
+            partitions.ensure(created_ats)
+            # committed ahead, so the articles' transactions can reference them
+            author_ids = interner.resolve(
+                name for article in changed for name in article.authors
+            )
+
+            # transform and persist
+            for entry, article in parsed:
+                if article.id not in changed_ids:
+                    continue
+                writes[3] += 1
+                if pool is not None:
+                    pool.submit(article, (stats.pages, entry), author_ids)
+                    continue
+                try:
+                    if batch_writer is not None:
+                        inserted = batch_writer.write(article, author_ids)
+                    else:
+                        inserted = sync_article(conn, article, author_ids)
+                        stats.commits += 1
+                except (DatabaseError, ValueError):
+                    if batch_writer is None:
+                        conn.run("ROLLBACK;")
+                    record_result(
+                        WriteResult(
+                            0,
+                            article,
+                            (stats.pages, entry),
+                            None,
+                            traceback.format_exc(),
+                        )
+                    )
+                    continue
+                record_result(
+                    WriteResult(0, article, (stats.pages, entry), inserted, None)
+                )
+
+            if pool is not None:
+                for result in pool.results():
+                    record_result(result)
+            check_written()
+
+            # write outcomes are added once all of them are reported
+            updated_ats = [article.updated_at for _, article in parsed]
+            waiting_pages.append(
+                PageStats(
+                    stats.pages,
+                    min(updated_ats, default=None),
+                    max(updated_ats, default=None),
+                    len(page),
+                    0,
+                    0,
+                    skipped,
+                    parse_rejected,
+                    parse_started_at - fetch_started_at,
+                    load_started_at - parse_started_at,
+                    time.perf_counter() - load_started_at,
+                )
             )
-            with open(reject_filepath, "w", encoding="utf-8") as f:
-                f.write(ET.tostring(entry, encoding="unicode"))
-            continue
+            record_pages()
+            profiler.page_done(stats.pages)
+            fetch_started_at = time.perf_counter()
+            set_log_stage("fetch")
+
+        if pool is not None:
+            for result in pool.close():
+                record_result(result)
+            stats.commits += pool.commits
+            record_pages()
+        if batch_writer is not None:
+            batch_writer.commit()
+            stats.commits += batch_writer.commits
+            check_written()
+        side_conn.close()
 
-        # transform and persist
+    with log_context(run_id=ledger.run_id, stage="trends"):
         try:
-            sync_article(conn, article)
-        except (DatabaseError, ValueError):
+            refresh_trends(conn, touched_months)
+        except DatabaseError:
             conn.run("ROLLBACK;")
-            reject_filepath = f"{LOG_REJECTED_DIR}/{str(uuid4())}"
             LOG.error(
-                f"ERR: Failed to persist record, storing failed xml in {reject_filepath}\n"
-                f"Article id: {article.id}\n"
+                "ERR: Failed to refresh trend rollups, run rebuild_trends to recover\n"
                 f"Full trace: {traceback.format_exc()}"
             )
-            with open(reject_filepath, "w", encoding="utf-8") as f:
-                f.write(ET.tostring(entry, encoding="unicode"))
 
-    conn.close()
+        conn.close()
+
+        LOG.info(f"backfill finished: {stats.summary()}")
+        log_query_summary()
+    return stats
+
+
+def ingest_scope(categories: list[str] | None = None) -> str:
+    """
+    Names the ingestion scope covering the given categories, under which its
+    checkpoint is stored. The unfiltered scope is "all".
+    """
+    if not categories:
+        return INGEST_SCOPE_ALL
+    return ",".join(sorted(set(categories)))
 
 
-def etl_backfill_auto():
+def etl_backfill_auto(
+    source: str = "api",
+    categories: list[str] | None = None,
+    rate_limiter: RateLimiter | None = None,
+    profile: bool = False,
+    profile_memory_every: int = 0,
+) -> RunStats:
     """
-    Runs the ETL backfill process. Automatically selects start and end dates by the
-    following rules:
-      - Start date is the most recent (by updated_at) article in the Article table, or
-        Jan 1, 1986 if the table is empty.
+    Runs the ETL backfill process against the given source, optionally scoped to a set
+    of categories (and profiled, see etl_backfill). Automatically selects start and
+    end dates by the following rules:
+      - Start date is the checkpoint of the scope. A scope without one starts from
+        the checkpoint of the full corpus ("all"), or Jan 1, 1986 if there is none.
       - End date is datetime.now().
+
+    Each scope keeps its own checkpoint, so small, high-priority scopes can be synced
+    often while the full corpus is synced less frequently. The first run on a
+    database without checkpoints seeds the "all" one from the most recent article,
+    so an earlier bootstrap (driver.py, snapshot import) isn't fetched again.
     """
 
+    scope = ingest_scope(categories)
+
     conn = Pg8000Connection()
-    backfill_start = select_most_recent_updated_at(conn)
+    seed_ingest_checkpoint(conn, INGEST_SCOPE_ALL)
+    backfill_start = select_ingest_checkpoint(conn, scope)
+    if backfill_start is None and scope != INGEST_SCOPE_ALL:
+        # the progress of other category scopes says nothing about this one
+        backfill_start = select_ingest_checkpoint(conn, INGEST_SCOPE_ALL)
     conn.close()
     if backfill_start is None:
         backfill_start = DEFAULT_BACKFILL_START_DATE
 
     backfill_end = datetime.now()
 
-    etl_backfill(backfill_start, backfill_end)
+    stats = etl_backfill(
+        backfill_start,
+        backfill_end,
+        source=source,
+        categories=categories,
+        rate_limiter=rate_limiter,
+        profile=profile,
+        profile_memory_every=profile_memory_every,
+    )
+
+    # everything up to the last written article is in; the boundary minute is
+    # re-fetched next time, and unchanged articles are skipped
+    if stats.watermark is not None:
+        conn = Pg8000Connection()
+        upsert_ingest_checkpoint(conn, scope, stats.watermark)
+        conn.close()
+        LOG.info(f"checkpoint of scope {scope} moved to {stats.watermark}")
+
+    return stats
+
+
+def parse_snapshot(snapshot_path: str) -> Generator[Article]:
+    """
+    Streams Articles out of an arXiv metadata snapshot file. Lines which fail to
+    parse are stored as rejects and skipped.
+    """
+
+    for line in read_snapshot_lines(snapshot_path):
+        try:
+            yield parse_snapshot_line_to_article(line)
+        except ValueError:
+            store_reject(line, "Failed to parse snapshot record")
+
+
+def etl_import_snapshot(
+    snapshot_path: str,
+    catch_up: bool = True,
+    batch_size: int = BULK_LOAD_BATCH_SIZE,
+    bulk_mode: bool = False,
+    profile: bool = False,
+    profile_memory_every: int = 0,
+):
+    """
+    Bootstraps the database from an arXiv metadata snapshot file (JSON lines).
+
+    The file is streamed and loaded in batches through COPY, so memory use is bounded
+    by the batch size rather than the file size. Afterwards, if catch_up is set, a
+    regular backfill picks up everything updated since the newest snapshot record.
+    With bulk_mode, the batches are loaded with secondary indexes and foreign keys
+    dropped, and those are rebuilt once at the end (see services.bulk_mode). Each
+    loaded batch is checked for near-duplicates (see DuplicateDetector). With
+    profile, the import is profiled as in etl_backfill, counting batches as pages.
+    """
+
+    conn = instrument(Pg8000Connection())
+    interner = AuthorInterner(conn)
+    partitions = YearPartitions(conn)
+    detector = DuplicateDetector(conn)
+    touched_months = set()
+    snapshot_end = None
+    loaded_count = 0
+
+    with (
+        RunProfiler(f"snapshot-{uuid4()}", profile, profile_memory_every) as profiler,
+        bulk_load_mode(conn) if bulk_mode else nullcontext(),
+    ):
+        for batch_number, batch in enumerate(
+            batched(parse_snapshot(snapshot_path), batch_size), start=1
+        ):
+            try:
+                rejected = bulk_load_articles(conn, list(batch), interner, partitions)
+            except DatabaseError:
+                # fall back to loading the batch one article at a time to isolate the
+                # offending record(s)
+                conn.run("ROLLBACK;")
+                LOG.error(
+                    "ERR: Failed to bulk load batch, retrying one article at a time\n"
+                    f"Full trace: {traceback.format_exc()}"
+                )
+                rejected = []
+                author_ids = interner.resolve(
+                    name for article in batch for name in article.authors
+                )
+                for article in batch:
+                    try:
+                        sync_article(conn, article, author_ids)
+                    except (DatabaseError, ValueError):
+                        conn.run("ROLLBACK;")
+                        rejected.append(article)
+
+            rejected_ids = {article.id for article in rejected}
+            for article in rejected:
+                LOG.error(f"ERR: Failed to load snapshot article {article.id}")
+            check_duplicates(
+                conn,
+                detector,
+                [article for article in batch if article.id not in rejected_ids],
+            )
+            for article in batch:
+                if article.id in rejected_ids:
+                    continue
+                loaded_count += 1
+                touched_months.add(month_of(article.created_at))
+                if snapshot_end is None or article.updated_at > snapshot_end:
+                    snapshot_end = article.updated_at
+
+            LOG.info(f"loaded {loaded_count} snapshot articles (up to {snapshot_end})")
+            profiler.page_done(batch_number)
+
+    try:
+        refresh_trends(conn, touched_months)
+    except DatabaseError:
+        conn.run("ROLLBACK;")
+        LOG.error(
+            "ERR: Failed to refresh trend rollups, run rebuild_trends to recover\n"
+            f"Full trace: {traceback.format_exc()}"
+        )
+
+    conn.close()
+    log_query_summary()
+
+    if catch_up and snapshot_end is not None:
+        etl_backfill(snapshot_end, datetime.now())
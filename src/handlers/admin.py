@@ -5,7 +5,15 @@ Serves as an entry point for AWS Lambda.
 
 import json
 
+from db.connection import Pg8000Connection
+from services.article_ids import migrate_article_ids
+from services.bulk_mode import exit_bulk_load_mode
+from services.keyword_storage import migrate_to_array_layout
+from services.partitions import PARTITION_SCHEME, freeze_year, migrate_child_created_at
 from services.reset_db import reset_db
+from utils.logger import configure_logging, flush_logging
+
+configure_logging()
 
 
 def handler(event, context):
@@ -13,12 +21,23 @@ def handler(event, context):
     match (event["method"]):
         case "reset":
             res = reset_db_handler()
+        case "migrate_keyword_counts":
+            res = migrate_keyword_counts_handler()
+        case "migrate_article_ids":
+            res = migrate_article_ids_handler()
+        case "restore_bulk_mode":
+            res = restore_bulk_mode_handler()
+        case "migrate_child_created_at":
+            res = migrate_child_created_at_handler()
+        case "freeze_year":
+            res = freeze_year_handler(int(event["year"]))
         case _:
             res = {
                 "statusCode": 400,
                 "body": json.dumps("Invalid method."),
             }
 
+    flush_logging()
     return res
 
 
@@ -28,3 +47,54 @@ def reset_db_handler():
         "statusCode": 200,
         "body": json.dumps("Article table dropped and recreated!"),
     }
+
+
+def migrate_keyword_counts_handler():
+    conn = Pg8000Connection()
+    migrate_to_array_layout(conn, partitioned=PARTITION_SCHEME == "year")
+    conn.close()
+    return {
+        "statusCode": 200,
+        "body": json.dumps("KeywordOccurrence migrated to KeywordCounts!"),
+    }
+
+
+def migrate_article_ids_handler():
+    conn = Pg8000Connection()
+    migrate_article_ids(conn)
+    conn.close()
+    return {
+        "statusCode": 200,
+        "body": json.dumps("Article ids migrated to BIGINT keys!"),
+    }
+
+
+def restore_bulk_mode_handler():
+    # rebuilds the indexes and foreign keys left dropped by a crashed bulk load
+    conn = Pg8000Connection()
+    exit_bulk_load_mode(conn)
+    conn.close()
+    return {
+        "statusCode": 200,
+        "body": json.dumps("Deferred indexes and foreign keys rebuilt!"),
+    }
+
+
+def migrate_child_created_at_handler():
+    conn = Pg8000Connection()
+    migrate_child_created_at(conn)
+    conn.close()
+    return {
+        "statusCode": 200,
+        "body": json.dumps("created_at copied into the child tables!"),
+    }
+
+
+def freeze_year_handler(year: int):
+    conn = Pg8000Connection()
+    freeze_year(conn, year)
+    conn.close()
+    return {
+        "statusCode": 200,
+        "body": json.dumps(f"Partitions of {year} frozen!"),
+    }
@@ -0,0 +1,79 @@
+"""
+Handler file for scheduled ingestion.
+Serves as an entry point for AWS Lambda, invoked by AWS EventBridge schedules.
+
+Each schedule passes the scope it syncs, e.g. a frequent one for the archives
+analysts care most about and a daily one for the full corpus:
+    {"categories": ["cs.*", "stat.ML"]}
+    {}
+
+Requests are rate limited through the database, so overlapping invocations stay
+within arXiv's limit combined, whichever source (API or OAI-PMH) each one uses.
+
+An invocation can be profiled (reports are written under /tmp/profiles, and the top
+functions logged), optionally with memory snapshots every N pages:
+    {"profile": true, "profile_memory_every": 20}
+"""
+
+import json
+
+from etl import ARTICLE_SOURCES, etl_backfill_auto
+from services.extractors import API_RATE_LIMIT_KEY, API_RATE_LIMIT_SECONDS
+from services.rate_limit import PgRateLimiter
+from utils.logger import configure_logging, flush_logging
+
+configure_logging()
+
+
+def parse_flag(value) -> bool:
+    """
+    Reads a boolean flag of an event, either a JSON boolean or the string "true" or
+    "false" (as some schedulers only pass strings). Raises ValueError otherwise.
+    """
+
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    raise ValueError(f"invalid flag value {value!r}")
+
+
+def handler(event, context):
+    source = event.get("source", "api")
+    categories = event.get("categories") or None
+
+    if source not in ARTICLE_SOURCES:
+        return {
+            "statusCode": 400,
+            "body": json.dumps("Invalid source."),
+        }
+    try:
+        profile = parse_flag(event.get("profile", False))
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps(str(e)),
+        }
+
+    rate_limiter = PgRateLimiter(API_RATE_LIMIT_KEY, API_RATE_LIMIT_SECONDS)
+    try:
+        stats = etl_backfill_auto(
+            source=source,
+            categories=categories,
+            rate_limiter=rate_limiter,
+            profile=profile,
+            profile_memory_every=int(event.get("profile_memory_every", 0)),
+        )
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps(str(e)),
+        }
+    finally:
+        rate_limiter.close()
+        flush_logging()
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps(stats.summary()),
+    }
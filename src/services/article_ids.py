@@ -0,0 +1,64 @@
+from arxiv.ids import encode_arxiv_id
+from db.connection import Connection
+from db.queries import (
+    add_article_num_id_column,
+    add_created_at_column,
+    constrain_article_num_id,
+    create_article_category_table,
+    create_keyword_occurrence_table,
+    create_keyword_occurrence_view,
+    drop_keyword_occurrence_view,
+    rekey_on_article_num_id,
+    select_article_ids_after,
+    update_article_num_ids,
+)
+from services.keyword_storage import KEYWORD_LAYOUT
+from services.populate_reference_tables import populate_archive_prefix_table
+from utils.logger import LOG
+
+# articles encoded per UPDATE round trip
+ARTICLE_ID_MIGRATION_BATCH_SIZE = 10000
+
+
+def migrate_article_ids(
+    conn: Connection,
+    layout: str = KEYWORD_LAYOUT,
+    batch_size: int = ARTICLE_ID_MIGRATION_BATCH_SIZE,
+):
+    """
+    Converts a database keyed on VARCHAR article ids to the BIGINT encoded ids of
+    arxiv.ids, in a single transaction: fills in Article.num_id, then rekeys
+    Article_Category and the keyword tables of the given layout on it. Raises a
+    ValueError (after rolling back) if a stored id can't be encoded.
+    """
+
+    conn.run("START TRANSACTION;")
+    try:
+        populate_archive_prefix_table(conn)
+        add_article_num_id_column(conn)
+
+        migrated = 0
+        after = ""
+        while ids := select_article_ids_after(conn, after, batch_size):
+            update_article_num_ids(conn, ids, [encode_arxiv_id(id_) for id_ in ids])
+            migrated += len(ids)
+            after = ids[-1]
+            LOG.info(f"encoded {migrated} article ids")
+        constrain_article_num_id(conn)
+
+        rekey_on_article_num_id(conn, "Article_Category")
+        create_article_category_table(conn)
+        if layout == "array":
+            drop_keyword_occurrence_view(conn)
+            rekey_on_article_num_id(conn, "KeywordCounts", primary_key=True)
+            # the view reads the created_at added by migrate_child_created_at
+            add_created_at_column(conn, "KeywordCounts")
+            create_keyword_occurrence_view(conn)
+        else:
+            rekey_on_article_num_id(conn, "KeywordOccurrence")
+            create_keyword_occurrence_table(conn)
+    except ValueError:
+        conn.run("ROLLBACK;")
+        raise
+    conn.run("COMMIT;")
+    LOG.info("article ids migrated to encoded BIGINT keys")
@@ -0,0 +1,108 @@
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable
+
+from article import Article
+from db.connection import Connection
+from db.queries import (
+    delete_article_authors_for_articles,
+    insert_article_authors,
+    upsert_authors,
+)
+
+# normalized author names (and their ids) kept in memory by an AuthorInterner
+AUTHOR_CACHE_SIZE = 100_000
+
+
+def normalize_author_name(name: str) -> str:
+    """
+    Reduces an author name to the key authors are deduplicated on: unicode-normalized,
+    case-folded, with runs of whitespace collapsed.
+    """
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+class AuthorInterner:
+    """
+    Resolves author names to Author ids, through an LRU cache of normalized name to
+    id. A batch of names costs at most one query, a multi-row upsert of the names
+    which missed the cache, so authors seen recently (most of them, in a steady sync)
+    are resolved without touching the database.
+
+    Upserts commit on their own, so resolve() must not run inside a transaction
+    which may be rolled back, or ids of authors rolled back would be cached.
+    """
+
+    def __init__(self, conn: Connection, max_size: int = AUTHOR_CACHE_SIZE):
+        self.conn = conn
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, names: Iterable[str]) -> dict[str, int]:
+        """Returns a map from the normalized form of each name to its author id."""
+
+        resolved = {}
+        missing = {}
+        for name in names:
+            key = normalize_author_name(name)
+            if key in resolved or key in missing:
+                continue
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                resolved[key] = self.cache[key]
+            else:
+                missing[key] = name
+
+        self.hits += len(resolved)
+        self.misses += len(missing)
+        if missing:
+            created = upsert_authors(
+                self.conn, list(missing.values()), list(missing.keys())
+            )
+            resolved.update(created)
+            self.cache.update(created)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+
+        return resolved
+
+
+def article_author_rows(
+    articles: Iterable[Article], author_ids: dict[str, int]
+) -> list[tuple[str, int, int, datetime]]:
+    """
+    Lists the (article id, position, author id, created_at) join entries of the given
+    articles, from a map of normalized names to author ids as returned by
+    AuthorInterner.
+    """
+    return [
+        (
+            article.id,
+            position,
+            author_ids[normalize_author_name(name)],
+            article.created_at,
+        )
+        for article in articles
+        for position, name in enumerate(article.authors)
+    ]
+
+
+def write_article_authors(
+    conn: Connection, articles: list[Article], author_ids: dict[str, int]
+):
+    """
+    Replaces the stored authors of the given articles, from a map of normalized
+    names to author ids resolved ahead by an AuthorInterner. Runs within the
+    caller's transaction, so the authors are stored along with the articles (and
+    the content hash covering them). Takes two queries however many articles.
+    """
+
+    if not articles:
+        return
+    delete_article_authors_for_articles(conn, [article.id for article in articles])
+    rows = article_author_rows(articles, author_ids)
+    if rows:
+        insert_article_authors(conn, rows)
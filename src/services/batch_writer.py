@@ -0,0 +1,85 @@
+import time
+
+from pg8000 import DatabaseError
+
+from article import Article
+from db.connection import Connection
+from services.sync_article import write_article
+
+# defaults for how often a BatchWriter commits
+BATCH_COMMIT_SIZE = 100
+BATCH_COMMIT_SECONDS = 5.0
+
+
+class BatchWriter:
+    """
+    Writes articles through a single connection, committing every batch_size articles
+    or every max_batch_seconds, whichever comes first, instead of once per article.
+
+    Each article is written inside its own savepoint. If an article fails, only its
+    savepoint is rolled back and the error is re-raised for the caller to reject the
+    article; the rest of the batch stays in the open transaction.
+
+    Call commit() once the last article has been written.
+    """
+
+    def __init__(
+        self,
+        conn: Connection,
+        batch_size: int = BATCH_COMMIT_SIZE,
+        max_batch_seconds: float = BATCH_COMMIT_SECONDS,
+    ):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.max_batch_seconds = max_batch_seconds
+        # articles written (or rejected) since the transaction was opened
+        self.pending = 0
+        self.batch_started_at = None
+        self.commits = 0
+
+    def write(self, article: Article, author_ids: dict[str, int] | None = None) -> bool:
+        """
+        Writes an article (and its authors, given their ids; see write_article) into
+        the current batch, opening a transaction if needed, and commits the batch if
+        it is due.
+
+        Returns True if the article was inserted, False if it was updated. Raises
+        the underlying error if the article could not be written.
+        """
+
+        if self.batch_started_at is None:
+            self.conn.run("START TRANSACTION;")
+            self.batch_started_at = time.monotonic()
+
+        self.pending += 1
+        self.conn.run("SAVEPOINT article;")
+        try:
+            inserted = write_article(self.conn, article, author_ids)
+        except (DatabaseError, ValueError):
+            self.conn.run("ROLLBACK TO SAVEPOINT article;")
+            self.conn.run("RELEASE SAVEPOINT article;")
+            self._commit_if_due()
+            raise
+        self.conn.run("RELEASE SAVEPOINT article;")
+
+        self._commit_if_due()
+        return inserted
+
+    def commit(self):
+        """Commits the open batch, if there is one."""
+
+        if self.batch_started_at is None:
+            return
+        try:
+            self.conn.run("COMMIT;")
+        finally:
+            self.pending = 0
+            self.batch_started_at = None
+        self.commits += 1
+
+    def _commit_if_due(self):
+        if (
+            self.pending >= self.batch_size
+            or time.monotonic() - self.batch_started_at >= self.max_batch_seconds
+        ):
+            self.commit()
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Generator
+
+from pg8000 import DatabaseError
+
+from db.connection import Connection, Pg8000Connection
+from db.queries import (
+    add_constraint,
+    add_constraint_not_valid,
+    analyze_tables,
+    create_deferred_ddl_table,
+    delete_deferred_ddl,
+    drop_constraint,
+    drop_index,
+    insert_deferred_ddl,
+    is_partitioned_table,
+    select_deferred_ddl,
+    select_foreign_keys,
+    select_secondary_indexes,
+    validate_constraint,
+)
+from utils.logger import LOG
+
+# tables whose secondary indexes and foreign keys are dropped during a bulk load
+BULK_MODE_TABLES = [
+    "Article",
+    "Article_Category",
+    "Article_Author",
+    "KeywordOccurrence",
+    "KeywordCounts",
+]
+# indexes kept through a bulk load: a backfill still replaces the children of each
+# article it writes (DELETE ... WHERE article_id), which turns into a scan of the
+# whole table per article without them
+BULK_MODE_KEPT_INDEXES = [
+    "article_category_article_id_idx",
+    "keyword_occurrence_article_id_idx",
+]
+# connections building indexes at once when leaving bulk mode
+BULK_MODE_INDEX_WORKERS = 4
+# memory each index build may use for sorting
+BULK_MODE_MAINTENANCE_WORK_MEM = "512MB"
+
+
+def enter_bulk_load_mode(conn: Connection, tables: list[str] = BULK_MODE_TABLES):
+    """
+    Drops the secondary indexes and foreign keys of the given tables, recording
+    their definitions in DeferredDdl first, in a single transaction. Primary keys and
+    unique constraints are kept, as upserts rely on them, and so are the indexes in
+    BULK_MODE_KEPT_INDEXES, which the per-article writes rely on.
+
+    Re-entering after a crashed load is safe: the definitions still recorded are
+    kept, and rebuilt by the next exit_bulk_load_mode.
+    """
+
+    create_deferred_ddl_table(conn)
+
+    conn.run("START TRANSACTION;")
+    indexes = [
+        index
+        for index in select_secondary_indexes(conn, tables)
+        if index[0] not in BULK_MODE_KEPT_INDEXES
+    ]
+    foreign_keys = select_foreign_keys(conn, tables)
+    insert_deferred_ddl(conn, "index", indexes)
+    insert_deferred_ddl(conn, "foreign_key", foreign_keys)
+    for name, table, _ in foreign_keys:
+        drop_constraint(conn, table, name)
+    for name, _, _ in indexes:
+        drop_index(conn, name)
+    conn.run("COMMIT;")
+
+    LOG.info(
+        f"bulk load mode: dropped {len(indexes)} indexes "
+        f"and {len(foreign_keys)} foreign keys"
+    )
+
+
+def _build_index(
+    connection_factory: Callable[[], Connection], name: str, definition: str
+):
+    with connection_factory() as conn:
+        conn.run(f"SET maintenance_work_mem = '{BULK_MODE_MAINTENANCE_WORK_MEM}';")
+        conn.run(definition)
+        delete_deferred_ddl(conn, name)
+    LOG.info(f"bulk load mode: rebuilt index {name}")
+
+
+def exit_bulk_load_mode(
+    conn: Connection,
+    connection_factory: Callable[[], Connection] = Pg8000Connection,
+    index_workers: int = BULK_MODE_INDEX_WORKERS,
+):
+    """
+    Rebuilds everything dropped by enter_bulk_load_mode, then refreshes the planner
+    statistics of the affected tables:
+      - indexes are built in parallel, each on its own connection
+      - foreign keys are added as NOT VALID, then validated one set-based pass each
+
+    A foreign key failing validation (some loaded rows violate it) is logged and
+    left NOT VALID, so it is still enforced for new rows. Partitioned tables don't
+    support NOT VALID foreign keys, so theirs are validated as they are added; one
+    failing is logged and stays recorded, to be retried by the next exit.
+    """
+
+    indexes = select_deferred_ddl(conn, "index")
+    foreign_keys = select_deferred_ddl(conn, "foreign_key")
+
+    with ThreadPoolExecutor(max_workers=index_workers) as executor:
+        futures = [
+            executor.submit(_build_index, connection_factory, name, definition)
+            for name, _, definition in indexes
+        ]
+        for future in futures:
+            future.result()
+
+    for name, table, definition in foreign_keys:
+        if is_partitioned_table(conn, table):
+            conn.run("START TRANSACTION;")
+            try:
+                add_constraint(conn, table, name, definition)
+            except DatabaseError as e:
+                conn.run("ROLLBACK;")
+                LOG.error(f"ERR: Loaded rows of {table} violate {name}, not added: {e}")
+                continue
+            delete_deferred_ddl(conn, name)
+            conn.run("COMMIT;")
+            continue
+        conn.run("START TRANSACTION;")
+        add_constraint_not_valid(conn, table, name, definition)
+        delete_deferred_ddl(conn, name)
+        conn.run("COMMIT;")
+        try:
+            validate_constraint(conn, table, name)
+        except DatabaseError as e:
+            LOG.error(
+                f"ERR: Loaded rows of {table} violate {name}, left NOT VALID: {e}"
+            )
+
+    tables = sorted({table for _, table, _ in indexes + foreign_keys})
+    if tables:
+        analyze_tables(conn, tables)
+
+    LOG.info(
+        f"bulk load mode: rebuilt {len(indexes)} indexes "
+        f"and {len(foreign_keys)} foreign keys"
+    )
+
+
+@contextmanager
+def bulk_load_mode(
+    conn: Connection,
+    connection_factory: Callable[[], Connection] = Pg8000Connection,
+    tables: list[str] = BULK_MODE_TABLES,
+) -> Generator[None]:
+    """
+    Runs the enclosed load with the secondary indexes and foreign keys of tables
+    dropped, and rebuilds them afterwards (also if the load fails). Meant for loads
+    which rewrite a large part of the tables, such as the first backfill, where
+    building indexes once is much faster than maintaining them row by row. Other
+    writers should be stopped meanwhile, as their rows go unchecked until the
+    rebuild.
+    """
+
+    enter_bulk_load_mode(conn, tables)
+    try:
+        yield
+    finally:
+        exit_bulk_load_mode(conn, connection_factory)
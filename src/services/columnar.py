@@ -0,0 +1,222 @@
+import os
+
+import numpy as np
+
+from arxiv.ids import decode_arxiv_id
+from db.connection import STREAM_BATCH_SIZE, Connection
+from db.queries import iter_article_columns, iter_distinct_titles
+from utils.logger import LOG
+
+# column files of a columnar snapshot, one .npy each, and their dtypes
+#   id:                     Article.num_id (see arxiv.ids.decode_arxiv_id)
+#   created_at, updated_at: per article
+#   category_*, keyword_*:  CSR-style; the values of article i are
+#                           values[offsets[i]:offsets[i + 1]]
+#   title_code:             per article, index into the title store
+#   title_offsets, title_bytes: the title store, the UTF-8 of every distinct title
+#                           back to back, in sorted order
+SNAPSHOT_COLUMNS = {
+    "id": np.int64,
+    "created_at": "datetime64[s]",
+    "updated_at": "datetime64[s]",
+    "category_offsets": np.int64,
+    "category_ids": np.int32,
+    "keyword_offsets": np.int64,
+    "keyword_ids": np.int32,
+    "keyword_totals": np.int32,
+    "title_code": np.int32,
+    "title_offsets": np.int64,
+    "title_bytes": np.uint8,
+}
+# articles processed at a time by the group-by helpers, bounding their memory use
+GROUPBY_CHUNK_ARTICLES = 1_000_000
+
+
+class _ColumnWriter:
+    """
+    Appends batches of values to a raw file, converted into an .npy file once the
+    final length is known. Neither step holds the whole column in memory.
+    """
+
+    def __init__(self, output_dir: str, name: str, dtype):
+        self.path = os.path.join(output_dir, f"{name}.npy")
+        self.raw_path = self.path + ".raw"
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self.file = open(self.raw_path, "wb")
+
+    def append(self, values):
+        array = np.asarray(values, dtype=self.dtype)
+        array.tofile(self.file)
+        self.length += len(array)
+
+    def finish(self):
+        self.file.close()
+        if self.length:
+            column = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=self.dtype, shape=(self.length,)
+            )
+            column[:] = np.memmap(self.raw_path, dtype=self.dtype, mode="r")
+            column.flush()
+            del column
+        else:
+            np.save(self.path, np.empty(0, dtype=self.dtype))
+        os.remove(self.raw_path)
+
+
+def build_columnar_snapshot(
+    conn: Connection, output_dir: str, batch_size: int = STREAM_BATCH_SIZE
+) -> int:
+    """
+    Writes the articles, their categories and keyword counts to output_dir as one
+    .npy file per column of SNAPSHOT_COLUMNS, to be opened with
+    ColumnarSnapshot. Rows are streamed from the database in batches of
+    batch_size, and reads run in a single REPEATABLE READ transaction, so the
+    snapshot is consistent even while articles are being ingested.
+
+    Returns the number of articles written.
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+    writers = {
+        name: _ColumnWriter(output_dir, name, dtype)
+        for name, dtype in SNAPSHOT_COLUMNS.items()
+    }
+    for name in ("category_offsets", "keyword_offsets", "title_offsets"):
+        writers[name].append([0])
+    category_end = keyword_end = title_end = 0
+
+    conn.run("START TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;")
+    try:
+        for rows in iter_article_columns(conn, batch_size):
+            writers["id"].append([row[0] for row in rows])
+            writers["created_at"].append([row[1] for row in rows])
+            writers["updated_at"].append([row[2] for row in rows])
+            writers["title_code"].append([row[3] for row in rows])
+
+            category_lengths = np.array([len(row[4]) for row in rows])
+            keyword_lengths = np.array([len(row[5]) for row in rows])
+            writers["category_offsets"].append(
+                category_end + np.cumsum(category_lengths)
+            )
+            writers["keyword_offsets"].append(keyword_end + np.cumsum(keyword_lengths))
+            category_end += int(category_lengths.sum())
+            keyword_end += int(keyword_lengths.sum())
+            writers["category_ids"].append([c for row in rows for c in row[4]])
+            writers["keyword_ids"].append([k for row in rows for k in row[5]])
+            writers["keyword_totals"].append([t for row in rows for t in row[6]])
+
+        for titles in iter_distinct_titles(conn, batch_size):
+            encoded = [(title or "").encode("utf-8") for title in titles]
+            writers["title_offsets"].append(
+                title_end + np.cumsum([len(title) for title in encoded])
+            )
+            title_end += sum(len(title) for title in encoded)
+            writers["title_bytes"].append(np.frombuffer(b"".join(encoded), np.uint8))
+        conn.run("COMMIT;")
+    except Exception:
+        conn.run("ROLLBACK;")
+        for writer in writers.values():
+            writer.file.close()
+            os.remove(writer.raw_path)
+        raise
+
+    for writer in writers.values():
+        writer.finish()
+
+    articles = writers["id"].length
+    LOG.info(f"wrote a columnar snapshot of {articles} articles to {output_dir}")
+    return articles
+
+
+class ColumnarSnapshot:
+    """
+    A columnar snapshot written by build_columnar_snapshot. Columns are
+    memory-mapped read-only attributes named as in SNAPSHOT_COLUMNS (e.g.
+    snapshot.created_at), so opening one is instant and only the pages read are
+    loaded.
+    """
+
+    def __init__(self, path: str):
+        for name in SNAPSHOT_COLUMNS:
+            setattr(
+                self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            )
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def article_id(self, i: int) -> str:
+        """The arXiv id of the article at row i."""
+        return decode_arxiv_id(int(self.id[i]))
+
+    def title(self, i: int) -> str:
+        """The title of the article at row i."""
+        code = self.title_code[i]
+        start, end = self.title_offsets[code], self.title_offsets[code + 1]
+        return self.title_bytes[start:end].tobytes().decode("utf-8")
+
+    def months(self) -> np.ndarray:
+        """Every month from the oldest to the newest created_at, as datetime64[M]."""
+        if not len(self):
+            return np.empty(0, dtype="datetime64[M]")
+        first = self.created_at.min().astype("datetime64[M]")
+        last = self.created_at.max().astype("datetime64[M]")
+        return np.arange(first, last + np.timedelta64(1, "M"))
+
+    def _month_indexes(self, months: np.ndarray):
+        # yields (first row, end row, index in months of each row's month) per chunk
+        for start in range(0, len(self), GROUPBY_CHUNK_ARTICLES):
+            end = min(start + GROUPBY_CHUNK_ARTICLES, len(self))
+            month = self.created_at[start:end].astype("datetime64[M]")
+            yield start, end, (month - months[0]).astype(np.int64)
+
+    def article_counts_per_month(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (months, articles created in each month)."""
+
+        months = self.months()
+        counts = np.zeros(len(months), dtype=np.int64)
+        for _, _, month_index in self._month_indexes(months):
+            counts += np.bincount(month_index, minlength=len(months))
+        return months, counts
+
+    def _counts_per_month(
+        self, offsets: np.ndarray, values: np.ndarray, weights: np.ndarray | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        months = self.months()
+        width = int(values.max()) + 1 if len(values) else 0
+        counts = np.zeros((len(months), width), dtype=np.int64)
+        for start, end, month_index in self._month_indexes(months):
+            first, last = offsets[start], offsets[end]
+            value_month = np.repeat(month_index, np.diff(offsets[start : end + 1]))
+            counts += (
+                np.bincount(
+                    value_month * width + values[first:last],
+                    weights=None if weights is None else weights[first:last],
+                    minlength=len(months) * width,
+                )
+                .astype(np.int64)
+                .reshape(len(months), width)
+            )
+        return months, counts
+
+    def keyword_counts_per_month(
+        self, occurrences: bool = False
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (months, counts), counts[m, k] being the number of articles created
+        in months[m] mentioning keyword k, or with occurrences, the number of times
+        they mention it.
+        """
+        return self._counts_per_month(
+            self.keyword_offsets,
+            self.keyword_ids,
+            self.keyword_totals if occurrences else None,
+        )
+
+    def category_counts_per_month(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (months, counts), counts[m, c] being the number of articles created
+        in months[m] in category c.
+        """
+        return self._counts_per_month(self.category_offsets, self.category_ids, None)
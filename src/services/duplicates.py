@@ -0,0 +1,149 @@
+import os
+
+import numpy as np
+
+from article import Article
+from arxiv.ids import decode_arxiv_id, encode_arxiv_id
+from db.connection import Connection
+from db.queries import (
+    create_duplicate_tables,
+    delete_article_signatures,
+    insert_article_signatures,
+    insert_duplicate_articles,
+    insert_signature_bands,
+    select_article_signatures,
+    select_band_matches,
+    update_duplicate_canonicals,
+)
+from utils.logger import LOG
+from utils.minhash import LshIndex, band_buckets, minhash_signature
+
+# set ARXIN_DUPLICATE_DETECTION=0 to skip near-duplicate detection during ingestion
+DUPLICATE_DETECTION = os.environ.get("ARXIN_DUPLICATE_DETECTION", "1") == "1"
+# estimated Jaccard similarity of abstract shingles from which articles are duplicates
+DUPLICATE_THRESHOLD = float(os.environ.get("ARXIN_DUPLICATE_THRESHOLD", "0.8"))
+
+
+class DuplicateDetector:
+    """
+    Finds near-duplicate abstracts (cross-listings, re-submissions under a new id)
+    as articles are ingested. Each article gets a MinHash signature of its abstract,
+    stored in ArticleSignature and indexed by LSH band in ArticleSignatureBand, so
+    it is only compared with the few stored articles sharing a band with it rather
+    than with the whole corpus.
+
+    An article at least threshold similar to an indexed one is recorded in
+    DuplicateArticle, under the canonical article of that one's cluster (the first
+    indexed), and left out of the trend rollups. A canonical article is never
+    matched with its own duplicates; if a new version of it matches another
+    cluster, its duplicates move to that cluster. A disabled detector does nothing.
+    """
+
+    def __init__(
+        self,
+        conn: Connection,
+        threshold: float = DUPLICATE_THRESHOLD,
+        enabled: bool = DUPLICATE_DETECTION,
+    ):
+        self.conn = conn
+        self.threshold = threshold
+        self.enabled = enabled
+        self.tables_ready = False
+
+    def check(self, articles: list[Article]) -> list[tuple[str, str, float]]:
+        """
+        Indexes a batch of (already stored) articles and records those duplicating
+        an indexed article, or an earlier one of the batch, in a transaction of its
+        own. Takes a constant number of queries however large the batch. Articles
+        indexed before (older versions) are indexed anew.
+
+        Returns the (article id, canonical article id, similarity) duplicates found.
+        """
+
+        if not self.enabled or not articles:
+            return []
+        if not self.tables_ready:
+            create_duplicate_tables(self.conn)
+            self.tables_ready = True
+
+        # the latest version of each article wins
+        signatures = {}
+        for article in articles:
+            try:
+                num_id = encode_arxiv_id(article.id)
+            except ValueError:
+                continue
+            signatures[num_id] = minhash_signature(article.abstract)
+        signed = {
+            num_id: (signature, band_buckets(signature))
+            for num_id, signature in signatures.items()
+            if signature is not None
+        }
+
+        index, canonical_of = self._stored_candidates(signed)
+        duplicates = []
+        for num_id, (signature, buckets) in signed.items():
+            # a canonical article is compared with its own duplicates, which must
+            # not make it one of them
+            own_cluster = {key for key, c in canonical_of.items() if c == num_id}
+            match = index.best_match(signature, buckets, self.threshold, own_cluster)
+            canonical_of[num_id] = num_id
+            if match is not None:
+                canonical = canonical_of[match[0]]
+                duplicates.append((num_id, canonical, match[1]))
+                # the cluster the article headed (if any) joins the one it matched
+                for key in own_cluster | {num_id}:
+                    canonical_of[key] = canonical
+            index.add(num_id, signature, buckets)
+
+        self.conn.run("START TRANSACTION;")
+        delete_article_signatures(self.conn, list(signatures))
+        insert_article_signatures(
+            self.conn,
+            list(signed),
+            [signature.view(np.int32).tolist() for signature, _ in signed.values()],
+        )
+        insert_signature_bands(
+            self.conn, list(signed), [buckets for _, buckets in signed.values()]
+        )
+        insert_duplicate_articles(self.conn, duplicates)
+        update_duplicate_canonicals(
+            self.conn,
+            [duplicate[0] for duplicate in duplicates],
+            [duplicate[1] for duplicate in duplicates],
+        )
+        self.conn.run("COMMIT;")
+
+        if duplicates:
+            LOG.info(f"found {len(duplicates)} near-duplicate article(s)")
+        return [
+            (decode_arxiv_id(num_id), decode_arxiv_id(canonical_id), similarity)
+            for num_id, canonical_id, similarity in duplicates
+        ]
+
+    def _stored_candidates(self, signed: dict) -> tuple[LshIndex, dict[int, int]]:
+        # loads the stored articles sharing a band with any of the batch into an
+        # index, along with the canonical article of each; articles of the batch
+        # are left out, as their stored signatures are about to be replaced
+        pairs = {
+            (band, bucket)
+            for _, buckets in signed.values()
+            for band, bucket in enumerate(buckets)
+        }
+        matches = select_band_matches(
+            self.conn, [pair[0] for pair in pairs], [pair[1] for pair in pairs]
+        )
+        matches = [match for match in matches if match[2] not in signed]
+        stored = select_article_signatures(
+            self.conn, list({match[2] for match in matches})
+        )
+
+        index = LshIndex()
+        canonical_of = {}
+        for article_id, (signature, canonical_id) in stored.items():
+            index.signatures[article_id] = np.array(signature, np.int32).view(np.uint32)
+            canonical_of[article_id] = canonical_id or article_id
+        for band, bucket, article_id in matches:
+            if article_id in stored:
+                index.buckets[(band, bucket)].append(article_id)
+        return index, canonical_of
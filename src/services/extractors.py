@@ -3,62 +3,209 @@ import xml.etree.ElementTree as ET
 from datetime import datetime
 from typing import Generator
 
+import requests
+
+from arxiv.oai import (
+    OAI_BASE_URL,
+    OAI_DEFAULT_METADATA_PREFIX,
+    build_oai_list_records_url,
+    extract_oai_records,
+    extract_resumption_token,
+    fetch_oai_page,
+    is_oai_record_deleted,
+)
 from arxiv.parser import (
     extract_article_entries,
+    extract_id_from_entry,
     extract_total_results,
     extract_updated_at_from_entry,
 )
 from arxiv.request import fetch_articles_from_arxiv_api
+from services.page_size import AdaptivePageSize
+from services.pagination import PaginationCursor
+from services.rate_limit import LocalRateLimiter, RateLimiter
 from utils.logger import LOG
+from utils.stats import RunStats
 
+API_RATE_LIMIT_SECONDS = 3
+# the API and OAI-PMH are both served by export.arxiv.org, whose limit they share,
+# so ingestions claim request slots from the same PgRateLimiter key
+API_RATE_LIMIT_KEY = "arxiv_export"
+# consecutive failed requests tolerated before giving up on the API
+API_MAX_RETRIES = 5
 
-def fetch_article_entries(
-    start_time: datetime, end_time: datetime
-) -> Generator[ET.Element]:
+
+def fetch_article_pages(
+    start_time: datetime,
+    end_time: datetime,
+    page_size: AdaptivePageSize | None = None,
+    stats: RunStats | None = None,
+    categories: list[str] | None = None,
+    rate_limiter: RateLimiter | None = None,
+) -> Generator[list[ET.Element]]:
     """
-    Fetch all arXiv article entries from the given time range. Results are yielded as a
-    a generator of XML Elements.
+    Fetch all arXiv article entries from the given time range, optionally restricted
+    to the given categories (see build_arxiv_query_url). Results are yielded page by
+    page, as lists of XML Elements. Each entry is yielded once, even though
+    consecutive pages overlap on their boundary minute.
+
+    The max_results of each request is picked by page_size, which grows while the API
+    keeps up and shrinks after a timeout or a malformed or truncated response (the
+    page is then retried). The sizes used are recorded in stats, if given.
 
     Makes a series of API calls while respecting the rate limit of once per 3 seconds,
-    so this function may take some time to run for larger time ranges.
+    so this function may take some time to run for larger time ranges. A slot is
+    claimed from rate_limiter before every request; pass a shared one (see
+    PgRateLimiter) when other processes may be calling the API at the same time.
     """
 
-    api_rate_limit_seconds = 3
+    if page_size is None:
+        page_size = AdaptivePageSize()
+    if rate_limiter is None:
+        rate_limiter = LocalRateLimiter(API_RATE_LIMIT_SECONDS)
 
-    # Use date-based 'pagination' where articles are retrieved 1000 at a time with a
+    # Use date-based 'pagination' where articles are retrieved a page at a time with a
     # sliding date window. The API result provides a number for all (remaining) matches
-    # so iteration stops once this number equals the amount of articles in the actual response
-    has_more_articles = True
-    while has_more_articles:
-        LOG.info(f"ingesting articles from {start_time}...")
-        # fetch a page from the api
+    # so iteration stops once this number equals the amount of articles in the actual
+    # response. See PaginationCursor for how the boundary minute is handled.
+    cursor = PaginationCursor(start_time, end_time)
+    failures = 0
+    while not cursor.done:
+        window_start, window_end = cursor.query_window()
+        max_results = page_size.size
+        LOG.info(
+            f"ingesting {max_results} articles from {window_start} "
+            f"(offset {cursor.offset})..."
+        )
+        # fetch a page from the api, blocking to respect the rate limit
+        rate_limiter.wait()
+        request_started_at = time.monotonic()
+        try:
+            xml_page = fetch_articles_from_arxiv_api(
+                window_start,
+                window_end,
+                max_results,
+                cursor.offset,
+                stats=stats,
+                categories=categories,
+            )
+            total_matches = extract_total_results(xml_page)
+            page_entries = extract_article_entries(xml_page)
+            # the API occasionally answers with fewer entries than it reports
+            expected_entries = min(max_results, total_matches - cursor.offset)
+            if len(page_entries) < expected_entries:
+                raise ET.ParseError(
+                    f"page truncated to {len(page_entries)} of {expected_entries} "
+                    "entries"
+                )
+        except (ET.ParseError, requests.Timeout, requests.ConnectionError) as e:
+            failures += 1
+            if failures > API_MAX_RETRIES:
+                LOG.error("arXiv API is malfunctioning")
+                break
+            page_size.record_failure()
+            if stats is not None:
+                stats.page_retries += 1
+            LOG.info(
+                f"arXiv API request failed ({e}), retrying with {page_size.size} "
+                "results per page"
+            )
+            continue
+        elapsed = time.monotonic() - request_started_at
+        failures = 0
+        if stats is not None:
+            stats.page_sizes.append(max_results)
+        page_size.record_success(elapsed, len(page_entries) == max_results)
+
+        page_keys = [
+            (extract_id_from_entry(entry), extract_updated_at_from_entry(entry))
+            for entry in page_entries
+        ]
+
+        # yield the articles in the page not emitted by a previous one
+        new_entries = [
+            entry
+            for entry, (id_, _) in zip(page_entries, page_keys)
+            if not cursor.has_emitted(id_)
+        ]
+        if len(new_entries) < len(page_entries):
+            LOG.info(
+                f"skipped {len(page_entries) - len(new_entries)} entries already seen "
+                "on a previous page"
+            )
+        yield new_entries
+
+        cursor.advance(page_keys, total_matches, max_results)
+
+
+def fetch_article_entries(
+    start_time: datetime,
+    end_time: datetime,
+    page_size: AdaptivePageSize | None = None,
+) -> Generator[ET.Element]:
+    """
+    Fetch all arXiv article entries from the given time range, as a flat generator of
+    XML Elements. See fetch_article_pages.
+    """
+    for page in fetch_article_pages(start_time, end_time, page_size):
+        yield from page
+
+
+def fetch_oai_pages(
+    start_time: datetime,
+    end_time: datetime,
+    metadata_prefix: str = OAI_DEFAULT_METADATA_PREFIX,
+    base_url: str = OAI_BASE_URL,
+    stats: RunStats | None = None,
+    rate_limiter: RateLimiter | None = None,
+) -> Generator[list[ET.Element]]:
+    """
+    Harvest all arXiv OAI-PMH records from the given time range (day granularity).
+    Results are yielded page by page, as lists of XML <record> Elements; deletion
+    notices are skipped. Page sizes are picked by the server, and recorded in stats
+    if given.
+
+    Follows resumption tokens until the server reports the list is complete, claiming
+    a slot from rate_limiter before each request like fetch_article_pages does.
+    """
+
+    if rate_limiter is None:
+        rate_limiter = LocalRateLimiter(API_RATE_LIMIT_SECONDS)
+
+    query_url = build_oai_list_records_url(
+        start_time, end_time, metadata_prefix, base_url=base_url
+    )
+    while True:
+        LOG.info(f"harvesting OAI records with {query_url}...")
+        rate_limiter.wait()
         try:
-            xml_page = fetch_articles_from_arxiv_api(start_time, end_time)
+            xml_page = fetch_oai_page(query_url)
         except ET.ParseError:
-            LOG.error("arXiv API is malfunctioning")
+            LOG.error("arXiv OAI interface is malfunctioning")
             break
-        total_matches = extract_total_results(xml_page)
-        page_entries = extract_article_entries(xml_page)
 
-        # iterate through and yield articles in the page
-        for entry in page_entries:
-            yield entry
+        records = extract_oai_records(xml_page)
+        if stats is not None:
+            stats.page_sizes.append(len(records))
+        yield [record for record in records if not is_oai_record_deleted(record)]
 
-        # break out when current page contains all remaining results
-        if len(page_entries) == total_matches:
-            has_more_articles = False
+        resumption_token = extract_resumption_token(xml_page)
+        if resumption_token is None:
+            break
+        query_url = build_oai_list_records_url(
+            start_time, end_time, resumption_token=resumption_token, base_url=base_url
+        )
 
-        # slide up start_time to exclude current page
-        try:
-            start_time = next(
-                filter(
-                    lambda x: x is not None,
-                    map(extract_updated_at_from_entry, reversed(page_entries)),
-                )
-            )
-        except StopIteration:
-            LOG.error("ERR: couldn't find next pagination window, stopping iteration")
-            has_more_articles = False
 
-        # block to respect the rate limit
-        time.sleep(api_rate_limit_seconds)
+def fetch_oai_records(
+    start_time: datetime,
+    end_time: datetime,
+    metadata_prefix: str = OAI_DEFAULT_METADATA_PREFIX,
+    base_url: str = OAI_BASE_URL,
+) -> Generator[ET.Element]:
+    """
+    Harvest all arXiv OAI-PMH records from the given time range, as a flat generator
+    of XML <record> Elements. See fetch_oai_pages.
+    """
+    for page in fetch_oai_pages(start_time, end_time, metadata_prefix, base_url):
+        yield from page
@@ -0,0 +1,135 @@
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Generator, NamedTuple
+from uuid import uuid4
+
+from pg8000 import DatabaseError
+
+from db.connection import Connection
+from db.queries import (
+    create_ingest_ledger_tables,
+    finish_ingest_run,
+    insert_ingest_pages,
+    insert_ingest_run,
+)
+from utils.logger import LOG
+from utils.stats import RunStats
+
+# pages recorded per IngestPage insert
+INGEST_LEDGER_FLUSH_PAGES = 50
+
+# statistics of one fetched page, as stored in IngestPage
+#   window_start/window_end span the updated_at of the entries parsed from the page
+PageStats = NamedTuple(
+    "PageStats",
+    [
+        ("page", int),
+        ("window_start", datetime | None),
+        ("window_end", datetime | None),
+        ("entries", int),
+        ("inserted", int),
+        ("updated", int),
+        ("skipped", int),
+        ("rejected", int),
+        ("fetch_seconds", float),
+        ("parse_seconds", float),
+        ("load_seconds", float),
+    ],
+)
+
+
+class IngestLedger:
+    """
+    Records an ingestion run in IngestRun, and the statistics of each of its pages
+    in IngestPage. Pages are buffered and inserted flush_pages at a time, so the
+    ledger costs a couple of queries per run plus one per flush_pages pages.
+
+    Ledger writes never fail the run: errors are logged, and the rows lost.
+    """
+
+    def __init__(
+        self,
+        conn: Connection,
+        scope: str,
+        source: str,
+        window_start: datetime,
+        window_end: datetime,
+        flush_pages: int = INGEST_LEDGER_FLUSH_PAGES,
+    ):
+        self.conn = conn
+        self.run_id = str(uuid4())
+        self.scope = scope
+        self.source = source
+        self.window_start = window_start
+        self.window_end = window_end
+        self.flush_pages = flush_pages
+        self.pending = []
+
+    def _write(self, description: str, write, *args):
+        try:
+            write(self.conn, *args)
+        except DatabaseError:
+            self.conn.run("ROLLBACK;")
+            LOG.error(
+                f"ERR: Failed to record {description} of ingest run {self.run_id}\n"
+                f"Full trace: {traceback.format_exc()}"
+            )
+
+    def start(self):
+        """Records the run as running. Creates the ledger tables if needed."""
+        self._write("the ledger tables", create_ingest_ledger_tables)
+        self._write(
+            "the start",
+            insert_ingest_run,
+            self.run_id,
+            self.scope,
+            self.source,
+            self.window_start,
+            self.window_end,
+        )
+
+    def record_page(self, page: PageStats):
+        """
+        Buffers the statistics of a page, flushing the buffer once it is full. Must
+        be called outside of any open transaction.
+        """
+        self.pending.append(page)
+        if len(self.pending) >= self.flush_pages:
+            self.flush()
+
+    def flush(self):
+        """Inserts the buffered pages."""
+        if not self.pending:
+            return
+        self._write("the pages", insert_ingest_pages, self.run_id, self.pending)
+        self.pending = []
+
+    def finish(self, stats: RunStats, status: str = "finished"):
+        """Flushes the buffered pages and records the totals of the run."""
+        self.flush()
+        totals = {
+            "pages": stats.pages,
+            "fetched": stats.fetched,
+            "inserted": stats.inserted,
+            "updated": stats.updated,
+            "skipped": stats.skipped,
+            "rejected": stats.rejected,
+            "commits": stats.commits,
+        }
+        self._write("the end", finish_ingest_run, self.run_id, status, totals)
+
+    @contextmanager
+    def recording(self, stats: RunStats) -> Generator[None]:
+        """
+        Records the enclosed run: started on entry, and finished with the totals of
+        stats on exit, as 'failed' if an exception escapes.
+        """
+
+        self.start()
+        try:
+            yield
+        except BaseException:
+            self.finish(stats, "failed")
+            raise
+        self.finish(stats)
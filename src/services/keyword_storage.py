@@ -0,0 +1,87 @@
+import os
+from datetime import datetime
+
+from db.connection import Connection
+from db.queries import (
+    create_keyword_counts_table,
+    create_keyword_occurrence_table,
+    create_keyword_occurrence_view,
+    delete_keyword_counts_for_article,
+    delete_keyword_occurrences_for_article,
+    insert_keyword_occurrence,
+    migrate_keyword_occurrences_to_counts,
+    upsert_keyword_counts,
+)
+from utils.keywords import KEYWORD_LIST
+from utils.logger import LOG
+
+# how keyword counts are stored
+#   rows:  KeywordOccurrence table, one row per (article, keyword) hit
+#   array: KeywordCounts table, one SMALLINT[] of counts per article, with a
+#          KeywordOccurrence view presenting the rows shape to readers
+KEYWORD_LAYOUTS = ("rows", "array")
+KEYWORD_LAYOUT = os.environ.get("ARXIN_KEYWORD_LAYOUT", "rows")
+if KEYWORD_LAYOUT not in KEYWORD_LAYOUTS:
+    raise ValueError(f"unknown keyword layout {KEYWORD_LAYOUT}")
+
+SMALLINT_MAX = 32767
+
+
+def keyword_counts_array(counts: dict[int, int]) -> list[int]:
+    """
+    Converts a map from keyword ids to counts into a dense list indexed by keyword id.
+    Counts are capped to fit a SMALLINT.
+    """
+    dense = [0] * len(KEYWORD_LIST)
+    for kw_id, total in counts.items():
+        dense[kw_id] = min(total, SMALLINT_MAX)
+    return dense
+
+
+def create_keyword_storage(
+    conn: Connection, layout: str = KEYWORD_LAYOUT, partitioned: bool = False
+):
+    """Builds the tables (and view) holding keyword counts in the given layout."""
+    if layout == "array":
+        create_keyword_counts_table(conn, partitioned)
+        create_keyword_occurrence_view(conn)
+    else:
+        create_keyword_occurrence_table(conn, partitioned)
+
+
+def write_keyword_counts(
+    conn: Connection,
+    article_id: str,
+    created_at: datetime,
+    counts: dict[int, int],
+    layout: str = KEYWORD_LAYOUT,
+):
+    """
+    Replaces the stored keyword counts of an article created at created_at. Runs
+    within the caller's transaction.
+    """
+
+    if layout == "array":
+        if any(counts.values()):
+            upsert_keyword_counts(
+                conn, article_id, keyword_counts_array(counts), created_at
+            )
+        else:
+            delete_keyword_counts_for_article(conn, article_id)
+        return
+
+    delete_keyword_occurrences_for_article(conn, article_id)
+    for kw_id, total in counts.items():
+        insert_keyword_occurrence(conn, article_id, kw_id, total, created_at)
+
+
+def migrate_to_array_layout(conn: Connection, partitioned: bool = False):
+    """
+    Converts stored keyword occurrences from the rows layout to the array layout, in
+    a single transaction. Set ARXIN_KEYWORD_LAYOUT=array for writers afterwards.
+    """
+
+    conn.run("START TRANSACTION;")
+    migrate_keyword_occurrences_to_counts(conn, partitioned)
+    conn.run("COMMIT;")
+    LOG.info("keyword occurrences migrated to the array layout")
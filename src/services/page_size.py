@@ -0,0 +1,51 @@
+from arxiv.request import API_RESULTS_CAP, API_TIMEOUT_SECONDS
+
+# bounds and starting point for the max_results of API requests
+PAGE_SIZE_MIN = 100
+PAGE_SIZE_START = 1000
+PAGE_SIZE_MAX = API_RESULTS_CAP
+
+# a full page answered within this many seconds counts as fast enough to grow from
+PAGE_FAST_SECONDS = API_TIMEOUT_SECONDS / 4
+
+
+class AdaptivePageSize:
+    """
+    Picks the max_results of each API request. Starts conservatively and grows after
+    full pages which were answered quickly and parsed cleanly, and halves after a
+    timeout or a malformed/truncated response, always staying within the given bounds.
+
+    The size is grown gently and shrunk sharply, so it settles just below the largest
+    page the API reliably serves.
+    """
+
+    def __init__(
+        self,
+        min_size: int = PAGE_SIZE_MIN,
+        max_size: int = PAGE_SIZE_MAX,
+        start_size: int = PAGE_SIZE_START,
+        fast_seconds: float = PAGE_FAST_SECONDS,
+        growth_factor: float = 1.5,
+    ):
+        if not 0 < min_size <= start_size <= max_size:
+            raise ValueError(
+                f"invalid page size bounds: {min_size} <= {start_size} <= {max_size}"
+            )
+        self.min_size = min_size
+        self.max_size = max_size
+        self.fast_seconds = fast_seconds
+        self.growth_factor = growth_factor
+        self.size = start_size
+
+    def record_success(self, elapsed_seconds: float, page_was_full: bool):
+        """
+        Records a well-formed response. Only full pages say anything about whether a
+        larger page would have been served, so partial pages leave the size alone.
+        """
+
+        if page_was_full and elapsed_seconds <= self.fast_seconds:
+            self.size = min(self.max_size, int(self.size * self.growth_factor))
+
+    def record_failure(self):
+        """Records a timeout or malformed response and shrinks the page size."""
+        self.size = max(self.min_size, self.size // 2)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+ONE_MINUTE = timedelta(minutes=1)
+
+
+def floor_to_minute(timestamp: datetime) -> datetime:
+    """Drops the seconds from a timestamp, matching the API's query granularity."""
+    return timestamp.replace(second=0, microsecond=0)
+
+
+class PaginationCursor:
+    """
+    Tracks progress through the arXiv API's lastUpdatedDate-sorted results.
+
+    Queries can only be bounded to the minute, so consecutive windows overlap on the
+    boundary minute. The cursor remembers which ids it has already emitted within that
+    minute so they can be skipped. When a single minute holds more entries than fit
+    on a page, the window is narrowed to that minute and paged through by offset
+    until it is exhausted, after which the cursor moves on to the next minute.
+    """
+
+    def __init__(self, start_time: datetime, end_time: datetime):
+        self.window_start = floor_to_minute(start_time)
+        self.end_time = end_time
+        # offset > 0 means the window is narrowed to the single minute window_start
+        self.offset = 0
+        # ids already emitted whose updated_at falls within window_start's minute
+        self.seen_ids = set()
+        self.done = False
+
+    def query_window(self) -> tuple[datetime, datetime]:
+        """Returns the (start_time, end_time) bounds for the next request."""
+        if self.offset > 0:
+            return self.window_start, self.window_start
+        return self.window_start, self.end_time
+
+    def has_emitted(self, id_: str | None) -> bool:
+        """Checks whether an entry was already emitted from an overlapping window."""
+        return id_ is not None and id_ in self.seen_ids
+
+    def advance(
+        self,
+        page_keys: list[tuple[str | None, datetime | None]],
+        total_matches: int,
+        page_size: int,
+    ):
+        """
+        Moves the cursor past a page of results, given the (id, updated_at) of every
+        entry on the page in order, the total matches reported for the query, and the
+        max_results the page was requested with.
+        """
+
+        if self.offset > 0:
+            self._advance_within_minute(page_keys, total_matches)
+            return
+
+        # current page contains all remaining results
+        if len(page_keys) == total_matches or not page_keys:
+            self.done = True
+            return
+
+        timestamps = [ts for _, ts in page_keys if ts is not None]
+        if not timestamps:
+            self.done = True
+            return
+
+        last_minute = floor_to_minute(timestamps[-1])
+        boundary_ids = {
+            id_
+            for id_, ts in page_keys
+            if ts is not None and floor_to_minute(ts) == last_minute
+        }
+
+        if last_minute > self.window_start:
+            # slide up to the boundary minute, which the next page will re-fetch
+            self.window_start = last_minute
+            self.seen_ids = boundary_ids
+        else:
+            # the whole page shares the window's first minute, so re-querying the same
+            # window would return the same page; page through the minute by offset
+            self.seen_ids |= boundary_ids
+            if len(page_keys) >= page_size:
+                self.offset = len(page_keys)
+            else:
+                self._next_minute()
+
+    def _advance_within_minute(
+        self,
+        page_keys: list[tuple[str | None, datetime | None]],
+        total_matches: int,
+    ):
+        self.seen_ids |= {id_ for id_, _ in page_keys}
+        self.offset += len(page_keys)
+        if not page_keys or self.offset >= total_matches:
+            self._next_minute()
+
+    def _next_minute(self):
+        self.window_start += ONE_MINUTE
+        self.offset = 0
+        self.seen_ids = set()
+        if self.window_start > self.end_time:
+            self.done = True
@@ -0,0 +1,107 @@
+import os
+from datetime import datetime
+from typing import Iterable
+
+from db.connection import Connection
+from db.queries import (
+    add_created_at_column,
+    create_keyword_occurrence_view,
+    create_year_partition,
+    drop_keyword_occurrence_view,
+    vacuum_freeze_tables,
+)
+from services.keyword_storage import KEYWORD_LAYOUT
+from utils.logger import LOG
+
+# how Article and its child tables are partitioned
+#   none: plain tables
+#   year: range partitions per created_at year, created as ingestion reaches them
+# created_at is used rather than updated_at as it never changes, so revisions never
+# move rows (and all their child rows) across partitions
+PARTITION_SCHEMES = ("none", "year")
+PARTITION_SCHEME = os.environ.get("ARXIN_PARTITION_SCHEME", "none")
+if PARTITION_SCHEME not in PARTITION_SCHEMES:
+    raise ValueError(f"unknown partition scheme {PARTITION_SCHEME}")
+
+# partitioned tables, parents first
+ARTICLE_TABLE = "Article"
+CHILD_TABLES = ["Article_Category", "Article_Author"]
+KEYWORD_TABLES = {"rows": "KeywordOccurrence", "array": "KeywordCounts"}
+
+
+def partitioned_tables(layout: str = KEYWORD_LAYOUT) -> list[str]:
+    """Lists the tables partitioned alongside Article, with Article first."""
+    return [ARTICLE_TABLE, *CHILD_TABLES, KEYWORD_TABLES[layout]]
+
+
+class YearPartitions:
+    """
+    Creates the yearly partitions of Article and its child tables as ingestion
+    reaches new created_at years. Years already ensured are remembered, so a steady
+    sync costs no queries; a no-op unless the partition scheme is "year".
+    """
+
+    def __init__(
+        self,
+        conn: Connection,
+        scheme: str = PARTITION_SCHEME,
+        layout: str = KEYWORD_LAYOUT,
+    ):
+        self.conn = conn
+        self.enabled = scheme == "year"
+        self.tables = partitioned_tables(layout)
+        self.years = set()
+
+    def missing(self, created_ats: Iterable[datetime]) -> bool:
+        """Tells whether ensure() would create partitions for the given created_ats."""
+        return self.enabled and any(
+            created_at.year not in self.years for created_at in created_ats
+        )
+
+    def ensure(self, created_ats: Iterable[datetime]):
+        """
+        Creates the partitions of every given created_at year missing from the
+        tables. Must run outside of the transaction writing the rows, as the DDL
+        locks the parent tables.
+        """
+
+        if not self.enabled:
+            return
+        for year in sorted({created_at.year for created_at in created_ats}):
+            if year in self.years:
+                continue
+            for table in self.tables:
+                create_year_partition(self.conn, table, year)
+            self.years.add(year)
+            LOG.info(f"partitions ensured for {year}")
+
+
+def freeze_year(conn: Connection, year: int, layout: str = KEYWORD_LAYOUT):
+    """
+    Freezes the partitions of a past created_at year, which ingestion no longer
+    writes to (except for revisions), so anti-wraparound vacuums skip them.
+    """
+
+    vacuum_freeze_tables(
+        conn, [f"{table}_y{year}" for table in partitioned_tables(layout)]
+    )
+    LOG.info(f"partitions of {year} frozen")
+
+
+def migrate_child_created_at(conn: Connection, layout: str = KEYWORD_LAYOUT):
+    """
+    Adds the created_at column copied from Article to the child tables of a
+    database created before they had one, in a single transaction.
+    """
+
+    conn.run("START TRANSACTION;")
+    for table in partitioned_tables(layout)[1:]:
+        if table == "KeywordCounts":
+            # the view selects the new column, so it is recreated around the change
+            drop_keyword_occurrence_view(conn)
+            add_created_at_column(conn, table)
+            create_keyword_occurrence_view(conn)
+        else:
+            add_created_at_column(conn, table)
+    conn.run("COMMIT;")
+    LOG.info("child tables now carry created_at")
@@ -1,7 +1,9 @@
 from db.connection import Connection
 from db.queries import (
+    create_archive_prefix_table,
     create_category_table,
     create_keyword_table,
+    insert_archive_prefixes,
     insert_categories,
     insert_keywords,
 )
@@ -30,3 +32,12 @@ def populate_keyword_table(conn: Connection):
         for idx, kw in enumerate(KEYWORD_LIST)
     ]
     insert_keywords(conn, keywords)
+
+
+def populate_archive_prefix_table(conn: Connection):
+    """
+    Populates the ArchivePrefix table with the archives of old-format article ids,
+    creating said table if it doesn't yet exist
+    """
+    create_archive_prefix_table(conn)
+    insert_archive_prefixes(conn)
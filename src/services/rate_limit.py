@@ -0,0 +1,73 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from pg8000 import DatabaseError
+
+from db.connection import Connection, Pg8000Connection
+from db.queries import claim_rate_limit_slot
+from utils.logger import LOG
+
+
+class RateLimiter(ABC):
+    """Abstract base class for spacing out requests to an upstream service."""
+
+    @abstractmethod
+    def wait(self):
+        """Blocks until the next request may be made. Call before every request."""
+
+    def close(self):
+        """Releases any resources held by the limiter."""
+
+
+class LocalRateLimiter(RateLimiter):
+    """
+    Spaces out the requests made through this limiter by at least interval_seconds.
+    Only coordinates within a single process.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.next_slot = None
+
+    def wait(self):
+        now = time.monotonic()
+        if self.next_slot is not None and self.next_slot > now:
+            time.sleep(self.next_slot - now)
+            now = time.monotonic()
+        self.next_slot = now + self.interval_seconds
+
+
+class PgRateLimiter(RateLimiter):
+    """
+    Spaces out requests by at least interval_seconds across every process and Lambda
+    invocation sharing the database, by claiming request slots from the RateLimit
+    table. Concurrent workers then make requests at the limit combined, rather than
+    each at the limit.
+
+    Claims are made over a dedicated connection, so they are never held up by (or
+    hold up) an open transaction of the caller. If the database can't be reached,
+    falls back to waiting a full interval locally.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        interval_seconds: float,
+        connection_factory: Callable[[], Connection] = Pg8000Connection,
+    ):
+        self.key = key
+        self.interval_seconds = interval_seconds
+        self.conn = connection_factory()
+
+    def wait(self):
+        try:
+            delay = claim_rate_limit_slot(self.conn, self.key, self.interval_seconds)
+        except DatabaseError as e:
+            LOG.error(f"ERR: Failed to claim a {self.key} rate limit slot: {e}")
+            delay = self.interval_seconds
+        if delay > 0:
+            time.sleep(delay)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+from typing import Iterable
+
+from db.connection import Connection
+from db.queries import (
+    create_duplicate_tables,
+    refresh_trends_for_months,
+    select_article_months,
+)
+from utils.logger import LOG
+
+
+def month_of(timestamp: datetime) -> date:
+    """Truncates a timestamp to the first day of its month."""
+    return date(timestamp.year, timestamp.month, 1)
+
+
+def refresh_trends(conn: Connection, months: Iterable[date]):
+    """
+    Recomputes the trend rollups for the given months in a single transaction.
+    Months outside the given set are left untouched. No-op if no months are given.
+    """
+
+    months = sorted(set(months))
+    if not months:
+        return
+
+    # the rollups leave out duplicates, recorded in a table databases created before
+    # duplicate detection lack
+    create_duplicate_tables(conn)
+    conn.run("START TRANSACTION;")
+    refresh_trends_for_months(conn, months)
+    conn.run("COMMIT;")
+
+    LOG.info(f"refreshed trend rollups for {len(months)} month(s)")
+
+
+def rebuild_trends(conn: Connection):
+    """Recomputes the trend rollups for every month present in the Article table."""
+    refresh_trends(conn, select_article_months(conn))
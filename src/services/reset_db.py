@@ -1,13 +1,23 @@
 from db.connection import Connection
 from db.queries import (
+    create_article_author_table,
     create_article_category_table,
+    create_article_search_index,
     create_article_table,
+    create_author_table,
     create_category_table,
-    create_keyword_occurrence_table,
+    create_duplicate_tables,
+    create_ingest_checkpoint_table,
+    create_ingest_ledger_tables,
     create_keyword_table,
+    create_rate_limit_table,
+    create_trend_tables,
     drop_all_tables,
 )
+from services.keyword_storage import create_keyword_storage
+from services.partitions import PARTITION_SCHEME
 from services.populate_reference_tables import (
+    populate_archive_prefix_table,
     populate_category_table,
     populate_keyword_table,
 )
@@ -15,13 +25,26 @@ from services.populate_reference_tables import (
 
 # drops and recreates the Article table
 # useful for development
-def reset_db(conn: Connection):
-    """Drops and recreates the entire Article table. Use with caution."""
+def reset_db(conn: Connection, partition_scheme: str = PARTITION_SCHEME):
+    """
+    Drops and recreates the entire Article table, partitioned by created_at year if
+    partition_scheme is "year". Use with caution.
+    """
+    partitioned = partition_scheme == "year"
     drop_all_tables(conn)
-    create_article_table(conn)
+    create_article_table(conn, partitioned)
+    create_article_search_index(conn)
     create_category_table(conn)
-    create_article_category_table(conn)
+    create_article_category_table(conn, partitioned)
+    create_author_table(conn)
+    create_article_author_table(conn, partitioned)
     create_keyword_table(conn)
-    create_keyword_occurrence_table(conn)
+    create_keyword_storage(conn, partitioned=partitioned)
+    create_trend_tables(conn)
+    create_ingest_checkpoint_table(conn)
+    create_ingest_ledger_tables(conn)
+    create_duplicate_tables(conn)
+    create_rate_limit_table(conn)
     populate_category_table(conn)
     populate_keyword_table(conn)
+    populate_archive_prefix_table(conn)
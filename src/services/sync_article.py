@@ -2,26 +2,72 @@ from article import Article
 from db.connection import Connection
 from db.queries import (
     delete_article_category_for_article,
-    delete_keyword_occurrences_for_article,
     insert_article,
     insert_article_category,
-    insert_keyword_occurrence,
     select_article,
+    select_article_fingerprints,
     update_article,
 )
+from services.authors import write_article_authors
+from services.keyword_storage import write_keyword_counts
 from utils.categories import build_category_id_reference_dict
+from utils.fingerprint import article_fingerprint
 from utils.keywords import count_keyword_occurrences
 
 CATEGORY_CODE_TO_ID = build_category_id_reference_dict()
 
 
-def sync_article(conn: Connection, article: Article):
+def find_changed_articles(conn: Connection, articles: list[Article]) -> list[Article]:
+    """
+    Filters a batch of articles down to those which are new, or whose updated_at or
+    content differ from the stored copy. Makes a single query for the whole batch, so
+    unchanged articles can be skipped without opening a transaction for each.
+    """
+
+    if not articles:
+        return []
+
+    stored = select_article_fingerprints(conn, [article.id for article in articles])
+
+    return [
+        article
+        for article in articles
+        if stored.get(article.id) != (article.updated_at, article_fingerprint(article))
+    ]
+
+
+def sync_article(
+    conn: Connection, article: Article, author_ids: dict[str, int] | None = None
+) -> bool:
     """
     Loads novel article data into the database. Will insert if the article doesn't yet
     exist, update if the article does exist, and error if the changes are not allowed.
+    Its authors are written too, given their ids (see write_article).
+
+    Returns True if the article was inserted, False if it was updated.
     """
 
     conn.run("START TRANSACTION;")
+    inserted = write_article(conn, article, author_ids)
+    conn.run("COMMIT;")
+
+    return inserted
+
+
+def write_article(
+    conn: Connection, article: Article, author_ids: dict[str, int] | None = None
+) -> bool:
+    """
+    Performs the writes of sync_article without any transaction control, so several
+    articles can share one transaction. The caller is responsible for committing, and
+    for rolling back if an error is raised.
+
+    The article's authors are replaced in the same transaction, from author_ids
+    resolved beforehand by an AuthorInterner (which can't run inside it). Without
+    author_ids, stored authors are left untouched.
+
+    Returns True if the article was inserted, False if it was updated.
+    """
 
     persisted_article = select_article(conn, article.id)
     if persisted_article:
@@ -39,7 +85,12 @@ def sync_article(conn: Connection, article: Article):
 
         # persist the update
         update_article(
-            conn, id_=article.id, title=article.title, updated_at=article.updated_at
+            conn,
+            id_=article.id,
+            title=article.title,
+            updated_at=article.updated_at,
+            abstract=article.abstract,
+            content_hash=article_fingerprint(article),
         )
 
     else:
@@ -50,12 +101,15 @@ def sync_article(conn: Connection, article: Article):
     for category in article.categories:
         if category not in CATEGORY_CODE_TO_ID:
             raise ValueError(f"invalid article category {category}")
-        insert_article_category(conn, article.id, CATEGORY_CODE_TO_ID[category])
+        insert_article_category(
+            conn, article.id, CATEGORY_CODE_TO_ID[category], article.created_at
+        )
 
     # handle keyword updates
-    delete_keyword_occurrences_for_article(conn, article.id)
     keyword_occurences = count_keyword_occurrences(article.abstract)
-    for kw_id, total in keyword_occurences.items():
-        insert_keyword_occurrence(conn, article.id, kw_id, total)
+    write_keyword_counts(conn, article.id, article.created_at, keyword_occurences)
 
-    conn.run("COMMIT;")
+    if author_ids is not None:
+        write_article_authors(conn, [article], author_ids)
+
+    return persisted_article is None
@@ -0,0 +1,204 @@
+import queue
+import threading
+import traceback
+import zlib
+from math import inf
+from typing import Any, Callable, Generator, NamedTuple
+
+from pg8000 import DatabaseError
+
+from article import Article
+from db.connection import Connection, Pg8000Connection
+from services.batch_writer import BatchWriter
+
+# articles a worker commits together when its queue is backed up
+WRITER_BATCH_SIZE = 50
+
+# outcome of writing one submitted article, reported back in submission order
+#   payload is passed through untouched (e.g. the source record, for rejects)
+#   error holds the formatted traceback when inserted is None (rejected)
+WriteResult = NamedTuple(
+    "WriteResult",
+    [
+        ("seq", int),
+        ("article", Article),
+        ("payload", Any),
+        ("inserted", bool | None),
+        ("error", str | None),
+    ],
+)
+
+# queued to a worker to make it exit once its queue is drained
+_STOP = object()
+# reported by a worker which failed, to wake up results() waiting on it
+_FAILED = object()
+
+
+def route_article(article_id: str, n_workers: int) -> int:
+    """
+    Picks the worker responsible for an article. Uses a stable hash so that every
+    version of an article is written by the same worker, in submission order.
+    """
+    return zlib.crc32(article_id.encode("utf-8")) % n_workers
+
+
+class WriterPool:
+    """
+    Writes articles on several worker threads, each with its own database connection,
+    so load throughput isn't bound by the round-trip latency of a single connection.
+
+    Articles are routed to workers by a hash of their id. Two workers never write the
+    same article's rows, so they can't deadlock on each other. Each worker commits
+    whatever it has queued (up to batch_size articles) in one transaction, through a
+    BatchWriter, so a failing article is rolled back to its savepoint and rejected
+    without losing the rest of the batch.
+
+    Results are reported back through results(), in the order articles were
+    submitted, which makes it safe to checkpoint on the last reported article.
+
+    A worker failing outside of an article (its connection can't be opened or
+    breaks) stops writing; its error is raised by the next submit(), results() or
+    close() instead of leaving them waiting on it forever.
+    """
+
+    def __init__(
+        self,
+        n_workers: int,
+        connection_factory: Callable[[], Connection] = Pg8000Connection,
+        batch_size: int = WRITER_BATCH_SIZE,
+    ):
+        self.n_workers = n_workers
+        self.batch_size = batch_size
+        self.connection_factory = connection_factory
+
+        # bounded so a slow database applies backpressure to the fetch loop
+        self.queues = [queue.Queue(maxsize=batch_size * 4) for _ in range(n_workers)]
+        self.done_queue = queue.Queue()
+        self.next_seq = 0
+        self.next_result_seq = 0
+        self.pending_results = {}
+        self.commits = 0
+        self.commits_lock = threading.Lock()
+        self.error = None
+
+        self.threads = [
+            threading.Thread(target=self._run_worker, args=(i,), daemon=True)
+            for i in range(n_workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(
+        self,
+        article: Article,
+        payload: Any = None,
+        author_ids: dict[str, int] | None = None,
+    ) -> int:
+        """
+        Queues an article for writing, along with the ids of its authors (see
+        write_article), and returns its sequence number. Blocks if the responsible
+        worker is too far behind.
+        """
+
+        self._raise_worker_error()
+        seq = self.next_seq
+        self.next_seq += 1
+        self.queues[route_article(article.id, self.n_workers)].put(
+            (seq, article, payload, author_ids)
+        )
+        return seq
+
+    def results(self, block: bool = False) -> Generator[WriteResult]:
+        """
+        Yields the results of submitted articles in submission order. Without block,
+        stops at the first result which isn't ready yet; with block, waits until every
+        article submitted so far has been reported. Raises the error of a failed
+        worker once the results it held up are due.
+        """
+
+        while self.next_result_seq < self.next_seq:
+            if self.next_result_seq not in self.pending_results:
+                try:
+                    # a failed worker won't report anything more, so stop waiting
+                    result = self.done_queue.get(block=block and self.error is None)
+                except queue.Empty:
+                    self._raise_worker_error()
+                    return
+                if result is not _FAILED:
+                    self.pending_results[result.seq] = result
+                continue
+
+            yield self.pending_results.pop(self.next_result_seq)
+            self.next_result_seq += 1
+
+    def close(self) -> Generator[WriteResult]:
+        """
+        Waits for every queued article to be written, yields the remaining results in
+        submission order, and shuts the workers down. Raises the error of a failed
+        worker, if any.
+        """
+
+        for q in self.queues:
+            q.put(_STOP)
+        try:
+            yield from self.results(block=True)
+        finally:
+            for thread in self.threads:
+                thread.join()
+        self._raise_worker_error()
+
+    def _raise_worker_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def _run_worker(self, index: int):
+        q = self.queues[index]
+        try:
+            self._write_queue(q)
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+            self.done_queue.put(_FAILED)
+            # keep emptying the queue, so that submit() and close() don't block on it
+            while q.get() is not _STOP:
+                pass
+
+    def _write_queue(self, q: queue.Queue):
+        conn = self.connection_factory()
+        # batches are committed explicitly below, once everything queued is written
+        writer = BatchWriter(conn, batch_size=self.batch_size, max_batch_seconds=inf)
+        try:
+            stopping = False
+            while not stopping:
+                # wait for work, then take whatever else is already queued
+                batch = [q.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(q.get_nowait())
+                    except queue.Empty:
+                        break
+                if _STOP in batch:
+                    stopping = True
+                    batch = [item for item in batch if item is not _STOP]
+                if batch:
+                    self._write_batch(writer, batch)
+        finally:
+            with self.commits_lock:
+                self.commits += writer.commits
+            conn.close()
+
+    def _write_batch(self, writer: BatchWriter, batch: list[tuple]):
+        results = []
+        for seq, article, payload, author_ids in batch:
+            try:
+                inserted = writer.write(article, author_ids)
+            except (DatabaseError, ValueError):
+                error = traceback.format_exc()
+                results.append(WriteResult(seq, article, payload, None, error))
+                continue
+            results.append(WriteResult(seq, article, payload, inserted, None))
+        writer.commit()
+
+        # only report articles once they are committed
+        for result in results:
+            self.done_queue.put(result)
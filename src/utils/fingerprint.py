@@ -0,0 +1,25 @@
+import hashlib
+
+from article import Article
+
+
+def article_fingerprint(article: Article) -> str:
+    """
+    Computes a hash of the stored content of an article: its title, abstract,
+    categories, authors and creation date. Two fetches of an unchanged article
+    produce the same fingerprint regardless of category order (but not of author
+    order, which is stored).
+
+    Output is a 32 character hex digest.
+    """
+
+    content = "\x1f".join(
+        [
+            article.title or "",
+            article.abstract or "",
+            " ".join(sorted(article.categories)),
+            "\x1e".join(article.authors),
+            article.created_at.isoformat(),
+        ]
+    )
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
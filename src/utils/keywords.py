@@ -53,6 +53,10 @@ KEYWORD_TO_ID_DICT = build_keyword_to_id_dict()
 KEYWORD_TO_ID_DICT_TOKENIZED = {
     tuple(kw.split()): id_ for kw, id_ in KEYWORD_TO_ID_DICT.items()
 }
+# same mapping grouped by phrase length, so each text window is a single dict lookup
+KEYWORD_TO_ID_DICT_BY_LENGTH = defaultdict(dict)
+for kw_tokens, id_ in KEYWORD_TO_ID_DICT_TOKENIZED.items():
+    KEYWORD_TO_ID_DICT_BY_LENGTH[len(kw_tokens)][kw_tokens] = id_
 
 
 def count_keyword_occurrences(text: str) -> dict[int, int]:
@@ -67,15 +71,12 @@ def count_keyword_occurrences(text: str) -> dict[int, int]:
     text = re.sub(r"[^a-zA-Z]+", " ", text)
     text_tokens = text.split()
 
-    # iterater through id matching dict
+    # sliding window per phrase length, looking each window up in the matching dict
     matches = defaultdict(int)
-    for kw_tokens, id_ in KEYWORD_TO_ID_DICT_TOKENIZED.items():
-        kw_len = len(kw_tokens)
-
-        # sliding window
+    for kw_len, kw_dict in KEYWORD_TO_ID_DICT_BY_LENGTH.items():
         for i in range(len(text_tokens) + 1 - kw_len):
-            window = tuple(text_tokens[i : i + kw_len])
-            if window == kw_tokens:
+            id_ = kw_dict.get(tuple(text_tokens[i : i + kw_len]))
+            if id_ is not None:
                 matches[id_] += 1
 
     return matches
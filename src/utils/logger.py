@@ -1,8 +1,142 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Generator
 
-logging.basicConfig(
-    filename="log/backfill.log",
-    format="%(asctime)s %(levelname)s: %(message)s",
-    level=logging.INFO,
-)
 LOG = logging.getLogger()
+
+# where records end up
+#   file:   ARXIN_LOG_FILE (log/backfill.log by default)
+#   stderr: standard error, e.g. for CloudWatch on Lambda
+# defaults to stderr on Lambda, whose filesystem is read-only, and to file elsewhere
+LOG_SINKS = ("file", "stderr")
+LOG_SINK = os.environ.get(
+    "ARXIN_LOG_SINK",
+    "stderr" if "AWS_LAMBDA_FUNCTION_NAME" in os.environ else "file",
+)
+LOG_FILE = os.environ.get("ARXIN_LOG_FILE", "log/backfill.log")
+
+# fields attached to every record logged while they're set (see log_context)
+LOG_RUN_ID = ContextVar("log_run_id", default=None)
+LOG_STAGE = ContextVar("log_stage", default=None)
+
+_listener = None
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamps records with the run id and stage of the context logging them. Runs in
+    the logging thread, before records are queued to another one.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = LOG_RUN_ID.get()
+        record.stage = LOG_STAGE.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "stage": getattr(record, "stage", None),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def _sink_handler(sink: str) -> logging.Handler:
+    if sink not in LOG_SINKS:
+        raise ValueError(f"unknown log sink {sink}")
+    if sink == "file":
+        try:
+            os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+            return logging.FileHandler(LOG_FILE, encoding="utf-8")
+        except OSError:
+            # e.g. a read-only filesystem
+            pass
+    return logging.StreamHandler(sys.stderr)
+
+
+def configure_logging(sink: str = LOG_SINK, level: int = logging.INFO) -> QueueListener:
+    """
+    Routes LOG through a queue: logging calls only enqueue records, and a
+    background thread formats them as JSON and writes them to the sink. Replaces
+    any handler already set up (e.g. by the Lambda runtime). Safe to call more than
+    once; the previous listener is stopped after draining its queue.
+
+    Falls back to stderr if the log file can't be created.
+    """
+
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    handler = _sink_handler(sink)
+    handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    for existing in list(LOG.handlers):
+        LOG.removeHandler(existing)
+    LOG.addHandler(queue_handler)
+    LOG.setLevel(level)
+
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    return _listener
+
+
+def flush_logging():
+    """
+    Waits until every queued record has been written. Call before a Lambda
+    invocation returns, as the runtime may freeze the writer thread afterwards.
+    """
+
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+@atexit.register
+def _stop_logging():
+    if _listener is not None:
+        _listener.stop()
+
+
+@contextmanager
+def log_context(run_id: str | None = None, stage: str | None = None) -> Generator[None]:
+    """
+    Attaches a run id and stage to the records logged within the block (by this
+    thread); fields left as None keep their current value.
+    """
+
+    tokens = []
+    if run_id is not None:
+        tokens.append((LOG_RUN_ID, LOG_RUN_ID.set(run_id)))
+    if stage is not None:
+        tokens.append((LOG_STAGE, LOG_STAGE.set(stage)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def set_log_stage(stage: str):
+    """Changes the stage attached to records, until the enclosing log_context ends."""
+    LOG_STAGE.set(stage)
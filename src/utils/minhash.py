@@ -0,0 +1,129 @@
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+# signature length, split into MINHASH_BANDS bands of MINHASH_ROWS values for LSH;
+# two abstracts share a band (and become candidates) with probability
+# 1 - (1 - s^rows)^bands for a Jaccard similarity s, about 0.6 at s = 0.7 and over
+# 0.99 from s = 0.85
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 16
+MINHASH_ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+# words per shingle
+MINHASH_SHINGLE_WORDS = 3
+# fixed so that signatures stay comparable across processes and runs
+MINHASH_SEED = 20240101
+
+# permutations are h(x) = (a * x + b) mod p over 32 bit shingle hashes, with p a
+# prime above 2^32; a, b < 2^32 keep a * x + b within 64 bits
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(MINHASH_SEED)
+_A = _rng.integers(1, 2**32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, 2**32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+# mixes the hashes of the words of a shingle into the shingle's hash
+_WORD_MULTIPLIERS = np.array(
+    [0x9E3779B1**i % 2**32 for i in range(MINHASH_SHINGLE_WORDS)], dtype=np.uint64
+)
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """
+    Hashes the overlapping MINHASH_SHINGLE_WORDS word shingles of a text, after
+    lowercasing it and dropping punctuation. A text shorter than a shingle is a
+    single shingle; an empty one has none.
+
+    Outputs the distinct 32 bit hashes, as uint64.
+    """
+
+    words = re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).split()
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    word_hashes = np.array([zlib.crc32(w.encode()) for w in words], dtype=np.uint64)
+
+    width = min(MINHASH_SHINGLE_WORDS, len(words))
+    windows = np.lib.stride_tricks.sliding_window_view(word_hashes, width)
+    mixed = (windows * _WORD_MULTIPLIERS[:width]).sum(axis=1) & np.uint64(0xFFFFFFFF)
+    return np.unique(mixed)
+
+
+def minhash_signature(text: str) -> np.ndarray | None:
+    """
+    Computes the MinHash signature of a text's shingles: for each of the
+    MINHASH_PERMUTATIONS permutations, the smallest permuted shingle hash. The
+    fraction of equal values between two signatures estimates the Jaccard similarity
+    of the shingle sets.
+
+    Outputs MINHASH_PERMUTATIONS uint32 values, or None for a text without words.
+    """
+
+    hashes = shingle_hashes(text)
+    if not len(hashes):
+        return None
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> list[int]:
+    """
+    Hashes each band of MINHASH_ROWS values of a signature into a bucket, a signed
+    64 bit integer. Signatures sharing a bucket in the same band are candidates.
+    """
+
+    return [
+        int.from_bytes(
+            hashlib.blake2b(band.tobytes(), digest_size=8).digest(), signed=True
+        )
+        for band in signature.reshape(MINHASH_BANDS, MINHASH_ROWS)
+    ]
+
+
+def signature_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimates the Jaccard similarity of the texts of two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class LshIndex:
+    """
+    An in-memory LSH banding index of signatures, keyed by (band, bucket). Finding
+    the candidates of a signature takes MINHASH_BANDS lookups whatever the size of
+    the index.
+    """
+
+    def __init__(self):
+        self.buckets = defaultdict(list)
+        self.signatures = {}
+
+    def add(self, key, signature: np.ndarray, buckets: list[int] | None = None):
+        self.signatures[key] = signature
+        for band, bucket in enumerate(buckets or band_buckets(signature)):
+            self.buckets[(band, bucket)].append(key)
+
+    def candidates(self, buckets: list[int]) -> set:
+        """Keys of the indexed signatures sharing at least one band bucket."""
+        return {
+            key
+            for band, bucket in enumerate(buckets)
+            for key in self.buckets.get((band, bucket), ())
+        }
+
+    def best_match(
+        self,
+        signature: np.ndarray,
+        buckets: list[int],
+        threshold: float,
+        exclude: set = frozenset(),
+    ) -> tuple | None:
+        """
+        Returns (key, similarity) of the most similar candidate at or above
+        threshold, leaving out the keys in exclude, or None.
+        """
+
+        best = None
+        for key in self.candidates(buckets) - exclude:
+            similarity = signature_similarity(signature, self.signatures[key])
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
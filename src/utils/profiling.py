@@ -0,0 +1,118 @@
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+
+from utils.logger import LOG, LOG_FILE
+
+# where profiling reports are written: next to the log file, or under /tmp on
+# Lambda, whose filesystem is otherwise read-only
+PROFILE_DIR = os.environ.get(
+    "ARXIN_PROFILE_DIR",
+    (
+        "/tmp/profiles"
+        if "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+        else os.path.join(os.path.dirname(LOG_FILE) or ".", "profiles")
+    ),
+)
+# functions listed in the text report, and logged
+PROFILE_TOP_FUNCTIONS = 50
+PROFILE_LOGGED_FUNCTIONS = 15
+# allocation sites listed per tracemalloc snapshot
+PROFILE_TOP_ALLOCATIONS = 25
+# frames kept per allocation traceback
+PROFILE_TRACEMALLOC_FRAMES = 5
+
+
+class RunProfiler:
+    """
+    Profiles an ingestion run with cProfile, and, if memory_every is set, takes a
+    tracemalloc snapshot every memory_every pages. Reports are written to output_dir
+    when the run stops:
+      - {run_id}.pstats, loadable with pstats or snakeviz
+      - {run_id}.txt, the top functions by cumulative time (also logged)
+      - {run_id}-page{N}.txt, the top allocation sites at page N, with their growth
+        since the previous snapshot
+
+    Only the thread starting the profiler is profiled (not writer pool threads), but
+    tracemalloc sees allocations from every thread. A disabled profiler does nothing.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        enabled: bool = True,
+        memory_every: int = 0,
+        output_dir: str = PROFILE_DIR,
+    ):
+        self.run_id = run_id
+        self.enabled = enabled
+        self.memory_every = memory_every if enabled else 0
+        self.output_dir = output_dir
+        self.profile = None
+        self.previous_snapshot = None
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.output_dir, f"{self.run_id}{suffix}")
+
+    def start(self):
+        if not self.enabled:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.memory_every:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def page_done(self, page: int):
+        """Takes a tracemalloc snapshot if page is a multiple of memory_every."""
+
+        if not self.memory_every or page % self.memory_every:
+            return
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        if self.previous_snapshot is None:
+            stats = snapshot.statistics("lineno")
+        else:
+            stats = snapshot.compare_to(self.previous_snapshot, "lineno")
+        self.previous_snapshot = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        with open(self._path(f"-page{page}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"traced memory: current={current} peak={peak}\n")
+            for stat in stats[:PROFILE_TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+    def stop(self):
+        if self.profile is None:
+            return
+        self.profile.disable()
+        if self.memory_every:
+            tracemalloc.stop()
+
+        self.profile.dump_stats(self._path(".pstats"))
+        report = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=report)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(self._path(".txt"), "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+
+        logged = io.StringIO()
+        pstats.Stats(self.profile, stream=logged).sort_stats(
+            pstats.SortKey.CUMULATIVE
+        ).print_stats(PROFILE_LOGGED_FUNCTIONS)
+        LOG.info(
+            f"profile of run {self.run_id} written to {self._path('.pstats')}\n"
+            f"{logged.getvalue()}"
+        )
+        self.profile = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
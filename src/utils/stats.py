@@ -0,0 +1,51 @@
+import time
+from datetime import datetime
+
+
+class RunStats:
+    """Counters describing the outcome of a single ingestion run."""
+
+    def __init__(self):
+        self.pages = 0
+        self.fetched = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.commits = 0
+        # max_results of every page fetched, and the number of requests retried
+        self.page_sizes = []
+        self.page_retries = 0
+        # size of fetched response bodies, as transferred and after decompression
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.decompress_seconds = 0.0
+        self.started_at = time.monotonic()
+        # updated_at of the last article written or skipped as unchanged, following
+        # the order articles were fetched in; everything fetched before it is stored
+        # or was rejected
+        self.watermark = None
+
+    def advance_watermark(self, updated_at: datetime):
+        if self.watermark is None or updated_at > self.watermark:
+            self.watermark = updated_at
+
+    def commit_rate(self) -> float:
+        """Commits per second since the run started."""
+        elapsed = time.monotonic() - self.started_at
+        return self.commits / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"pages={self.pages} fetched={self.fetched} inserted={self.inserted} "
+            f"updated={self.updated} skipped={self.skipped} rejected={self.rejected} "
+            f"commits={self.commits} ({self.commit_rate():.1f}/s) "
+            f"page_sizes={self.page_size_range()} page_retries={self.page_retries} "
+            f"bytes_received={self.bytes_received} bytes_decoded={self.bytes_decoded} "
+            f"decompress_seconds={self.decompress_seconds:.2f}"
+        )
+
+    def page_size_range(self) -> str:
+        if not self.page_sizes:
+            return "-"
+        return f"{min(self.page_sizes)}..{max(self.page_sizes)}"
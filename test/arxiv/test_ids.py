@@ -0,0 +1,48 @@
+import pytest
+
+from arxiv.ids import OLD_FORMAT_ARCHIVES, decode_arxiv_id, encode_arxiv_id
+
+
+@pytest.mark.parametrize(
+    "id_",
+    [
+        "0704.0001",
+        "1412.9999",
+        "1501.00001",
+        "2412.99999",
+        "acc-phys/9411001",
+        "hep-th/9901001",
+        "math/0101001",
+        "supr-con/9612001",
+    ],
+)
+def test_encode_arxiv_id_round_trips(id_):
+    num_id = encode_arxiv_id(id_)
+
+    assert 0 < num_id < 2**63
+    assert decode_arxiv_id(num_id) == id_
+
+
+def test_encode_arxiv_id_distinguishes_number_widths():
+    assert encode_arxiv_id("1501.0001") != encode_arxiv_id("1501.00001")
+
+
+def test_encode_arxiv_id_orders_new_format_ids_by_submission():
+    ids = ["0704.0001", "0704.0002", "1412.9999", "1501.00001", "2412.00003"]
+
+    assert sorted(ids, key=encode_arxiv_id) == ids
+
+
+def test_encode_arxiv_id_is_unique_across_archives():
+    encoded = {encode_arxiv_id(f"{archive}/0101001") for archive in OLD_FORMAT_ARCHIVES}
+
+    assert len(encoded) == len(OLD_FORMAT_ARCHIVES)
+    assert encode_arxiv_id("0101.00001") not in encoded
+
+
+@pytest.mark.parametrize(
+    "id_", ["not-an-archive/0101001", "0704.001", "math/01010", "abc"]
+)
+def test_encode_arxiv_id_rejects_bad_ids(id_):
+    with pytest.raises(ValueError):
+        encode_arxiv_id(id_)
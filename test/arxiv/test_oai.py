@@ -0,0 +1,146 @@
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import pytest
+
+from arxiv.oai import (
+    OAI_NS,
+    build_oai_list_records_url,
+    extract_oai_records,
+    extract_resumption_token,
+    is_oai_record_deleted,
+    parse_oai_record_to_article,
+)
+
+
+# this fixture is linked to the contents of test/fixtures/oai_sample.xml
+@pytest.fixture()
+def sample_oai_xml_root():
+    return ET.parse("test/fixtures/oai_sample.xml").getroot()
+
+
+@pytest.fixture()
+def sample_oai_records(sample_oai_xml_root):
+    return extract_oai_records(sample_oai_xml_root)
+
+
+def test_build_oai_list_records_url_builds_correct_url():
+    expected = (
+        "http://export.arxiv.org/oai2?verb=ListRecords&metadataPrefix=arXivRaw"
+        "&from=2025-01-01&until=2025-02-01"
+    )
+
+    actual = build_oai_list_records_url(
+        datetime(2025, 1, 1), datetime(2025, 2, 1, 22, 33), "arXivRaw"
+    )
+
+    assert expected == actual
+
+
+def test_build_oai_list_records_url_only_sends_token_when_resuming():
+    expected = "http://localhost/oai2?verb=ListRecords&resumptionToken=69%7C1001"
+
+    actual = build_oai_list_records_url(
+        datetime(2025, 1, 1),
+        datetime(2025, 2, 1),
+        resumption_token="69|1001",
+        base_url="http://localhost/oai2",
+    )
+
+    assert expected == actual
+
+
+def test_build_oai_list_records_url_rejects_invalid_time_range():
+    with pytest.raises(ValueError):
+        build_oai_list_records_url(datetime(2020, 1, 1), datetime(2019, 1, 1))
+
+
+def test_build_oai_list_records_url_rejects_unknown_metadata_prefix():
+    with pytest.raises(ValueError):
+        build_oai_list_records_url(datetime(2020, 1, 1), datetime(2020, 1, 1), "oai_dc")
+
+
+def test_extract_oai_records(sample_oai_records):
+    assert len(sample_oai_records) == 4
+    assert all(el.tag == f"{OAI_NS}record" for el in sample_oai_records)
+
+
+def test_extract_oai_records_returns_empty_list_on_no_records_match():
+    xml = (
+        '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+        '<error code="noRecordsMatch">nothing here</error>'
+        "</OAI-PMH>"
+    )
+
+    assert extract_oai_records(ET.fromstring(xml)) == []
+
+
+def test_extract_oai_records_raises_on_other_errors():
+    xml = (
+        '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+        '<error code="badResumptionToken">expired</error>'
+        "</OAI-PMH>"
+    )
+
+    with pytest.raises(ValueError):
+        extract_oai_records(ET.fromstring(xml))
+
+
+def test_extract_resumption_token(sample_oai_xml_root):
+    assert extract_resumption_token(sample_oai_xml_root) == "6960524|1001"
+
+
+def test_extract_resumption_token_returns_none_on_last_page():
+    xml = (
+        '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/"><ListRecords>'
+        '<resumptionToken cursor="1000" completeListSize="1001"/>'
+        "</ListRecords></OAI-PMH>"
+    )
+
+    assert extract_resumption_token(ET.fromstring(xml)) is None
+
+
+def test_is_oai_record_deleted(sample_oai_records):
+    assert [is_oai_record_deleted(r) for r in sample_oai_records] == [
+        False,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_parse_oai_record_to_article_arxiv_format(sample_oai_records):
+    article = parse_oai_record_to_article(sample_oai_records[0])
+
+    assert article.id == "0704.0001"
+    assert article.title.startswith("Calculation of prompt diphoton")
+    assert article.created_at == datetime(2007, 4, 2)
+    assert article.updated_at == datetime(2008, 11, 13)
+    assert article.categories == ["hep-ph"]
+    assert article.abstract.startswith("A fully differential calculation")
+    assert article.authors == ["C. Balázs", "E. L. Berger"]
+
+
+def test_parse_oai_record_to_article_defaults_updated_at_to_created_at(
+    sample_oai_records,
+):
+    article = parse_oai_record_to_article(sample_oai_records[1])
+
+    assert article.id == "math/0309136"
+    assert article.updated_at == article.created_at == datetime(2003, 9, 8)
+    assert article.categories == ["math.GT", "math.CO"]
+
+
+def test_parse_oai_record_to_article_arxiv_raw_format(sample_oai_records):
+    article = parse_oai_record_to_article(sample_oai_records[3])
+
+    assert article.id == "0704.0003"
+    assert article.created_at == datetime(2007, 4, 1, 20, 46, 54)
+    assert article.updated_at == datetime(2008, 11, 8, 18, 17, 12)
+    assert article.categories == ["physics.gen-ph"]
+    assert article.authors == ["Hongjun Pan"]
+
+
+def test_parse_oai_record_to_article_rejects_deleted_record(sample_oai_records):
+    with pytest.raises(ValueError):
+        parse_oai_record_to_article(sample_oai_records[2])
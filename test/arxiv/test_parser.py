@@ -222,3 +222,11 @@ def test_parse_entry_to_article_success(sample_arxiv_xml_root):
         )
         for cat in article.categories
     )
+
+
+def test_parse_entry_to_article_extracts_authors_in_order(sample_arxiv_xml_root):
+    sample_arxiv_xml_entry = sample_arxiv_xml_root.find(f"{XML_NS}entry")
+
+    article = parse_entry_to_article(sample_arxiv_xml_entry)
+
+    assert article.authors[:4] == ["Yanni Ma", "Hao Liu", "Yulan Guo", "Theo Gevers"]
@@ -1,10 +1,20 @@
+import gzip
 import logging
+import xml.etree.ElementTree as ET
 from datetime import datetime
 from unittest.mock import Mock, patch
 
 import pytest
+import requests
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 
-from arxiv.request import build_arxiv_query_url, fetch_articles_from_arxiv_api
+from arxiv.request import (
+    API_TIMEOUT_SECONDS,
+    build_arxiv_query_url,
+    fetch_articles_from_arxiv_api,
+    parse_xml_stream,
+)
+from utils.stats import RunStats
 
 DUMMY_DATE = datetime(2022, 2, 2)
 
@@ -22,11 +32,22 @@ def http_get_mock():
 
 
 @pytest.fixture
-def etree_fromstring_mock():
-    with patch("arxiv.request.ET.fromstring") as mock:
+def parse_xml_stream_mock():
+    with patch("arxiv.request.parse_xml_stream") as mock:
         yield mock
 
 
+def build_streamed_response(body: bytes, content_encoding: str | None, chunk=7):
+    response = Mock()
+    response.headers = (
+        {"Content-Encoding": content_encoding} if content_encoding else {}
+    )
+    response.raw.stream.return_value = (
+        body[i : i + chunk] for i in range(0, len(body), chunk)
+    )
+    return response
+
+
 def test_build_arxiv_query_url_builds_correct_url():
     start_time = datetime(2025, 1, 1)
     end_time = datetime(2025, 2, 1, 22, 33)
@@ -41,6 +62,51 @@ def test_build_arxiv_query_url_builds_correct_url():
     assert expected == actual
 
 
+def test_build_arxiv_query_url_adds_offset():
+    start_time = datetime(2025, 1, 1)
+
+    expected = (
+        "http://export.arxiv.org/api/query?search_query=lastUpdatedDate:"
+        "[202501010000+TO+202501010000]&start=2000&max_results=1000"
+        "&sortBy=lastUpdatedDate&sortOrder=ascending"
+    )
+
+    actual = build_arxiv_query_url(start_time, start_time, 1000, 2000)
+
+    assert expected == actual
+
+
+def test_build_arxiv_query_url_filters_by_categories():
+    start_time = datetime(2025, 1, 1)
+
+    expected = (
+        "http://export.arxiv.org/api/query?search_query="
+        "%28cat:cs.*+OR+cat:stat.ML%29+AND+lastUpdatedDate:"
+        "[202501010000+TO+202501010000]&max_results=1000"
+        "&sortBy=lastUpdatedDate&sortOrder=ascending"
+    )
+
+    actual = build_arxiv_query_url(
+        start_time, start_time, 1000, categories=["cs.*", "stat.ML"]
+    )
+
+    assert expected == actual
+
+
+def test_build_arxiv_query_url_filters_by_single_category():
+    start_time = datetime(2025, 1, 1)
+
+    actual = build_arxiv_query_url(start_time, start_time, 10, categories=["hep-th"])
+
+    assert "search_query=cat:hep-th+AND+lastUpdatedDate:" in actual
+
+
+@pytest.mark.parametrize("category", ["cs.AI OR 1", "", "CS.*", "cs.AI)"])
+def test_build_arxiv_query_url_rejects_malformed_categories(category):
+    with pytest.raises(ValueError):
+        build_arxiv_query_url(DUMMY_DATE, DUMMY_DATE, 10, categories=[category])
+
+
 def test_build_arxiv_query_url_rejects_invalid_time_range(caplog):
     start_time = datetime(2020, 1, 1)
     end_time = datetime(2019, 1, 1)
@@ -53,43 +119,107 @@ def test_build_arxiv_query_url_rejects_invalid_time_range(caplog):
 
 
 def test_fetch_articles_from_arxiv_api_builds_query_with_correct_args(
-    build_query_mock, http_get_mock, etree_fromstring_mock
+    build_query_mock, http_get_mock, parse_xml_stream_mock
 ):
     input_date_1 = datetime(2000, 1, 2)
     input_date_2 = datetime(2000, 3, 4)
     max_results = 234
     fetch_articles_from_arxiv_api(input_date_1, input_date_2, max_results)
-    build_query_mock.assert_called_once_with(input_date_1, input_date_2, max_results)
+    build_query_mock.assert_called_once_with(
+        input_date_1, input_date_2, max_results, 0, None
+    )
 
 
 def test_fetch_articles_from_arxiv_api_makes_request_with_correct_url(
-    build_query_mock, http_get_mock, etree_fromstring_mock
+    build_query_mock, http_get_mock, parse_xml_stream_mock
 ):
     sample_url = "sample-query-url.com"
     build_query_mock.return_value = sample_url
 
     fetch_articles_from_arxiv_api(DUMMY_DATE, DUMMY_DATE, 0)
 
-    http_get_mock.assert_called_once_with(sample_url)
+    http_get_mock.assert_called_once_with(
+        sample_url,
+        timeout=API_TIMEOUT_SECONDS,
+        stream=True,
+        headers={"Accept-Encoding": "gzip"},
+    )
 
 
-def test_fetch_articles_from_arxiv_api_parses_http_response_to_xml_string(
-    http_get_mock, etree_fromstring_mock
+def test_fetch_articles_from_arxiv_api_parses_streamed_response(
+    http_get_mock, parse_xml_stream_mock
 ):
-    sample_xml = "<xml>sample xml</xml>"
     sample_response = Mock()
-    sample_response.text = sample_xml
     http_get_mock.return_value = sample_response
     fetch_articles_from_arxiv_api(DUMMY_DATE, DUMMY_DATE, 0)
 
-    etree_fromstring_mock.assert_called_once_with(sample_xml)
+    parse_xml_stream_mock.assert_called_once_with(sample_response, None)
+    sample_response.close.assert_called_once()
+
+
+def test_parse_xml_stream_decompresses_gzipped_body():
+    sample_xml = b"<feed><entry>" + b"abstract " * 500 + b"</entry></feed>"
+    body = gzip.compress(sample_xml)
+    stats = RunStats()
+
+    root = parse_xml_stream(build_streamed_response(body, "gzip"), stats)
+
+    assert root.tag == "feed"
+    assert root[0].text == "abstract " * 500
+    assert stats.bytes_received == len(body)
+    assert stats.bytes_decoded == len(sample_xml)
+    assert stats.bytes_received < stats.bytes_decoded
+    assert stats.decompress_seconds > 0
+
+
+def test_parse_xml_stream_reads_uncompressed_body():
+    sample_xml = b"<feed><entry>sample</entry></feed>"
+    stats = RunStats()
+
+    root = parse_xml_stream(build_streamed_response(sample_xml, None), stats)
+
+    assert root[0].text == "sample"
+    assert stats.bytes_received == stats.bytes_decoded == len(sample_xml)
+    assert stats.decompress_seconds == 0
+
+
+def test_parse_xml_stream_raises_parse_error_on_truncated_body():
+    body = gzip.compress(b"<feed><entry>sample</entry></feed>")[:-12]
+
+    with pytest.raises(ET.ParseError):
+        parse_xml_stream(build_streamed_response(body, "gzip"))
+
+
+def build_failing_response(error: Exception):
+    def chunks():
+        yield b"<feed><entry>"
+        raise error
+
+    response = Mock()
+    response.headers = {}
+    response.raw.stream.return_value = chunks()
+    return response
+
+
+def test_parse_xml_stream_raises_timeout_on_stalled_body():
+    response = build_failing_response(ReadTimeoutError(None, None, "read timed out"))
+
+    with pytest.raises(requests.Timeout):
+        parse_xml_stream(response)
+
+
+def test_parse_xml_stream_raises_connection_error_on_dropped_connection():
+    response = build_failing_response(ProtocolError("connection broken"))
+
+    with pytest.raises(requests.ConnectionError):
+        parse_xml_stream(response)
 
 
 def test_fetch_articles_from_arxiv_api_respects_max_results_threshold(
-    http_get_mock, etree_fromstring_mock
+    http_get_mock, parse_xml_stream_mock
 ):
     # doesn't error
-    fetch_articles_from_arxiv_api(DUMMY_DATE, DUMMY_DATE, 1000)
+    fetch_articles_from_arxiv_api(DUMMY_DATE, DUMMY_DATE, 30000)
     # errors
     with pytest.raises(ValueError):
-        fetch_articles_from_arxiv_api(DUMMY_DATE, DUMMY_DATE, 1001)
+        fetch_articles_from_arxiv_api(DUMMY_DATE, DUMMY_DATE, 30001)
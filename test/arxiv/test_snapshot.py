@@ -0,0 +1,68 @@
+import gzip
+import shutil
+from datetime import datetime
+
+import pytest
+
+from arxiv.snapshot import parse_snapshot_line_to_article, read_snapshot_lines
+
+SAMPLE_SNAPSHOT_PATH = "test/fixtures/snapshot_sample.jsonl"
+
+
+# this fixture is linked to the contents of test/fixtures/snapshot_sample.jsonl
+@pytest.fixture()
+def sample_snapshot_lines():
+    return list(read_snapshot_lines(SAMPLE_SNAPSHOT_PATH))
+
+
+def test_read_snapshot_lines_skips_blank_lines(sample_snapshot_lines):
+    assert len(sample_snapshot_lines) == 3
+
+
+def test_read_snapshot_lines_decompresses_gzip(tmp_path, sample_snapshot_lines):
+    gz_path = tmp_path / "snapshot.jsonl.gz"
+    with open(SAMPLE_SNAPSHOT_PATH, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+    assert list(read_snapshot_lines(str(gz_path))) == sample_snapshot_lines
+
+
+def test_parse_snapshot_line_to_article_new_fmt(sample_snapshot_lines):
+    article = parse_snapshot_line_to_article(sample_snapshot_lines[0])
+
+    assert article.id == "0704.0001"
+    assert article.title.startswith("Calculation of prompt diphoton")
+    assert article.created_at == datetime(2007, 4, 2, 19, 18, 42)
+    assert article.updated_at == datetime(2007, 7, 24, 20, 10, 27)
+    assert article.categories == ["hep-ph"]
+    assert "perturbative quantum chromodynamics" in article.abstract
+    assert article.authors == [
+        "C. Balázs",
+        "E. L. Berger",
+        "P. M. Nadolsky",
+        "C. -P. Yuan",
+    ]
+
+
+def test_parse_snapshot_line_to_article_old_fmt(sample_snapshot_lines):
+    article = parse_snapshot_line_to_article(sample_snapshot_lines[1])
+
+    assert article.id == "math/0309136"
+    assert article.created_at == article.updated_at
+    assert article.categories == ["math.GT", "math.CO"]
+    assert article.authors == ["Dylan P. Thurston"]
+
+
+def test_parse_snapshot_line_to_article_rejects_bad_id(sample_snapshot_lines):
+    with pytest.raises(ValueError):
+        parse_snapshot_line_to_article(sample_snapshot_lines[2])
+
+
+def test_parse_snapshot_line_to_article_rejects_invalid_json():
+    with pytest.raises(ValueError):
+        parse_snapshot_line_to_article('{"id": "0704.0001", ')
+
+
+def test_parse_snapshot_line_to_article_rejects_missing_versions():
+    with pytest.raises(ValueError):
+        parse_snapshot_line_to_article('{"id": "0704.0001", "versions": []}')
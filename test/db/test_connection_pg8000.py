@@ -1,6 +1,7 @@
-from unittest.mock import patch
+from unittest.mock import call, patch
 
 import pytest
+from pg8000.core import IDLE, IN_TRANSACTION
 
 from db.connection import Pg8000Connection
 
@@ -70,3 +71,55 @@ def test_connection_close_closes_pg8000_connection(pg8000_close_mock):
     conn = Pg8000Connection()
     conn.close()
     pg8000_close_mock.assert_called_once()
+
+
+def fetching_conn(pg8000_conn_mock, status: bytes, batches: list) -> Pg8000Connection:
+    pg8000_conn = pg8000_conn_mock.return_value
+    pg8000_conn._transaction_status = status
+    pg8000_conn.run.side_effect = lambda query_str, **kwargs: (
+        batches.pop(0) if query_str.startswith("FETCH") else None
+    )
+    return Pg8000Connection(password="pw", url="url")
+
+
+def test_pg8000_connection_stream_fetches_batches_in_own_transaction(
+    pg8000_conn_mock,
+):
+    conn = fetching_conn(pg8000_conn_mock, IDLE, [[[1], [2]], [[3]]])
+
+    batches = list(conn.stream("SELECT id FROM t WHERE a=:a", batch_size=2, a=1))
+
+    assert batches == [[[1], [2]], [[3]]]
+    assert pg8000_conn_mock.return_value.run.call_args_list == [
+        call("START TRANSACTION;"),
+        call("DECLARE stream_0 NO SCROLL CURSOR FOR SELECT id FROM t WHERE a=:a", a=1),
+        call("FETCH FORWARD 2 FROM stream_0;"),
+        call("FETCH FORWARD 2 FROM stream_0;"),
+        call("COMMIT;"),
+    ]
+
+
+def test_pg8000_connection_stream_closes_cursor_when_stopped_early(
+    pg8000_conn_mock,
+):
+    conn = fetching_conn(pg8000_conn_mock, IN_TRANSACTION, [[[1], [2]], [[3], [4]]])
+
+    stream = conn.stream("SELECT id FROM t", batch_size=2)
+    assert next(stream) == [[1], [2]]
+    stream.close()
+
+    run_mock = pg8000_conn_mock.return_value.run
+    assert run_mock.call_args_list[-1] == call("CLOSE stream_0;")
+    assert call("COMMIT;") not in run_mock.call_args_list
+
+
+def test_pg8000_connection_stream_rolls_back_own_transaction_on_error(
+    pg8000_conn_mock,
+):
+    conn = fetching_conn(pg8000_conn_mock, IDLE, [])
+
+    with pytest.raises(IndexError):
+        list(conn.stream("SELECT id FROM t"))
+
+    run_mock = pg8000_conn_mock.return_value.run
+    assert run_mock.call_args_list[-1] == call("ROLLBACK;")
@@ -0,0 +1,98 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from db.instrumentation import (
+    InstrumentedConnection,
+    QueryStats,
+    QueryStatsRegistry,
+    fingerprint_query,
+    instrument,
+)
+
+
+def test_fingerprint_query_replaces_literals_and_collapses_whitespace():
+    assert (
+        fingerprint_query(
+            "SELECT *  FROM Article_y2024\n WHERE id = '0704.0001' LIMIT 10"
+        )
+        == "SELECT * FROM Article_y2024 WHERE id = ? LIMIT ?"
+    )
+    assert fingerprint_query("DELETE FROM t WHERE a=:a") == "DELETE FROM t WHERE a=:a"
+
+
+def test_query_stats_histogram_bounds_percentiles():
+    stats = QueryStats()
+    for seconds in [0.0005] * 90 + [0.3] * 9 + [9.0]:
+        stats.add(seconds)
+
+    assert stats.count == 100
+    assert stats.percentile_ms(0.5) == 1
+    assert stats.percentile_ms(0.95) == 500
+    assert stats.percentile_ms(1.0) == 9000
+
+
+def test_instrumented_connection_records_per_fingerprint():
+    inner = Mock()
+    inner.run.return_value = [[1]]
+    registry = QueryStatsRegistry()
+    conn = InstrumentedConnection(inner, registry, slow_query_seconds=60)
+
+    assert conn.run("SELECT 1 FROM t WHERE id=:id", id=4) == [[1]]
+    conn.run("SELECT 2 FROM t WHERE id=:id", id=5)
+
+    inner.run.assert_called_with("SELECT 2 FROM t WHERE id=:id", id=5)
+    assert registry.stats["SELECT ? FROM t WHERE id=:id"].count == 2
+    assert "SELECT ? FROM t WHERE id=:id" in registry.summary()
+
+
+def test_instrumented_connection_records_failing_queries():
+    inner = Mock()
+    inner.run.side_effect = RuntimeError("query failed")
+    registry = QueryStatsRegistry()
+    conn = InstrumentedConnection(inner, registry, slow_query_seconds=60)
+
+    with pytest.raises(RuntimeError):
+        conn.run("DELETE FROM t;")
+
+    assert registry.stats["DELETE FROM t;"].count == 1
+
+
+@patch("db.instrumentation.LOG")
+def test_instrumented_connection_explains_slow_queries_once(log_mock):
+    inner = Mock()
+    inner.run.side_effect = lambda query_str, **kwargs: (
+        [["Seq Scan on t"]] if query_str.startswith("EXPLAIN") else []
+    )
+    conn = InstrumentedConnection(inner, QueryStatsRegistry(), slow_query_seconds=0)
+
+    conn.run("DELETE FROM t WHERE id=:id", id=1)
+    conn.run("DELETE FROM t WHERE id=:id", id=2)
+    conn.run("COMMIT;")
+
+    explains = [c for c in inner.run.call_args_list if c.args[0].startswith("EXPLAIN")]
+    assert len(explains) == 1
+    assert explains[0].kwargs == {"id": 1}
+    assert "Seq Scan on t" in log_mock.warning.call_args_list[0].args[0]
+    assert log_mock.warning.call_count == 3
+
+
+def test_instrument_returns_connection_untouched_when_disabled():
+    inner = Mock()
+
+    assert instrument(inner, enabled=False) is inner
+    assert isinstance(instrument(inner, enabled=True), InstrumentedConnection)
+
+
+def test_instrumented_connection_times_streamed_batches():
+    inner = Mock()
+    inner.stream.return_value = (batch for batch in [[[1], [2]], [[3]]])
+    registry = QueryStatsRegistry()
+    conn = InstrumentedConnection(inner, registry, slow_query_seconds=60)
+
+    batches = list(conn.stream("SELECT id FROM t WHERE a=:a", batch_size=2, a=1))
+
+    assert batches == [[[1], [2]], [[3]]]
+    inner.stream.assert_called_once_with("SELECT id FROM t WHERE a=:a", 2, a=1)
+    # two batches, then the fetch finding the stream exhausted
+    assert registry.stats["SELECT id FROM t WHERE a=:a"].count == 3
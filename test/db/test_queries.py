@@ -1,4 +1,6 @@
-from datetime import datetime
+import io
+import json
+from datetime import date, datetime
 from typing import Generator
 
 import pytest
@@ -6,19 +8,84 @@ from pg8000 import DatabaseError
 from testcontainers.postgres import PostgresContainer
 
 from article import Article
+from arxiv.ids import OLD_FORMAT_ARCHIVES, decode_arxiv_id, encode_arxiv_id
 from db.connection import Pg8000Connection
 from db.queries import (
     PG_TIME_FMT,
+    add_article_num_id_column,
+    add_constraint_not_valid,
+    claim_rate_limit_slot,
+    constrain_article_num_id,
+    copy_query_to_stream,
+    copy_rows_into_table,
+    create_archive_prefix_table,
+    create_article_author_table,
     create_article_category_table,
+    create_article_search_index,
     create_article_table,
+    create_author_table,
     create_category_table,
+    create_duplicate_tables,
+    create_ingest_checkpoint_table,
+    create_ingest_ledger_tables,
+    create_keyword_counts_table,
+    create_keyword_occurrence_table,
+    create_keyword_occurrence_view,
+    create_keyword_table,
+    create_rate_limit_table,
+    create_staging_tables,
+    create_trend_tables,
+    create_year_partition,
+    delete_article_authors_for_articles,
+    delete_article_signatures,
     drop_article_table,
+    drop_constraint,
+    drop_index,
+    finish_ingest_run,
+    insert_archive_prefixes,
     insert_article,
+    insert_article_authors,
     insert_article_category,
+    insert_article_signatures,
     insert_categories,
+    insert_duplicate_articles,
+    insert_ingest_pages,
+    insert_ingest_run,
+    insert_keyword_occurrence,
+    insert_keywords,
+    insert_signature_bands,
+    is_partitioned_table,
+    iter_article_columns,
+    iter_articles_updated_between,
+    iter_distinct_titles,
+    iter_keyword_occurrences,
+    merge_staged_articles,
+    migrate_keyword_occurrences_to_counts,
+    refresh_trends_for_months,
+    rekey_on_article_num_id,
+    search_articles,
+    seed_ingest_checkpoint,
     select_article,
+    select_article_created_at_range,
+    select_article_ids_after,
+    select_article_signatures,
+    select_band_matches,
+    select_duplicate_clusters,
+    select_foreign_keys,
+    select_ingest_checkpoint,
+    select_ingest_throughput,
+    select_keyword_totals,
+    select_keyword_trend,
     select_most_recent_updated_at,
+    select_secondary_indexes,
+    select_slow_pages,
     update_article,
+    update_article_num_ids,
+    update_duplicate_canonicals,
+    upsert_authors,
+    upsert_ingest_checkpoint,
+    upsert_keyword_counts,
+    validate_constraint,
 )
 
 
@@ -74,7 +141,7 @@ def test_create_article_table_fails_if_already_exists(conn):
 
 
 def test_insert_article(conn):
-    id_ = "id_123"
+    id_ = "2001.00123"
     title = "title_123"
     created_at = datetime(2025, 8, 8)
     updated_at = datetime(2025, 9, 9)
@@ -91,7 +158,7 @@ def test_insert_article(conn):
 
 
 def test_insert_article_fails_on_duplicate_id(conn):
-    id_common = "id_123"
+    id_common = "2001.00123"
     title_1 = "title_999"
     title_2 = "title_888"
     created_at_1 = datetime(2024, 6, 6)
@@ -109,7 +176,7 @@ def test_insert_article_fails_on_duplicate_id(conn):
 
 
 def test_select_article(conn):
-    id_ = "math/123"
+    id_ = "math/0101123"
     title = "Math and Math and Math"
     created_at = datetime(2007, 6, 6)
     updated_at = datetime(2007, 7, 7)
@@ -134,22 +201,22 @@ def test_select_article_returns_none_on_nohit(conn):
 
 
 def test_select_most_recent_updated_at(conn):
-    id_1 = "sample_id_1"
+    id_1 = "2001.00001"
     title_1 = "Sample Title 1"
     created_at_1 = datetime(2000, 1, 1)
     updated_at_1 = datetime(2000, 1, 1)
     arti_1 = Article(id_1, title_1, created_at_1, updated_at_1)
-    id_2 = "sample_id_2"
+    id_2 = "2001.00002"
     title_2 = "Sample Title 2"
     created_at_2 = datetime(2000, 1, 1)
     updated_at_2 = datetime(2000, 1, 17)
     arti_2 = Article(id_2, title_2, created_at_2, updated_at_2)
-    id_3 = "sample_id_3"
+    id_3 = "2001.00003"
     title_3 = "Sample Title 3"
     created_at_3 = datetime(2000, 1, 17)
     updated_at_3 = datetime(2000, 1, 29)  # newest updated_at date
     arti_3 = Article(id_3, title_3, created_at_3, updated_at_3)
-    id_4 = "sample_id_4"
+    id_4 = "2001.00004"
     title_4 = "Sample Title 4"
     created_at_4 = datetime(2000, 1, 23)
     updated_at_4 = datetime(2000, 1, 23)
@@ -176,7 +243,7 @@ def test_select_most_recent_updated_at_returns_none_if_table_is_empty(conn):
 
 
 def test_update_article_all_fields(conn):
-    id_ = "nah_ID_win"
+    id_ = "2002.00001"
     title = "Cool Title"
     created_at = datetime(2000, 1, 1)
     updated_at = datetime(2000, 1, 1)
@@ -203,7 +270,7 @@ def test_update_article_all_fields(conn):
 
 
 def test_update_article_no_fields(conn):
-    id_ = "nah_ID_lose"
+    id_ = "2002.00002"
     title = "Lame Title"
     created_at = datetime(1999, 1, 1)
     updated_at = datetime(1999, 1, 1)
@@ -298,7 +365,7 @@ def test_create_article_category_table_noops_if_exists(conn):
 
 
 def test_insert_article_category(conn):
-    article_id = "abc"
+    article_id = "0704.0001"
     article_title = "A B C"
     category_id = 555
     category_name = "Alphabet"
@@ -313,12 +380,12 @@ def test_insert_article_category(conn):
 
     expected_join = [[article_title, category_name]]
 
-    insert_article_category(conn, article_id, category_id)
+    insert_article_category(conn, article_id, category_id, article.created_at)
 
     actual_join = conn.run(
         "SELECT a.title, c.name "
         "FROM Article a "
-        "JOIN Article_Category ac ON a.id = ac.article_id "
+        "JOIN Article_Category ac ON a.num_id = ac.article_id "
         "JOIN Category c ON c.id = ac.category_id;"
     )
 
@@ -335,11 +402,11 @@ def test_insert_article_category_fails_if_article_does_not_exist(conn):
     insert_categories(conn, [{"id": category_id, "code": "a", "name": "ABC"}])
 
     with pytest.raises(DatabaseError):
-        insert_article_category(conn, "not_an_id", category_id)
+        insert_article_category(conn, "0704.9999", category_id, datetime(7, 7, 7))
 
 
 def test_insert_article_category_fails_if_category_does_not_exist(conn):
-    article_id = 555
+    article_id = "0704.0555"
     article = Article(article_id, "abc", datetime(7, 7, 7), datetime(7, 7, 7))
 
     create_article_table(conn)
@@ -349,4 +416,625 @@ def test_insert_article_category_fails_if_category_does_not_exist(conn):
     insert_article(conn, article)
 
     with pytest.raises(DatabaseError):
-        insert_article_category(conn, article_id, 4040404)
+        insert_article_category(conn, article_id, 4040404, article.created_at)
+
+
+def test_search_articles_ranks_title_matches_first(conn):
+    date = datetime(2020, 1, 1)
+    title_hit = Article(
+        "2001.00001",
+        "Graph neural networks",
+        date,
+        date,
+        abstract="We study message passing.",
+    )
+    abstract_hit = Article(
+        "2001.00002",
+        "Message passing",
+        date,
+        date,
+        abstract="We study graph neural networks.",
+    )
+    no_hit = Article("2001.00003", "Rocks", date, date, abstract="We study rocks.")
+
+    create_article_table(conn)
+    create_article_search_index(conn)
+    insert_article(conn, title_hit)
+    insert_article(conn, abstract_hit)
+    insert_article(conn, no_hit)
+
+    results = search_articles(conn, '"graph neural networks"')
+
+    assert [article.id for article, _ in results] == [title_hit.id, abstract_hit.id]
+    assert results[0][1] > results[1][1]
+
+
+def test_search_articles_filters_by_date_range(conn):
+    old = Article("9901.0001", "Old lasers", datetime(1999, 1, 1), datetime(1999, 1, 1))
+    new = Article("2401.0001", "New lasers", datetime(2024, 1, 1), datetime(2024, 1, 1))
+
+    create_article_table(conn)
+    insert_article(conn, old)
+    insert_article(conn, new)
+
+    results = search_articles(conn, "lasers", start=datetime(2000, 1, 1))
+
+    assert [article.id for article, _ in results] == [new.id]
+
+
+def test_search_articles_filters_by_category(conn):
+    in_cat = Article("2401.0001", "Lasers", datetime(2024, 1, 1), datetime(2024, 1, 1))
+    out_cat = Article("2401.0002", "Lasers", datetime(2024, 1, 1), datetime(2024, 1, 1))
+
+    create_article_table(conn)
+    create_category_table(conn)
+    create_article_category_table(conn)
+    insert_categories(
+        conn,
+        [
+            {"id": 1, "code": "physics.optics", "name": "Optics"},
+            {"id": 2, "code": "cs.LG", "name": "Machine Learning"},
+        ],
+    )
+    insert_article(conn, in_cat)
+    insert_article(conn, out_cat)
+    insert_article_category(conn, in_cat.id, 1, in_cat.created_at)
+    insert_article_category(conn, out_cat.id, 2, out_cat.created_at)
+
+    results = search_articles(conn, "lasers", category_codes=["physics.optics"])
+
+    assert [article.id for article, _ in results] == [in_cat.id]
+
+
+def test_refresh_trends_for_months_only_touches_given_months(conn):
+    jan = Article("2401.0001", "A", datetime(2024, 1, 5), datetime(2024, 1, 5))
+    jan_2 = Article("2401.0002", "B", datetime(2024, 1, 31), datetime(2024, 2, 1))
+    feb = Article("2402.0001", "C", datetime(2024, 2, 1), datetime(2024, 2, 1))
+
+    create_article_table(conn)
+    create_category_table(conn)
+    create_article_category_table(conn)
+    create_keyword_table(conn)
+    create_keyword_occurrence_table(conn)
+    create_trend_tables(conn)
+    create_duplicate_tables(conn)
+    insert_categories(conn, [{"id": 1, "code": "cs.LG", "name": "ML"}])
+    insert_keywords(conn, [{"id": 0, "name": "training"}])
+    for article, total in ((jan, 2), (jan_2, 3), (feb, 7)):
+        insert_article(conn, article)
+        insert_article_category(conn, article.id, 1, article.created_at)
+        insert_keyword_occurrence(conn, article.id, 0, total, article.created_at)
+
+    refresh_trends_for_months(conn, [date(2024, 1, 1)])
+
+    assert select_keyword_trend(conn, 0) == [(date(2024, 1, 1), 2, 5)]
+    assert conn.run("SELECT month, category_id, articles FROM CategoryTrend;") == [
+        [date(2024, 1, 1), 1, 2]
+    ]
+
+
+def test_merge_staged_articles_upserts_newer_and_skips_older(conn):
+    stored_old = Article("2001.0001", "Old", datetime(2020, 1, 1), datetime(2020, 1, 1))
+    stored_new = Article("2001.0002", "New", datetime(2020, 1, 1), datetime(2022, 1, 1))
+
+    create_article_table(conn)
+    create_category_table(conn)
+    create_article_category_table(conn)
+    create_author_table(conn)
+    create_article_author_table(conn)
+    create_keyword_table(conn)
+    create_keyword_occurrence_table(conn)
+    create_staging_tables(conn)
+    insert_categories(conn, [{"id": 1, "code": "cs.LG", "name": "ML"}])
+    insert_article(conn, stored_old)
+    insert_article(conn, stored_new)
+
+    conn.run("START TRANSACTION;")
+    copy_rows_into_table(
+        conn,
+        "Staging_Article",
+        ["id", "num_id", "title", "created_at", "updated_at", "abstract"],
+        [
+            (
+                "2001.0001",
+                encode_arxiv_id("2001.0001"),
+                "Old v2",
+                datetime(2020, 1, 1),
+                datetime(2021, 1, 1),
+                "",
+            ),
+            (
+                "2001.0002",
+                encode_arxiv_id("2001.0002"),
+                "New v0",
+                datetime(2020, 1, 1),
+                datetime(2021, 1, 1),
+                "",
+            ),
+            (
+                "2001.0003",
+                encode_arxiv_id("2001.0003"),
+                "Brand new",
+                datetime(2021, 1, 1),
+                datetime(2021, 1, 1),
+                None,
+            ),
+        ],
+    )
+    copy_rows_into_table(
+        conn,
+        "Staging_Article_Category",
+        ["article_id", "category_id"],
+        [(encode_arxiv_id(f"2001.000{i}"), 1) for i in range(1, 4)],
+    )
+    merge_staged_articles(conn)
+    conn.run("COMMIT;")
+
+    assert conn.run("SELECT id, title FROM Article ORDER BY id;") == [
+        ["2001.0001", "Old v2"],
+        ["2001.0002", "New"],
+        ["2001.0003", "Brand new"],
+    ]
+    assert conn.run(
+        "SELECT article_id, created_at FROM Article_Category ORDER BY 1;"
+    ) == [
+        [encode_arxiv_id("2001.0001"), datetime(2020, 1, 1)],
+        [encode_arxiv_id("2001.0003"), datetime(2021, 1, 1)],
+    ]
+    # staging tables are emptied on commit
+    assert conn.run("SELECT * FROM Staging_Article;") == []
+
+
+def test_ingest_checkpoint_is_tracked_per_scope_and_never_moves_back(conn):
+    create_ingest_checkpoint_table(conn)
+
+    assert select_ingest_checkpoint(conn, "all") is None
+
+    upsert_ingest_checkpoint(conn, "all", datetime(2025, 1, 1))
+    upsert_ingest_checkpoint(conn, "cs.*", datetime(2025, 3, 1))
+    upsert_ingest_checkpoint(conn, "cs.*", datetime(2025, 2, 1))
+
+    assert select_ingest_checkpoint(conn, "all") == datetime(2025, 1, 1)
+    assert select_ingest_checkpoint(conn, "cs.*") == datetime(2025, 3, 1)
+
+
+def test_ingest_checkpoint_is_seeded_only_before_any_exists(conn):
+    create_article_table(conn)
+    create_ingest_checkpoint_table(conn)
+
+    # nothing to seed from
+    seed_ingest_checkpoint(conn, "all")
+    assert select_ingest_checkpoint(conn, "all") is None
+
+    insert_article(
+        conn, Article("2401.00001", "A", datetime(2024, 1, 1), datetime(2024, 2, 1))
+    )
+    seed_ingest_checkpoint(conn, "all")
+    insert_article(
+        conn, Article("2401.00002", "B", datetime(2024, 1, 1), datetime(2024, 3, 1))
+    )
+    seed_ingest_checkpoint(conn, "all")
+
+    assert select_ingest_checkpoint(conn, "all") == datetime(2024, 2, 1)
+
+
+def test_claim_rate_limit_slot_spaces_out_consecutive_claims(conn):
+    create_rate_limit_table(conn)
+
+    first = claim_rate_limit_slot(conn, "test_service", 2)
+    second = claim_rate_limit_slot(conn, "test_service", 2)
+    third = claim_rate_limit_slot(conn, "test_service", 2)
+    other = claim_rate_limit_slot(conn, "other_service", 2)
+
+    assert first <= 0
+    assert 1.5 < second <= 2
+    assert 3.5 < third <= 4
+    # each service has its own slots
+    assert other <= 0
+
+
+def test_keyword_occurrence_view_presents_counts_as_rows(conn):
+    create_article_table(conn)
+    create_keyword_table(conn)
+    insert_keywords(conn, [{"id": i, "name": f"kw{i}"} for i in range(4)])
+    create_keyword_counts_table(conn)
+    create_keyword_occurrence_view(conn)
+    for id_, created_at in [("2401.00001", 2024), ("1501.00001", 2015)]:
+        insert_article(
+            conn,
+            Article(id_, "T", datetime(created_at, 1, 1), datetime(created_at, 1, 1)),
+        )
+    upsert_keyword_counts(conn, "2401.00001", [2, 0, 0, 1], datetime(2024, 1, 1))
+    upsert_keyword_counts(conn, "1501.00001", [0, 3, 0, 4], datetime(2015, 1, 1))
+    # replaces the stored counts
+    upsert_keyword_counts(conn, "1501.00001", [0, 3, 0, 4], datetime(2015, 1, 1))
+
+    rows = conn.run(
+        "SELECT article_id, keyword_id, total FROM KeywordOccurrence "
+        "ORDER BY article_id, keyword_id"
+    )
+    totals = select_keyword_totals(conn)
+    recent_totals = select_keyword_totals(conn, start=datetime(2020, 1, 1))
+
+    assert [[decode_arxiv_id(row[0])] + row[1:] for row in rows] == [
+        ["1501.00001", 1, 3],
+        ["1501.00001", 3, 4],
+        ["2401.00001", 0, 2],
+        ["2401.00001", 3, 1],
+    ]
+    assert totals == {0: (1, 2), 1: (1, 3), 3: (2, 5)}
+    assert recent_totals == {0: (1, 2), 3: (1, 1)}
+
+
+def test_insert_archive_prefixes_maps_codes_to_archives(conn):
+    create_archive_prefix_table(conn)
+
+    insert_archive_prefixes(conn)
+    # does not raise, nor duplicate, when run again
+    insert_archive_prefixes(conn)
+
+    rows = conn.run("SELECT code, archive FROM ArchivePrefix ORDER BY code;")
+    assert [row[1] for row in rows] == list(OLD_FORMAT_ARCHIVES)
+
+
+def test_article_ids_migrate_to_num_id_keys(conn):
+    # the schema before ids were encoded
+    conn.run("CREATE TABLE Article (id VARCHAR(20) PRIMARY KEY);")
+    conn.run(
+        "CREATE TABLE Article_Category ("
+        "   article_id VARCHAR(20) REFERENCES Article (id), category_id INTEGER"
+        ");"
+    )
+    ids = ["0704.0001", "1501.00001", "math/0101001"]
+    for id_ in ids:
+        conn.run("INSERT INTO Article (id) VALUES (:id);", id=id_)
+        conn.run("INSERT INTO Article_Category VALUES (:id, 1);", id=id_)
+
+    add_article_num_id_column(conn)
+    first = select_article_ids_after(conn, "", 2)
+    rest = select_article_ids_after(conn, first[-1], 2)
+    for batch in (first, rest):
+        update_article_num_ids(conn, batch, [encode_arxiv_id(id_) for id_ in batch])
+    constrain_article_num_id(conn)
+    rekey_on_article_num_id(conn, "Article_Category")
+
+    assert first + rest == ids
+    assert conn.run(
+        "SELECT a.id, ac.article_id FROM Article a "
+        "JOIN Article_Category ac ON ac.article_id = a.num_id ORDER BY a.id;"
+    ) == [[id_, encode_arxiv_id(id_)] for id_ in ids]
+    with pytest.raises(DatabaseError):
+        conn.run("INSERT INTO Article_Category VALUES (42, 1);")
+
+
+def test_upsert_authors_returns_ids_of_new_and_existing_authors(conn):
+    create_author_table(conn)
+
+    first = upsert_authors(conn, ["Ada Lovelace"], ["ada lovelace"])
+    second = upsert_authors(
+        conn, ["ADA LOVELACE", "Alan Turing"], ["ada lovelace", "alan turing"]
+    )
+
+    assert second["ada lovelace"] == first["ada lovelace"]
+    assert len(set(second.values())) == 2
+    # the first spelling seen is kept
+    assert conn.run("SELECT name FROM Author ORDER BY id;") == [
+        ["Ada Lovelace"],
+        ["Alan Turing"],
+    ]
+
+
+def test_article_authors_are_replaced_per_batch(conn):
+    create_article_table(conn)
+    create_author_table(conn)
+    create_article_author_table(conn)
+    for id_ in ["2001.00001", "2001.00002"]:
+        insert_article(
+            conn, Article(id_, "T", datetime(2020, 1, 1), datetime(2020, 1, 1))
+        )
+    ids = upsert_authors(conn, ["A", "B"], ["a", "b"])
+
+    created_at = datetime(2020, 1, 1)
+
+    insert_article_authors(
+        conn,
+        [
+            ("2001.00001", 0, ids["a"], created_at),
+            ("2001.00002", 0, ids["a"], created_at),
+        ],
+    )
+    delete_article_authors_for_articles(conn, ["2001.00001"])
+    insert_article_authors(
+        conn,
+        [
+            ("2001.00001", 0, ids["b"], created_at),
+            ("2001.00001", 1, ids["a"], created_at),
+        ],
+    )
+
+    assert conn.run(
+        "SELECT a.id, aa.position, au.name FROM Article_Author aa "
+        "JOIN Article a ON a.num_id = aa.article_id "
+        "JOIN Author au ON au.id = aa.author_id ORDER BY 1, 2;"
+    ) == [["2001.00001", 0, "B"], ["2001.00001", 1, "A"], ["2001.00002", 0, "A"]]
+
+
+def test_secondary_indexes_and_foreign_keys_can_be_dropped_and_rebuilt(conn):
+    create_article_table(conn)
+    create_category_table(conn)
+    create_article_category_table(conn)
+    tables = ["Article", "Article_Category", "KeywordCounts"]
+
+    indexes = select_secondary_indexes(conn, tables)
+    foreign_keys = select_foreign_keys(conn, tables)
+    for name, table, _ in foreign_keys:
+        drop_constraint(conn, table, name)
+    for name, _, _ in indexes:
+        drop_index(conn, name)
+
+    assert {index[0] for index in indexes} == {
+        "article_created_at_idx",
+        "article_category_article_id_idx",
+    }
+    assert len(foreign_keys) == 2
+    assert select_secondary_indexes(conn, tables) == []
+    assert select_foreign_keys(conn, tables) == []
+
+    for _, _, definition in indexes:
+        conn.run(definition)
+    for name, table, definition in foreign_keys:
+        add_constraint_not_valid(conn, table, name, definition)
+        validate_constraint(conn, table, name)
+
+    assert select_secondary_indexes(conn, tables) == indexes
+    assert select_foreign_keys(conn, tables) == foreign_keys
+
+
+def test_partitioned_tables_route_rows_into_year_partitions(conn):
+    old = Article("1501.00001", "Old", datetime(2015, 6, 1), datetime(2015, 6, 1))
+    new = Article("2401.00001", "New", datetime(2024, 6, 1), datetime(2024, 6, 1))
+
+    create_article_table(conn, partitioned=True)
+    create_category_table(conn)
+    create_article_category_table(conn, partitioned=True)
+    create_keyword_table(conn)
+    create_keyword_occurrence_table(conn, partitioned=True)
+    create_trend_tables(conn)
+    create_duplicate_tables(conn)
+    insert_categories(conn, [{"id": 1, "code": "cs.LG", "name": "ML"}])
+    insert_keywords(conn, [{"id": 0, "name": "training"}])
+    for table in ["Article", "Article_Category", "KeywordOccurrence"]:
+        for year in (2015, 2024):
+            create_year_partition(conn, table, year)
+        # does not raise when run again
+        create_year_partition(conn, table, 2024)
+    for article in (old, new):
+        insert_article(conn, article)
+        insert_article_category(conn, article.id, 1, article.created_at)
+        insert_keyword_occurrence(conn, article.id, 0, 2, article.created_at)
+
+    refresh_trends_for_months(conn, [date(2024, 6, 1)])
+
+    assert is_partitioned_table(conn, "Article")
+    assert not is_partitioned_table(conn, "Category")
+    assert conn.run("SELECT id FROM Article_y2015;") == [[old.id]]
+    assert conn.run("SELECT COUNT(*) FROM Article_Category_y2024;") == [[1]]
+    assert select_keyword_trend(conn, 0) == [(date(2024, 6, 1), 1, 2)]
+    with pytest.raises(DatabaseError):
+        # no partition holds 2030
+        insert_article(
+            conn,
+            Article("3001.00001", "Future", datetime(2030, 1, 1), datetime(2030, 1, 1)),
+        )
+
+
+def test_keyword_occurrences_migrate_into_partitioned_counts(conn):
+    old = Article("1501.00001", "Old", datetime(2015, 6, 1), datetime(2015, 6, 1))
+    new = Article("2401.00001", "New", datetime(2024, 6, 1), datetime(2024, 6, 1))
+
+    create_article_table(conn)
+    create_keyword_table(conn)
+    create_keyword_occurrence_table(conn)
+    insert_keywords(conn, [{"id": 0, "name": "training"}])
+    for article in (old, new):
+        insert_article(conn, article)
+        insert_keyword_occurrence(conn, article.id, 0, 2, article.created_at)
+
+    migrate_keyword_occurrences_to_counts(conn, partitioned=True)
+
+    assert is_partitioned_table(conn, "KeywordCounts")
+    assert conn.run("SELECT counts FROM KeywordCounts_y2015;") == [[[2]]]
+    assert conn.run("SELECT counts FROM KeywordCounts_y2024;") == [[[2]]]
+
+
+def test_ingest_ledger_summarizes_runs_and_finds_slow_pages(conn):
+    create_ingest_ledger_tables(conn)
+    run_id = "7d444840-9dc0-11d1-b245-5ffdce74fad2"
+    window = datetime(2024, 1, 1)
+
+    insert_ingest_run(conn, run_id, "all", "api", window, window)
+    insert_ingest_pages(
+        conn,
+        run_id,
+        [
+            (1, window, window, 100, 10, 5, 80, 5, 3.0, 0.1, 0.4),
+            (2, window, window, 100, 0, 0, 100, 0, 9.0, 0.1, 0.1),
+            (3, None, None, 0, 0, 0, 0, 0, 0.5, 0.0, 0.0),
+        ],
+    )
+    finish_ingest_run(
+        conn,
+        run_id,
+        "finished",
+        {"pages": 3, "fetched": 200, "inserted": 10, "updated": 5},
+    )
+
+    throughput = select_ingest_throughput(conn, datetime(2000, 1, 1))
+    slow_pages = select_slow_pages(conn, limit=2, run_id=run_id)
+
+    assert [row[1:4] for row in throughput] == [(1, 200, 15)]
+    assert [(row[0], row[1]) for row in slow_pages] == [(run_id, 2), (run_id, 1)]
+    assert conn.run("SELECT status, skipped FROM IngestRun;") == [["finished", None]]
+
+
+def test_copy_query_to_stream_writes_csv_and_jsonl(conn):
+    create_article_table(conn)
+    assert select_article_created_at_range(conn) == (None, None)
+    first, last = datetime(2020, 1, 1), datetime(2021, 6, 1)
+    insert_article(conn, Article("2001.0001", 'A "quoted", title', first, first))
+    insert_article(conn, Article("2001.0002", "B", last, last))
+    query = "SELECT id, title FROM Article ORDER BY id"
+
+    csv_stream, jsonl_stream = io.BytesIO(), io.BytesIO()
+    copy_query_to_stream(conn, query, csv_stream, "csv")
+    copy_query_to_stream(conn, query, jsonl_stream, "jsonl")
+
+    assert csv_stream.getvalue().decode().splitlines() == [
+        "id,title",
+        '2001.0001,"A ""quoted"", title"',
+        "2001.0002,B",
+    ]
+    assert [json.loads(line) for line in jsonl_stream.getvalue().splitlines()] == [
+        {"id": "2001.0001", "title": 'A "quoted", title'},
+        {"id": "2001.0002", "title": "B"},
+    ]
+    assert select_article_created_at_range(conn) == (first, last)
+    with pytest.raises(ValueError):
+        copy_query_to_stream(conn, query, io.BytesIO(), "parquet")
+
+
+def test_stream_fetches_in_batches_inside_and_outside_transactions(conn):
+    conn.run("CREATE TABLE t (id INTEGER);")
+    conn.run("INSERT INTO t SELECT generate_series(1, 5);")
+    query = "SELECT id FROM t WHERE id > :after ORDER BY id"
+
+    assert list(conn.stream(query, batch_size=2, after=0)) == [
+        [[1], [2]],
+        [[3], [4]],
+        [[5]],
+    ]
+
+    conn.run("START TRANSACTION;")
+    stream = conn.stream(query, batch_size=2, after=2)
+    assert next(stream) == [[3], [4]]
+    stream.close()
+    conn.run("INSERT INTO t VALUES (6);")
+    conn.run("COMMIT;")
+
+    assert conn.run("SELECT COUNT(*) FROM t;") == [[6]]
+    assert conn.run("SELECT COUNT(*) FROM pg_cursors;") == [[0]]
+
+
+def test_iter_articles_updated_between_and_keyword_occurrences(conn):
+    create_article_table(conn)
+    create_keyword_table(conn)
+    insert_keywords(conn, [{"id": 0, "name": "graph"}, {"id": 1, "name": "tree"}])
+    create_keyword_occurrence_table(conn)
+    for i in range(1, 5):
+        updated_at = datetime(2024, i, 1)
+        insert_article(
+            conn, Article(f"2401.0000{i}", f"t{i}", datetime(2024, 1, 1), updated_at)
+        )
+        insert_keyword_occurrence(conn, f"2401.0000{i}", 0, i, datetime(2024, 1, 1))
+
+    batches = list(
+        iter_articles_updated_between(
+            conn, datetime(2024, 2, 1), datetime(2024, 4, 1), batch_size=1
+        )
+    )
+    occurrences = [row for batch in iter_keyword_occurrences(conn, 3) for row in batch]
+
+    assert [[a.id for a in batch] for batch in batches] == [
+        ["2401.00002"],
+        ["2401.00003"],
+    ]
+    assert occurrences == [(f"2401.0000{i}", 0, i) for i in range(1, 5)]
+
+
+def test_iter_article_columns_and_distinct_titles(conn):
+    created_at = datetime(2024, 1, 1)
+    create_article_table(conn)
+    create_category_table(conn)
+    insert_categories(conn, [{"id": 1, "code": "cs.AI", "name": "AI"}])
+    create_article_category_table(conn)
+    create_keyword_table(conn)
+    insert_keywords(conn, [{"id": 0, "name": "graph"}, {"id": 1, "name": "tree"}])
+    create_keyword_occurrence_table(conn)
+    for id_, title in [("2401.00001", "Trees"), ("2401.00002", "Graphs")]:
+        insert_article(conn, Article(id_, title, created_at, created_at))
+    insert_article(conn, Article("2401.00003", "Graphs", created_at, created_at))
+    insert_article_category(conn, "2401.00001", 1, created_at)
+    insert_keyword_occurrence(conn, "2401.00001", 1, 3, created_at)
+    insert_keyword_occurrence(conn, "2401.00001", 0, 2, created_at)
+
+    conn.run("START TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;")
+    rows = [row for batch in iter_article_columns(conn, 2) for row in batch]
+    titles = [title for batch in iter_distinct_titles(conn, 1) for title in batch]
+    conn.run("COMMIT;")
+
+    assert rows == [
+        [encode_arxiv_id("2401.00001"), created_at, created_at, 1, [1], [0, 1], [2, 3]],
+        [encode_arxiv_id("2401.00002"), created_at, created_at, 0, [], [], []],
+        [encode_arxiv_id("2401.00003"), created_at, created_at, 0, [], [], []],
+    ]
+    assert titles == ["Graphs", "Trees"]
+
+
+def test_signature_index_and_duplicates_round_trip(conn):
+    create_duplicate_tables(conn)
+    first, second, third = (encode_arxiv_id(f"2401.0000{i}") for i in (1, 2, 3))
+
+    insert_article_signatures(conn, [first, second], [[1, -2, 3], [4, 5, -6]])
+    insert_signature_bands(conn, [first, second], [[10, 20], [10, 21]])
+    insert_duplicate_articles(conn, [(second, first, 0.9), (third, first, 0.85)])
+
+    assert sorted(select_band_matches(conn, [0, 1], [10, 21])) == [
+        (0, 10, first),
+        (0, 10, second),
+        (1, 21, second),
+    ]
+    assert select_article_signatures(conn, [first, second, 42]) == {
+        first: ([1, -2, 3], None),
+        second: ([4, 5, -6], first),
+    }
+    assert select_duplicate_clusters(conn) == [
+        ("2401.00001", ["2401.00002", "2401.00003"])
+    ]
+
+    delete_article_signatures(conn, [second])
+
+    assert select_band_matches(conn, [1], [21]) == []
+    assert list(select_article_signatures(conn, [first, second])) == [first]
+    assert select_duplicate_clusters(conn) == [("2401.00001", ["2401.00003"])]
+
+    update_duplicate_canonicals(conn, [first], [second])
+
+    assert select_duplicate_clusters(conn) == [("2401.00002", ["2401.00003"])]
+
+
+def test_refresh_trends_for_months_leaves_out_duplicates(conn):
+    original = Article("2401.00001", "A", datetime(2024, 1, 5), datetime(2024, 1, 5))
+    duplicate = Article("2401.00002", "A", datetime(2024, 1, 9), datetime(2024, 1, 9))
+
+    create_article_table(conn)
+    create_category_table(conn)
+    create_article_category_table(conn)
+    create_keyword_table(conn)
+    create_keyword_occurrence_table(conn)
+    create_trend_tables(conn)
+    create_duplicate_tables(conn)
+    insert_categories(conn, [{"id": 1, "code": "cs.LG", "name": "ML"}])
+    insert_keywords(conn, [{"id": 0, "name": "training"}])
+    for article in (original, duplicate):
+        insert_article(conn, article)
+        insert_article_category(conn, article.id, 1, article.created_at)
+        insert_keyword_occurrence(conn, article.id, 0, 2, article.created_at)
+    insert_duplicate_articles(
+        conn,
+        [(encode_arxiv_id(duplicate.id), encode_arxiv_id(original.id), 0.95)],
+    )
+
+    refresh_trends_for_months(conn, [date(2024, 1, 1)])
+
+    assert select_keyword_trend(conn, 0) == [(date(2024, 1, 1), 1, 2)]
+    assert conn.run("SELECT articles FROM CategoryTrend;") == [[1]]
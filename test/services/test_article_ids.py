@@ -0,0 +1,84 @@
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+from arxiv.ids import encode_arxiv_id
+from services.article_ids import migrate_article_ids
+
+
+@pytest.fixture
+def select_ids_mock():
+    with patch("services.article_ids.select_article_ids_after") as mock:
+        yield mock
+
+
+@pytest.fixture
+def update_mock():
+    with patch("services.article_ids.update_article_num_ids") as mock:
+        yield mock
+
+
+@pytest.fixture
+def rekey_mock():
+    with patch("services.article_ids.rekey_on_article_num_id") as mock:
+        yield mock
+
+
+@pytest.fixture(autouse=True)
+def ddl_mocks():
+    with (
+        patch("services.article_ids.populate_archive_prefix_table"),
+        patch("services.article_ids.add_article_num_id_column"),
+        patch("services.article_ids.constrain_article_num_id"),
+        patch("services.article_ids.create_article_category_table"),
+        patch("services.article_ids.create_keyword_occurrence_table"),
+        patch("services.article_ids.create_keyword_occurrence_view"),
+        patch("services.article_ids.drop_keyword_occurrence_view"),
+    ):
+        yield
+
+
+def test_migrate_article_ids_encodes_in_batches(
+    select_ids_mock, update_mock, rekey_mock
+):
+    conn = Mock()
+    select_ids_mock.side_effect = [["0704.0001", "0704.0002"], ["math/0101001"], []]
+
+    migrate_article_ids(conn, layout="rows", batch_size=2)
+
+    assert select_ids_mock.call_args_list == [
+        call(conn, "", 2),
+        call(conn, "0704.0002", 2),
+        call(conn, "math/0101001", 2),
+    ]
+    assert update_mock.call_args_list[1] == call(
+        conn, ["math/0101001"], [encode_arxiv_id("math/0101001")]
+    )
+    assert rekey_mock.call_args_list == [
+        call(conn, "Article_Category"),
+        call(conn, "KeywordOccurrence"),
+    ]
+    conn.run.assert_has_calls([call("START TRANSACTION;"), call("COMMIT;")])
+
+
+def test_migrate_article_ids_rekeys_counts_in_array_layout(select_ids_mock, rekey_mock):
+    select_ids_mock.return_value = []
+
+    migrate_article_ids(Mock(), layout="array")
+
+    assert rekey_mock.call_args_list[1].args[1:] == ("KeywordCounts",)
+    assert rekey_mock.call_args_list[1].kwargs == {"primary_key": True}
+
+
+def test_migrate_article_ids_rolls_back_on_unencodable_id(
+    select_ids_mock, update_mock, rekey_mock
+):
+    conn = Mock()
+    select_ids_mock.side_effect = [["not-an-archive/0101001"]]
+
+    with pytest.raises(ValueError):
+        migrate_article_ids(conn, layout="rows")
+
+    conn.run.assert_called_with("ROLLBACK;")
+    update_mock.assert_not_called()
+    rekey_mock.assert_not_called()
@@ -0,0 +1,98 @@
+from datetime import datetime
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+from article import Article
+from services.authors import (
+    AuthorInterner,
+    normalize_author_name,
+    sync_article_authors,
+)
+
+DUMMY_DATE = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def upsert_mock():
+    with patch("services.authors.upsert_authors") as mock:
+        mock.side_effect = lambda conn, names, normalized: {
+            key: len(key) for key in normalized
+        }
+        yield mock
+
+
+def test_normalize_author_name_ignores_case_width_and_spacing():
+    assert normalize_author_name(" Yann  LeCun ") == normalize_author_name("yann lecun")
+    assert normalize_author_name("Ｙａｎｎ LeCun") == "yann lecun"
+
+
+def test_author_interner_upserts_only_cache_misses(upsert_mock):
+    conn = Mock()
+    interner = AuthorInterner(conn)
+
+    first = interner.resolve(["Ada Lovelace", "Alan Turing", "ada  lovelace"])
+    second = interner.resolve(["Alan Turing", "Grace Hopper"])
+
+    assert first == {"ada lovelace": 12, "alan turing": 11}
+    assert second == {"alan turing": 11, "grace hopper": 12}
+    assert upsert_mock.call_args_list == [
+        call(conn, ["Ada Lovelace", "Alan Turing"], ["ada lovelace", "alan turing"]),
+        call(conn, ["Grace Hopper"], ["grace hopper"]),
+    ]
+    assert (interner.hits, interner.misses) == (1, 3)
+
+
+def test_author_interner_evicts_least_recently_used(upsert_mock):
+    interner = AuthorInterner(Mock(), max_size=2)
+
+    interner.resolve(["a", "b"])
+    interner.resolve(["a", "c"])
+    interner.resolve(["a", "b"])
+
+    # b was evicted when c came in, a was kept warm
+    assert [c.args[2] for c in upsert_mock.call_args_list] == [["a", "b"], ["c"], ["b"]]
+
+
+def test_author_interner_skips_query_when_all_cached(upsert_mock):
+    interner = AuthorInterner(Mock())
+    interner.resolve(["Ada Lovelace"])
+
+    interner.resolve(["Ada Lovelace"])
+    interner.resolve([])
+
+    upsert_mock.assert_called_once()
+
+
+@patch("services.authors.insert_article_authors")
+@patch("services.authors.delete_article_authors_for_articles")
+def test_sync_article_authors_writes_a_page_in_constant_queries(
+    delete_mock, insert_mock, upsert_mock
+):
+    conn = Mock()
+    old = Article("2001.00001", "T", DUMMY_DATE, DUMMY_DATE, authors=["Old Name"])
+    new = Article("2001.00001", "T", DUMMY_DATE, DUMMY_DATE, authors=["Bo", "Al"])
+    other = Article("2001.00002", "T", DUMMY_DATE, DUMMY_DATE, authors=["Al"])
+
+    sync_article_authors(conn, [old, other, new], AuthorInterner(conn))
+
+    upsert_mock.assert_called_once()
+    delete_mock.assert_called_once_with(conn, ["2001.00001", "2001.00002"])
+    insert_mock.assert_called_once_with(
+        conn,
+        [
+            ("2001.00001", 0, 2, DUMMY_DATE),
+            ("2001.00001", 1, 2, DUMMY_DATE),
+            ("2001.00002", 0, 2, DUMMY_DATE),
+        ],
+    )
+    conn.run.assert_has_calls([call("START TRANSACTION;"), call("COMMIT;")])
+
+
+def test_sync_article_authors_is_noop_without_articles(upsert_mock):
+    conn = Mock()
+
+    sync_article_authors(conn, [], AuthorInterner(conn))
+
+    conn.run.assert_not_called()
+    upsert_mock.assert_not_called()
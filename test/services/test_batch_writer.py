@@ -0,0 +1,90 @@
+from datetime import datetime
+from unittest.mock import Mock, call, patch
+
+import pytest
+from pg8000 import DatabaseError
+
+from article import Article
+from services.batch_writer import BatchWriter
+
+
+def make_article(id_: str) -> Article:
+    return Article(id_, f"Title {id_}", datetime(2020, 1, 1), datetime(2020, 1, 2))
+
+
+@pytest.fixture
+def write_mock():
+    with patch("services.batch_writer.write_article") as mock:
+        mock.return_value = True
+        yield mock
+
+
+def test_batch_writer_commits_every_batch_size_articles(write_mock):
+    conn = Mock()
+    writer = BatchWriter(conn, batch_size=3, max_batch_seconds=60)
+
+    for n in range(7):
+        writer.write(make_article(f"2001.{n:05d}"))
+    assert writer.commits == 2
+    writer.commit()
+
+    assert writer.commits == 3
+    run_calls = conn.run.call_args_list
+    assert run_calls.count(call("START TRANSACTION;")) == 3
+    assert run_calls.count(call("COMMIT;")) == 3
+    assert run_calls.count(call("SAVEPOINT article;")) == 7
+    assert run_calls.count(call("RELEASE SAVEPOINT article;")) == 7
+
+
+def test_batch_writer_commits_after_max_batch_seconds(write_mock):
+    conn = Mock()
+    writer = BatchWriter(conn, batch_size=100, max_batch_seconds=5)
+
+    with patch("services.batch_writer.time.monotonic") as monotonic_mock:
+        monotonic_mock.side_effect = [0, 1, 2, 6]
+        writer.write(make_article("2001.00001"))
+        writer.write(make_article("2001.00002"))
+        assert writer.commits == 0
+        writer.write(make_article("2001.00003"))
+
+    assert writer.commits == 1
+
+
+def test_batch_writer_rolls_back_failing_article_to_savepoint(write_mock):
+    conn = Mock()
+    writer = BatchWriter(conn, batch_size=10)
+    write_mock.side_effect = [True, ValueError("bad category"), False]
+
+    assert writer.write(make_article("2001.00001"))
+    with pytest.raises(ValueError):
+        writer.write(make_article("2001.00002"))
+    assert not writer.write(make_article("2001.00003"))
+    writer.commit()
+
+    run_calls = conn.run.call_args_list
+    assert call("ROLLBACK TO SAVEPOINT article;") in run_calls
+    assert call("ROLLBACK;") not in run_calls
+    # the surviving articles are committed together
+    assert run_calls.count(call("START TRANSACTION;")) == 1
+    assert run_calls.count(call("COMMIT;")) == 1
+
+
+def test_batch_writer_commit_without_writes_is_noop(write_mock):
+    conn = Mock()
+    writer = BatchWriter(conn)
+
+    writer.commit()
+
+    conn.run.assert_not_called()
+    assert writer.commits == 0
+
+
+def test_batch_writer_propagates_database_errors(write_mock):
+    conn = Mock()
+    writer = BatchWriter(conn, batch_size=10)
+    write_mock.side_effect = DatabaseError("duplicate key")
+
+    with pytest.raises(DatabaseError):
+        writer.write(make_article("2001.00001"))
+
+    conn.run.assert_any_call("ROLLBACK TO SAVEPOINT article;")
@@ -0,0 +1,124 @@
+from datetime import datetime
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+from article import Article
+from arxiv.ids import encode_arxiv_id
+from services.bulk_load import bulk_load_articles
+from services.keyword_storage import KEYWORD_LAYOUT
+from utils.fingerprint import article_fingerprint
+
+DUMMY_DATE = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def copy_mock():
+    with patch("services.bulk_load.copy_rows_into_table") as mock:
+        yield mock
+
+
+@pytest.fixture
+def merge_mock():
+    with patch("services.bulk_load.merge_staged_articles") as mock:
+        yield mock
+
+
+@pytest.fixture(autouse=True)
+def create_staging_mock():
+    with patch("services.bulk_load.create_staging_tables") as mock:
+        yield mock
+
+
+def copied_rows(copy_mock, table):
+    for c in copy_mock.call_args_list:
+        if c.args[1] == table:
+            return list(c.args[3])
+
+
+def test_bulk_load_articles_copies_all_tables_in_one_transaction(copy_mock, merge_mock):
+    conn = Mock()
+    article = Article(
+        "2001.00001",
+        "Title",
+        DUMMY_DATE,
+        DUMMY_DATE,
+        ["cs.LG", "stat.ML"],
+        "deep learning and more deep learning",
+    )
+
+    rejected = bulk_load_articles(conn, [article])
+
+    assert rejected == []
+    assert copied_rows(copy_mock, "Staging_Article") == [
+        (
+            article.id,
+            encode_arxiv_id(article.id),
+            article.title,
+            DUMMY_DATE,
+            DUMMY_DATE,
+            article.abstract,
+            article_fingerprint(article),
+        )
+    ]
+    assert len(copied_rows(copy_mock, "Staging_Article_Category")) == 2
+    assert copied_rows(copy_mock, "Staging_KeywordOccurrence") == [
+        (encode_arxiv_id(article.id), 1, 2)
+    ]
+    merge_mock.assert_called_once_with(conn, KEYWORD_LAYOUT)
+    conn.run.assert_has_calls([call("START TRANSACTION;"), call("COMMIT;")])
+
+
+def test_bulk_load_articles_stages_authors_resolved_before_transaction(
+    copy_mock, merge_mock
+):
+    conn = Mock()
+    interner = Mock()
+    interner.resolve.side_effect = lambda names: (
+        conn.run("resolved"),
+        {"ada lovelace": 7, "alan turing": 9},
+    )[1]
+    article = Article(
+        "2001.00001",
+        "Title",
+        DUMMY_DATE,
+        DUMMY_DATE,
+        authors=["Ada Lovelace", "Alan Turing"],
+    )
+
+    bulk_load_articles(conn, [article], interner)
+
+    assert copied_rows(copy_mock, "Staging_Article_Author") == [
+        (encode_arxiv_id(article.id), 0, 7),
+        (encode_arxiv_id(article.id), 1, 9),
+    ]
+    assert conn.run.call_args_list[:2] == [call("resolved"), call("START TRANSACTION;")]
+
+
+def test_bulk_load_articles_rejects_unknown_categories(copy_mock, merge_mock):
+    good = Article("2001.00001", "Good", DUMMY_DATE, DUMMY_DATE, ["cs.LG"])
+    bad = Article("2001.00002", "Bad", DUMMY_DATE, DUMMY_DATE, ["not.A_CAT"])
+
+    rejected = bulk_load_articles(Mock(), [good, bad])
+
+    assert rejected == [bad]
+    assert [row[0] for row in copied_rows(copy_mock, "Staging_Article")] == [good.id]
+
+
+def test_bulk_load_articles_rejects_unencodable_ids(copy_mock, merge_mock):
+    good = Article("2001.00001", "Good", DUMMY_DATE, DUMMY_DATE)
+    bad = Article("not-an-archive/0101001", "Bad", DUMMY_DATE, DUMMY_DATE)
+
+    rejected = bulk_load_articles(Mock(), [good, bad])
+
+    assert rejected == [bad]
+    assert [row[0] for row in copied_rows(copy_mock, "Staging_Article")] == [good.id]
+
+
+def test_bulk_load_articles_keeps_latest_version_of_duplicates(copy_mock, merge_mock):
+    old = Article("2001.00001", "Old", DUMMY_DATE, DUMMY_DATE)
+    new = Article("2001.00001", "New", DUMMY_DATE, datetime(2021, 1, 1))
+
+    bulk_load_articles(Mock(), [new, old])
+
+    assert [row[2] for row in copied_rows(copy_mock, "Staging_Article")] == ["New"]
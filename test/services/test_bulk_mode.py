@@ -0,0 +1,162 @@
+from unittest.mock import Mock, call, patch
+
+import pytest
+from pg8000 import DatabaseError
+
+from services.bulk_mode import (
+    bulk_load_mode,
+    enter_bulk_load_mode,
+    exit_bulk_load_mode,
+)
+
+INDEX = ("article_created_at_idx", "article", "CREATE INDEX article_created_at_idx ...")
+FOREIGN_KEY = (
+    "article_category_article_id_fkey",
+    "article_category",
+    "FOREIGN KEY (article_id) REFERENCES article(num_id)",
+)
+
+
+@pytest.fixture
+def queries():
+    names = [
+        "add_constraint",
+        "add_constraint_not_valid",
+        "analyze_tables",
+        "create_deferred_ddl_table",
+        "delete_deferred_ddl",
+        "drop_constraint",
+        "drop_index",
+        "insert_deferred_ddl",
+        "is_partitioned_table",
+        "select_deferred_ddl",
+        "select_foreign_keys",
+        "select_secondary_indexes",
+        "validate_constraint",
+    ]
+    patches = {name: patch(f"services.bulk_mode.{name}") for name in names}
+    mocks = {name: p.start() for name, p in patches.items()}
+    mocks["is_partitioned_table"].return_value = False
+    yield Mock(**mocks)
+    for p in patches.values():
+        p.stop()
+
+
+def test_enter_bulk_load_mode_records_before_dropping(queries):
+    conn = Mock()
+    queries.select_secondary_indexes.return_value = [INDEX]
+    queries.select_foreign_keys.return_value = [FOREIGN_KEY]
+
+    enter_bulk_load_mode(conn, ["Article", "Article_Category"])
+
+    assert queries.insert_deferred_ddl.call_args_list == [
+        call(conn, "index", [INDEX]),
+        call(conn, "foreign_key", [FOREIGN_KEY]),
+    ]
+    queries.drop_constraint.assert_called_once_with(
+        conn, "article_category", "article_category_article_id_fkey"
+    )
+    queries.drop_index.assert_called_once_with(conn, "article_created_at_idx")
+    conn.run.assert_has_calls([call("START TRANSACTION;"), call("COMMIT;")])
+
+
+def test_enter_bulk_load_mode_keeps_article_id_indexes(queries):
+    conn = Mock()
+    kept = (
+        "keyword_occurrence_article_id_idx",
+        "keywordoccurrence",
+        "CREATE INDEX keyword_occurrence_article_id_idx ...",
+    )
+    queries.select_secondary_indexes.return_value = [INDEX, kept]
+    queries.select_foreign_keys.return_value = []
+
+    enter_bulk_load_mode(conn, ["Article", "KeywordOccurrence"])
+
+    queries.insert_deferred_ddl.assert_any_call(conn, "index", [INDEX])
+    queries.drop_index.assert_called_once_with(conn, "article_created_at_idx")
+
+
+def test_exit_bulk_load_mode_builds_indexes_on_own_connections(queries):
+    conn = Mock()
+    index_conns = [Mock(), Mock()]
+    for index_conn in index_conns:
+        index_conn.__enter__ = Mock(return_value=index_conn)
+        index_conn.__exit__ = Mock(return_value=False)
+    factory = Mock(side_effect=index_conns)
+    other_index = ("article_search_vector_idx", "article", "CREATE INDEX ...")
+    queries.select_deferred_ddl.side_effect = lambda conn, kind: {
+        "index": [INDEX, other_index],
+        "foreign_key": [FOREIGN_KEY],
+    }[kind]
+
+    exit_bulk_load_mode(conn, factory, index_workers=2)
+
+    assert factory.call_count == 2
+    built = {c.args[0] for ic in index_conns for c in ic.run.call_args_list}
+    assert {INDEX[2], other_index[2]} <= built
+    queries.add_constraint_not_valid.assert_called_once_with(
+        conn, "article_category", FOREIGN_KEY[0], FOREIGN_KEY[2]
+    )
+    queries.validate_constraint.assert_called_once_with(
+        conn, "article_category", FOREIGN_KEY[0]
+    )
+    queries.analyze_tables.assert_called_once_with(
+        conn, ["article", "article_category"]
+    )
+
+
+def test_exit_bulk_load_mode_leaves_violated_foreign_key_not_valid(queries):
+    queries.select_deferred_ddl.side_effect = lambda conn, kind: {
+        "index": [],
+        "foreign_key": [FOREIGN_KEY],
+    }[kind]
+    queries.validate_constraint.side_effect = DatabaseError("violates foreign key")
+
+    exit_bulk_load_mode(Mock(), Mock())
+
+    queries.delete_deferred_ddl.assert_called_once()
+    queries.analyze_tables.assert_called_once()
+
+
+def test_exit_bulk_load_mode_adds_partitioned_foreign_key_validated(queries):
+    conn = Mock()
+    queries.select_deferred_ddl.side_effect = lambda conn, kind: {
+        "index": [],
+        "foreign_key": [FOREIGN_KEY],
+    }[kind]
+    queries.is_partitioned_table.return_value = True
+
+    exit_bulk_load_mode(conn, Mock())
+
+    queries.add_constraint.assert_called_once_with(
+        conn, "article_category", FOREIGN_KEY[0], FOREIGN_KEY[2]
+    )
+    queries.add_constraint_not_valid.assert_not_called()
+    queries.validate_constraint.assert_not_called()
+    queries.delete_deferred_ddl.assert_called_once_with(conn, FOREIGN_KEY[0])
+
+
+def test_exit_bulk_load_mode_keeps_violated_partitioned_foreign_key_recorded(queries):
+    conn = Mock()
+    queries.select_deferred_ddl.side_effect = lambda conn, kind: {
+        "index": [],
+        "foreign_key": [FOREIGN_KEY],
+    }[kind]
+    queries.is_partitioned_table.return_value = True
+    queries.add_constraint.side_effect = DatabaseError("violates foreign key")
+
+    exit_bulk_load_mode(conn, Mock())
+
+    queries.delete_deferred_ddl.assert_not_called()
+    conn.run.assert_any_call("ROLLBACK;")
+
+
+def test_bulk_load_mode_rebuilds_even_if_load_fails(queries):
+    queries.select_deferred_ddl.return_value = []
+
+    with pytest.raises(RuntimeError):
+        with bulk_load_mode(Mock(), Mock()):
+            raise RuntimeError("load failed")
+
+    queries.create_deferred_ddl_table.assert_called_once()
+    assert queries.select_deferred_ddl.call_count == 2
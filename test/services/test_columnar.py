@@ -0,0 +1,135 @@
+from datetime import datetime
+from unittest.mock import Mock, call, patch
+
+import numpy as np
+import pytest
+
+from arxiv.ids import encode_arxiv_id
+from services.columnar import ColumnarSnapshot, build_columnar_snapshot
+
+ARTICLE_ROWS = [
+    # num_id, created_at, updated_at, title code, categories, keywords, totals
+    [
+        encode_arxiv_id("2401.00001"),
+        datetime(2024, 1, 5),
+        datetime(2024, 2, 1),
+        1,
+        [3, 7],
+        [0, 2],
+        [4, 1],
+    ],
+    [
+        encode_arxiv_id("2401.00002"),
+        datetime(2024, 1, 20),
+        None,
+        0,
+        [3],
+        [2],
+        [2],
+    ],
+    [
+        encode_arxiv_id("2403.00001"),
+        datetime(2024, 3, 2),
+        datetime(2024, 3, 2),
+        1,
+        [],
+        [],
+        [],
+    ],
+]
+TITLES = ["Graphs", "Trées"]
+
+
+@pytest.fixture
+def queries():
+    names = ["iter_article_columns", "iter_distinct_titles"]
+    patches = {name: patch(f"services.columnar.{name}") for name in names}
+    mocks = {name: p.start() for name, p in patches.items()}
+    yield Mock(**mocks)
+    for p in patches.values():
+        p.stop()
+
+
+@pytest.fixture
+def snapshot_dir(queries, tmp_path) -> str:
+    queries.iter_article_columns.return_value = iter(
+        [ARTICLE_ROWS[:2], ARTICLE_ROWS[2:]]
+    )
+    queries.iter_distinct_titles.return_value = iter([TITLES[:1], TITLES[1:]])
+    conn = Mock()
+
+    assert build_columnar_snapshot(conn, str(tmp_path), batch_size=2) == 3
+
+    assert conn.run.call_args_list == [
+        call("START TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;"),
+        call("COMMIT;"),
+    ]
+    assert not list(tmp_path.glob("*.raw"))
+    return str(tmp_path)
+
+
+def test_columnar_snapshot_round_trips_articles(snapshot_dir):
+    snapshot = ColumnarSnapshot(snapshot_dir)
+
+    assert len(snapshot) == 3
+    assert isinstance(snapshot.created_at, np.memmap)
+    assert snapshot.article_id(2) == "2403.00001"
+    assert [snapshot.title(i) for i in range(3)] == ["Trées", "Graphs", "Trées"]
+    assert snapshot.created_at[1] == np.datetime64("2024-01-20")
+    assert np.isnat(snapshot.updated_at[1])
+    assert snapshot.category_offsets.tolist() == [0, 2, 3, 3]
+    assert snapshot.category_ids.tolist() == [3, 7, 3]
+    assert snapshot.keyword_offsets.tolist() == [0, 2, 3, 3]
+    assert snapshot.keyword_totals.tolist() == [4, 1, 2]
+
+
+def test_columnar_snapshot_groups_by_month(snapshot_dir):
+    snapshot = ColumnarSnapshot(snapshot_dir)
+
+    months, articles = snapshot.article_counts_per_month()
+    _, keyword_articles = snapshot.keyword_counts_per_month()
+    _, keyword_totals = snapshot.keyword_counts_per_month(occurrences=True)
+    _, categories = snapshot.category_counts_per_month()
+
+    assert months.tolist() == [
+        datetime(2024, 1, 1).date(),
+        datetime(2024, 2, 1).date(),
+        datetime(2024, 3, 1).date(),
+    ]
+    assert articles.tolist() == [2, 0, 1]
+    assert keyword_articles.tolist() == [[1, 0, 2], [0, 0, 0], [0, 0, 0]]
+    assert keyword_totals.tolist() == [[4, 0, 3], [0, 0, 0], [0, 0, 0]]
+    assert categories[0, 3] == 2
+    assert categories[0, 7] == 1
+    assert categories.sum() == 3
+
+
+@patch("services.columnar.GROUPBY_CHUNK_ARTICLES", 1)
+def test_columnar_snapshot_groups_by_month_in_chunks(snapshot_dir):
+    _, keyword_totals = ColumnarSnapshot(snapshot_dir).keyword_counts_per_month(True)
+
+    assert keyword_totals.tolist() == [[4, 0, 3], [0, 0, 0], [0, 0, 0]]
+
+
+def test_columnar_snapshot_of_empty_database(queries, tmp_path):
+    queries.iter_article_columns.return_value = iter([])
+    queries.iter_distinct_titles.return_value = iter([])
+
+    assert build_columnar_snapshot(Mock(), str(tmp_path)) == 0
+
+    snapshot = ColumnarSnapshot(str(tmp_path))
+    months, counts = snapshot.keyword_counts_per_month()
+    assert len(snapshot) == 0
+    assert len(months) == 0
+    assert counts.shape == (0, 0)
+
+
+def test_build_columnar_snapshot_rolls_back_on_error(queries, tmp_path):
+    queries.iter_article_columns.side_effect = RuntimeError("connection lost")
+    conn = Mock()
+
+    with pytest.raises(RuntimeError):
+        build_columnar_snapshot(conn, str(tmp_path))
+
+    assert conn.run.call_args_list[-1] == call("ROLLBACK;")
+    assert not list(tmp_path.iterdir())
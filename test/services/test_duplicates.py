@@ -0,0 +1,150 @@
+from datetime import datetime
+from unittest.mock import ANY, Mock, call, patch
+
+import numpy as np
+import pytest
+
+from article import Article
+from arxiv.ids import encode_arxiv_id
+from services.duplicates import DuplicateDetector
+from utils.minhash import band_buckets, minhash_signature
+
+DUMMY_DATE = datetime(2024, 1, 1)
+ABSTRACT = (
+    "We propose a graph neural network for molecular property prediction which "
+    "aggregates messages along chemical bonds. On standard benchmarks the model "
+    "improves over message passing baselines while using fewer parameters."
+)
+RESUBMITTED = ABSTRACT.replace("standard benchmarks", "the standard benchmarks")
+UNRELATED = "We measure the rotation curves of nearby dwarf galaxies."
+
+
+def article(id_: str, abstract: str) -> Article:
+    return Article(id_, "Title", DUMMY_DATE, DUMMY_DATE, abstract=abstract)
+
+
+@pytest.fixture
+def queries():
+    names = [
+        "create_duplicate_tables",
+        "delete_article_signatures",
+        "insert_article_signatures",
+        "insert_duplicate_articles",
+        "insert_signature_bands",
+        "select_article_signatures",
+        "select_band_matches",
+        "update_duplicate_canonicals",
+    ]
+    patches = {name: patch(f"services.duplicates.{name}") for name in names}
+    mocks = {name: p.start() for name, p in patches.items()}
+    mocks["select_band_matches"].return_value = []
+    mocks["select_article_signatures"].return_value = {}
+    yield Mock(**mocks)
+    for p in patches.values():
+        p.stop()
+
+
+def store(queries, id_: str, abstract: str, canonical_id: int | None = None):
+    # makes the article look indexed in every band, alongside those stored before
+    signature = minhash_signature(abstract)
+    num_id = encode_arxiv_id(id_)
+    queries.select_band_matches.return_value = [
+        *queries.select_band_matches.return_value,
+        *(
+            (band, bucket, num_id)
+            for band, bucket in enumerate(band_buckets(signature))
+        ),
+    ]
+    queries.select_article_signatures.return_value = {
+        **queries.select_article_signatures.return_value,
+        num_id: (signature.view(np.int32).tolist(), canonical_id),
+    }
+
+
+def test_duplicate_detector_indexes_articles_in_one_transaction(queries):
+    conn = Mock()
+    articles = [article("2401.00001", ABSTRACT), article("2401.00002", "")]
+
+    assert DuplicateDetector(conn, enabled=True).check(articles) == []
+
+    num_ids = [encode_arxiv_id("2401.00001"), encode_arxiv_id("2401.00002")]
+    queries.create_duplicate_tables.assert_called_once_with(conn)
+    queries.delete_article_signatures.assert_called_once_with(conn, num_ids)
+    ids, signatures = queries.insert_article_signatures.call_args.args[1:]
+    assert ids == num_ids[:1]
+    assert np.array_equal(
+        np.array(signatures[0], np.int32).view(np.uint32), minhash_signature(ABSTRACT)
+    )
+    queries.insert_duplicate_articles.assert_called_once_with(conn, [])
+    assert conn.run.call_args_list == [call("START TRANSACTION;"), call("COMMIT;")]
+
+
+def test_duplicate_detector_matches_stored_articles_to_their_canonical(queries):
+    store(queries, "2301.00007", ABSTRACT, canonical_id=encode_arxiv_id("2201.00001"))
+
+    duplicates = DuplicateDetector(Mock(), enabled=True).check(
+        [article("2401.00001", RESUBMITTED), article("2401.00002", UNRELATED)]
+    )
+
+    assert [d[:2] for d in duplicates] == [("2401.00001", "2201.00001")]
+    assert duplicates[0][2] >= 0.8
+
+
+def test_duplicate_detector_matches_within_batch(queries):
+    duplicates = DuplicateDetector(Mock(), enabled=True).check(
+        [article("2401.00001", ABSTRACT), article("2401.00002", RESUBMITTED)]
+    )
+
+    assert [d[:2] for d in duplicates] == [("2401.00002", "2401.00001")]
+    ((_, recorded),) = [c.args for c in queries.insert_duplicate_articles.mock_calls]
+    assert recorded[0][:2] == (
+        encode_arxiv_id("2401.00002"),
+        encode_arxiv_id("2401.00001"),
+    )
+
+
+def test_duplicate_detector_ignores_old_versions_of_the_batch(queries):
+    store(queries, "2401.00001", ABSTRACT)
+
+    duplicates = DuplicateDetector(Mock(), enabled=True).check(
+        [article("2401.00001", RESUBMITTED)]
+    )
+
+    assert duplicates == []
+    queries.select_article_signatures.assert_called_once()
+    assert queries.select_article_signatures.call_args.args[1] == []
+
+
+def test_duplicate_detector_does_nothing_when_disabled(queries):
+    conn = Mock()
+
+    assert DuplicateDetector(conn, enabled=False).check([article("x", ABSTRACT)]) == []
+
+    conn.run.assert_not_called()
+    queries.create_duplicate_tables.assert_not_called()
+
+
+def test_duplicate_detector_never_matches_canonical_with_its_duplicates(queries):
+    store(queries, "2401.00002", ABSTRACT, canonical_id=encode_arxiv_id("2401.00001"))
+
+    duplicates = DuplicateDetector(Mock(), enabled=True).check(
+        [article("2401.00001", ABSTRACT)]
+    )
+
+    assert duplicates == []
+    queries.update_duplicate_canonicals.assert_called_once_with(ANY, [], [])
+
+
+def test_duplicate_detector_moves_cluster_of_canonical_matching_another(queries):
+    canonical = encode_arxiv_id("2401.00001")
+    store(queries, "2401.00002", ABSTRACT, canonical_id=canonical)
+    store(queries, "2301.00009", RESUBMITTED)
+
+    duplicates = DuplicateDetector(Mock(), enabled=True).check(
+        [article("2401.00001", RESUBMITTED)]
+    )
+
+    assert [d[:2] for d in duplicates] == [("2401.00001", "2301.00009")]
+    queries.update_duplicate_canonicals.assert_called_once_with(
+        ANY, [canonical], [encode_arxiv_id("2301.00009")]
+    )
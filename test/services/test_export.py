@@ -0,0 +1,109 @@
+import gzip
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from services.export import chunk_ranges, export_tables
+
+
+def copying_conn(rows: bytes = b"id\n2001.0001\n") -> Mock:
+    conn = Mock()
+    conn.run.side_effect = lambda query_str, **kwargs: (
+        kwargs["stream"].write(rows) if "stream" in kwargs else None
+    )
+    return conn
+
+
+def test_chunk_ranges_cuts_whole_years():
+    assert chunk_ranges(datetime(2023, 5, 2), datetime(2024, 1, 1)) == [
+        ("2023", datetime(2023, 1, 1), datetime(2024, 1, 1)),
+        ("2024", datetime(2024, 1, 1), datetime(2025, 1, 1)),
+    ]
+
+
+def test_chunk_ranges_cuts_whole_months_across_years():
+    assert chunk_ranges(datetime(2023, 11, 20), datetime(2024, 1, 3), "month") == [
+        ("2023-11", datetime(2023, 11, 1), datetime(2023, 12, 1)),
+        ("2023-12", datetime(2023, 12, 1), datetime(2024, 1, 1)),
+        ("2024-01", datetime(2024, 1, 1), datetime(2024, 2, 1)),
+    ]
+
+
+def test_export_tables_writes_compressed_chunks(tmp_path):
+    conn = copying_conn()
+
+    written = export_tables(
+        conn,
+        str(tmp_path),
+        tables=["Article", "Article_Author"],
+        start=datetime(2023, 5, 1),
+        end=datetime(2024, 2, 1),
+    )
+
+    assert written == 4
+    path = tmp_path / "Article" / "Article-2024.csv.gz"
+    with gzip.open(path) as f:
+        assert f.read() == b"id\n2001.0001\n"
+    assert sorted(p.name for p in (tmp_path / "Article_Author").iterdir()) == [
+        "Article_Author-2023.csv.gz",
+        "Article_Author-2024.csv.gz",
+    ]
+    copy_str = conn.run.call_args_list[0].args[0]
+    assert copy_str.startswith("COPY (SELECT id, num_id, title")
+    assert "created_at >= '2023-01-01 00:00:00'" in copy_str
+    assert "created_at < '2024-01-01 00:00:00'" in copy_str
+    # child tables are found through the created_at index of Article
+    child_copy_str = conn.run.call_args_list[1].args[0]
+    assert "FROM Article_Author t JOIN Article a ON a.num_id = t.article_id" in (
+        child_copy_str
+    )
+    assert "a.created_at >= '2023-01-01 00:00:00'" in child_copy_str
+
+
+def test_export_tables_skips_exported_chunks(tmp_path):
+    export_tables(
+        copying_conn(),
+        str(tmp_path),
+        tables=["Article"],
+        fmt="jsonl",
+        start=datetime(2023, 1, 1),
+        end=datetime(2023, 1, 1),
+    )
+    conn = copying_conn()
+
+    written = export_tables(
+        conn,
+        str(tmp_path),
+        tables=["Article"],
+        fmt="jsonl",
+        start=datetime(2023, 1, 1),
+        end=datetime(2024, 1, 1),
+    )
+
+    assert written == 1
+    assert conn.run.call_count == 1
+    assert not list((tmp_path / "Article").glob("*.part"))
+
+
+def test_export_tables_defaults_to_article_range(tmp_path):
+    conn = copying_conn()
+    conn.run.side_effect = None
+    conn.run.return_value = [[None, None]]
+
+    assert export_tables(conn, str(tmp_path)) == 0
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"tables": ["Author"]}, {"fmt": "parquet"}, {"chunk": "week"}],
+)
+def test_export_tables_rejects_unknown_options(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        export_tables(
+            Mock(),
+            str(tmp_path),
+            start=datetime(2023, 1, 1),
+            end=datetime(2023, 1, 1),
+            **kwargs,
+        )
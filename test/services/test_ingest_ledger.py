@@ -0,0 +1,73 @@
+from datetime import datetime
+from unittest.mock import Mock, call, patch
+
+import pytest
+from pg8000 import DatabaseError
+
+from services.ingest_ledger import IngestLedger, PageStats
+from utils.stats import RunStats
+
+DUMMY_DATE = datetime(2024, 1, 1)
+
+
+def page_stats(page: int) -> PageStats:
+    return PageStats(page, DUMMY_DATE, DUMMY_DATE, 100, 5, 3, 90, 2, 3.0, 0.2, 0.5)
+
+
+@pytest.fixture
+def queries():
+    names = [
+        "create_ingest_ledger_tables",
+        "finish_ingest_run",
+        "insert_ingest_pages",
+        "insert_ingest_run",
+    ]
+    patches = {name: patch(f"services.ingest_ledger.{name}") for name in names}
+    mocks = {name: p.start() for name, p in patches.items()}
+    yield Mock(**mocks)
+    for p in patches.values():
+        p.stop()
+
+
+def test_ingest_ledger_batches_page_inserts(queries):
+    conn = Mock()
+    ledger = IngestLedger(conn, "all", "api", DUMMY_DATE, DUMMY_DATE, flush_pages=2)
+
+    with ledger.recording(RunStats()):
+        for page in range(1, 6):
+            ledger.record_page(page_stats(page))
+
+    assert queries.insert_ingest_pages.call_args_list == [
+        call(conn, ledger.run_id, [page_stats(1), page_stats(2)]),
+        call(conn, ledger.run_id, [page_stats(3), page_stats(4)]),
+        call(conn, ledger.run_id, [page_stats(5)]),
+    ]
+    queries.insert_ingest_run.assert_called_once_with(
+        conn, ledger.run_id, "all", "api", DUMMY_DATE, DUMMY_DATE
+    )
+    assert queries.finish_ingest_run.call_args.args[2] == "finished"
+
+
+def test_ingest_ledger_records_failed_runs(queries):
+    stats = RunStats()
+    stats.inserted = 7
+    ledger = IngestLedger(Mock(), "all", "api", DUMMY_DATE, DUMMY_DATE)
+
+    with pytest.raises(RuntimeError):
+        with ledger.recording(stats):
+            raise RuntimeError("fetch failed")
+
+    _, _, status, totals = queries.finish_ingest_run.call_args.args
+    assert status == "failed"
+    assert totals["inserted"] == 7
+
+
+def test_ingest_ledger_write_errors_do_not_fail_the_run(queries):
+    conn = Mock()
+    queries.insert_ingest_pages.side_effect = DatabaseError("ledger unavailable")
+    ledger = IngestLedger(conn, "all", "api", DUMMY_DATE, DUMMY_DATE, flush_pages=1)
+
+    ledger.record_page(page_stats(1))
+
+    conn.run.assert_called_once_with("ROLLBACK;")
+    assert ledger.pending == []
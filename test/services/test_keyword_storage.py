@@ -0,0 +1,73 @@
+from datetime import datetime
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+from services.keyword_storage import (
+    SMALLINT_MAX,
+    keyword_counts_array,
+    write_keyword_counts,
+)
+from utils.keywords import KEYWORD_LIST
+
+CREATED_AT = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def query_mocks():
+    with (
+        patch("services.keyword_storage.upsert_keyword_counts") as upsert_mock,
+        patch("services.keyword_storage.delete_keyword_counts_for_article") as del_mock,
+        patch("services.keyword_storage.insert_keyword_occurrence") as insert_mock,
+        patch(
+            "services.keyword_storage.delete_keyword_occurrences_for_article"
+        ) as delete_rows_mock,
+    ):
+        yield upsert_mock, del_mock, insert_mock, delete_rows_mock
+
+
+def test_keyword_counts_array_is_dense_and_indexed_by_keyword_id():
+    counts = keyword_counts_array({0: 2, 5: 1, len(KEYWORD_LIST) - 1: 40000})
+
+    assert len(counts) == len(KEYWORD_LIST)
+    assert counts[0] == 2
+    assert counts[5] == 1
+    assert counts[-1] == SMALLINT_MAX
+    assert sum(counts) == 3 + SMALLINT_MAX
+
+
+def test_write_keyword_counts_rows_layout_rewrites_occurrences(query_mocks):
+    upsert_mock, del_mock, insert_mock, delete_rows_mock = query_mocks
+    conn = Mock()
+
+    write_keyword_counts(conn, "2401.00001", CREATED_AT, {3: 2, 7: 1}, layout="rows")
+
+    delete_rows_mock.assert_called_once_with(conn, "2401.00001")
+    assert insert_mock.call_args_list == [
+        call(conn, "2401.00001", 3, 2, CREATED_AT),
+        call(conn, "2401.00001", 7, 1, CREATED_AT),
+    ]
+    upsert_mock.assert_not_called()
+
+
+def test_write_keyword_counts_array_layout_upserts_one_row(query_mocks):
+    upsert_mock, del_mock, insert_mock, delete_rows_mock = query_mocks
+    conn = Mock()
+
+    write_keyword_counts(conn, "2401.00001", CREATED_AT, {3: 2, 7: 1}, layout="array")
+
+    expected = [0] * len(KEYWORD_LIST)
+    expected[3], expected[7] = 2, 1
+    upsert_mock.assert_called_once_with(conn, "2401.00001", expected, CREATED_AT)
+    insert_mock.assert_not_called()
+    delete_rows_mock.assert_not_called()
+
+
+def test_write_keyword_counts_array_layout_drops_row_without_hits(query_mocks):
+    upsert_mock, del_mock, insert_mock, delete_rows_mock = query_mocks
+    conn = Mock()
+
+    write_keyword_counts(conn, "2401.00001", CREATED_AT, {}, layout="array")
+
+    del_mock.assert_called_once_with(conn, "2401.00001")
+    upsert_mock.assert_not_called()
@@ -0,0 +1,108 @@
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from arxiv.oai import parse_oai_record_to_article
+from services.extractors import fetch_oai_records
+
+OAI_PAGE_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/"><ListRecords>'
+    "{records}{token}"
+    "</ListRecords></OAI-PMH>"
+)
+OAI_RECORD_TEMPLATE = (
+    "<record><header><identifier>oai:arXiv.org:{id_}</identifier></header>"
+    '<metadata><arXiv xmlns="http://arxiv.org/OAI/arXiv/">'
+    "<id>{id_}</id><created>2020-01-01</created><updated>2020-01-02</updated>"
+    "<title>Title {id_}</title><categories>cs.LG</categories>"
+    "<abstract>Abstract</abstract>"
+    "</arXiv></metadata></record>"
+)
+
+# resumption token -> (record ids, next resumption token)
+OAI_PAGES = {
+    None: (["2001.00001", "2001.00002"], "tok-1"),
+    "tok-1": (["2001.00003"], "tok-2"),
+    "tok-2": (["2001.00004"], None),
+}
+
+
+class StandInOaiHandler(BaseHTTPRequestHandler):
+    """Serves OAI_PAGES, asking the client to back off once before the first page."""
+
+    requests_seen = []
+    throttled = False
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        StandInOaiHandler.requests_seen.append(params)
+
+        if not StandInOaiHandler.throttled:
+            StandInOaiHandler.throttled = True
+            self.send_response(503)
+            self.send_header("Retry-After", "1")
+            self.end_headers()
+            return
+
+        token = params.get("resumptionToken", [None])[0]
+        ids, next_token = OAI_PAGES[token]
+        body = OAI_PAGE_TEMPLATE.format(
+            records="".join(OAI_RECORD_TEMPLATE.format(id_=id_) for id_ in ids),
+            token=f"<resumptionToken>{next_token or ''}</resumptionToken>",
+        )
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def oai_server_url():
+    StandInOaiHandler.requests_seen = []
+    StandInOaiHandler.throttled = False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInOaiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/oai2"
+    server.shutdown()
+    server.server_close()
+
+
+@patch("services.extractors.time.sleep")
+def test_fetch_oai_records_follows_resumption_tokens(sleep_mock, oai_server_url):
+    records = fetch_oai_records(
+        datetime(2020, 1, 1), datetime(2020, 1, 31), base_url=oai_server_url
+    )
+    articles = [parse_oai_record_to_article(record) for record in records]
+
+    assert [a.id for a in articles] == [
+        "2001.00001",
+        "2001.00002",
+        "2001.00003",
+        "2001.00004",
+    ]
+    # first request is throttled once, then the rate limit is respected between pages
+    # (minus the time already spent on the previous page)
+    sleeps = [c.args[0] for c in sleep_mock.call_args_list]
+    assert sleeps[0] == 1
+    assert len(sleeps) == 3
+    assert all(2 < seconds <= 3 for seconds in sleeps[1:])
+    assert StandInOaiHandler.requests_seen[1] == {
+        "verb": ["ListRecords"],
+        "metadataPrefix": ["arXivRaw"],
+        "from": ["2020-01-01"],
+        "until": ["2020-01-31"],
+    }
+    assert StandInOaiHandler.requests_seen[2] == {
+        "verb": ["ListRecords"],
+        "resumptionToken": ["tok-1"],
+    }
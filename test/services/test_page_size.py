@@ -0,0 +1,93 @@
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from services.extractors import fetch_article_pages
+from services.page_size import AdaptivePageSize
+from utils.stats import RunStats
+
+T0 = datetime(2024, 1, 1, 12, 0)
+
+
+def build_page(n_entries: int, total_results: int) -> ET.Element:
+    ns = "http://www.w3.org/2005/Atom"
+    root = ET.Element(f"{{{ns}}}feed")
+    ET.SubElement(root, "totalResults").text = str(total_results)
+    for n in range(n_entries):
+        entry = ET.SubElement(root, f"{{{ns}}}entry")
+        ET.SubElement(entry, f"{{{ns}}}id").text = (
+            f"http://arxiv.org/abs/2401.{n:05d}v1"
+        )
+        ET.SubElement(entry, f"{{{ns}}}updated").text = "2024-01-01T12:00:00Z"
+    return root
+
+
+def test_adaptive_page_size_grows_on_fast_full_pages_up_to_max():
+    page_size = AdaptivePageSize(100, 2000, 1000, fast_seconds=10)
+
+    page_size.record_success(2, page_was_full=True)
+    assert page_size.size == 1500
+    page_size.record_success(2, page_was_full=True)
+    assert page_size.size == 2000
+    page_size.record_success(2, page_was_full=True)
+    assert page_size.size == 2000
+
+
+def test_adaptive_page_size_holds_on_slow_or_partial_pages():
+    page_size = AdaptivePageSize(100, 2000, 1000, fast_seconds=10)
+
+    page_size.record_success(30, page_was_full=True)
+    page_size.record_success(2, page_was_full=False)
+
+    assert page_size.size == 1000
+
+
+def test_adaptive_page_size_halves_on_failure_down_to_min():
+    page_size = AdaptivePageSize(300, 2000, 1000)
+
+    page_size.record_failure()
+    assert page_size.size == 500
+    page_size.record_failure()
+    assert page_size.size == 300
+    page_size.record_failure()
+    assert page_size.size == 300
+
+
+def test_adaptive_page_size_rejects_invalid_bounds():
+    with pytest.raises(ValueError):
+        AdaptivePageSize(1000, 500, 700)
+
+
+@patch("services.extractors.time.sleep")
+@patch("services.extractors.fetch_articles_from_arxiv_api")
+def test_fetch_article_pages_shrinks_and_retries_failed_pages(fetch_mock, sleep_mock):
+    # a timeout, then a truncated page, then the whole result set fits on one page
+    fetch_mock.side_effect = [
+        requests.Timeout("read timed out"),
+        build_page(100, 300),
+        build_page(250, 250),
+    ]
+    page_size = AdaptivePageSize(200, 2000, 1000)
+    stats = RunStats()
+
+    pages = list(fetch_article_pages(T0, T0, page_size, stats))
+
+    assert [len(page) for page in pages] == [250]
+    requested_sizes = [c.args[2] for c in fetch_mock.call_args_list]
+    assert requested_sizes == [1000, 500, 250]
+    assert stats.page_sizes == [250]
+    assert stats.page_retries == 2
+
+
+@patch("services.extractors.time.sleep")
+@patch("services.extractors.fetch_articles_from_arxiv_api")
+def test_fetch_article_pages_gives_up_after_repeated_failures(fetch_mock, sleep_mock):
+    fetch_mock.side_effect = ET.ParseError("no element found")
+
+    pages = list(fetch_article_pages(T0, T0, AdaptivePageSize(100, 1000, 1000)))
+
+    assert pages == []
+    assert fetch_mock.call_count == 6
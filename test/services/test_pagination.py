@@ -0,0 +1,129 @@
+import xml.etree.ElementTree as ET
+from collections import Counter
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from services.extractors import fetch_article_entries
+from services.page_size import AdaptivePageSize
+from services.pagination import PaginationCursor, floor_to_minute
+
+T0 = datetime(2024, 1, 1, 12, 0)
+
+
+def minute(n: int, second: int = 0) -> datetime:
+    return T0 + timedelta(minutes=n, seconds=second)
+
+
+def build_fake_api(records: list[tuple[str, datetime]]):
+    """
+    Returns a stand-in for fetch_articles_from_arxiv_api serving the given records
+    with the real API's minute-granularity, inclusive lastUpdatedDate filter.
+    """
+
+    records = sorted(records, key=lambda r: r[1])
+    calls = []
+
+    def fake_fetch(
+        start_time, end_time, max_results, offset=0, stats=None, categories=None
+    ):
+        calls.append((start_time, end_time, offset))
+        matches = [
+            r
+            for r in records
+            if floor_to_minute(start_time) <= floor_to_minute(r[1])
+            and floor_to_minute(r[1]) <= floor_to_minute(end_time)
+        ]
+        page = matches[offset : offset + max_results]
+
+        ns = "http://www.w3.org/2005/Atom"
+        root = ET.Element(f"{{{ns}}}feed")
+        ET.SubElement(root, "totalResults").text = str(len(matches))
+        for id_, updated_at in page:
+            entry = ET.SubElement(root, f"{{{ns}}}entry")
+            ET.SubElement(entry, f"{{{ns}}}id").text = f"http://arxiv.org/abs/{id_}v1"
+            ET.SubElement(entry, f"{{{ns}}}updated").text = updated_at.strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+            )
+        return root
+
+    return fake_fetch, calls
+
+
+def fetch_ids(records, page_size, end_time=None):
+    fake_fetch, calls = build_fake_api(records)
+    with (
+        patch("services.extractors.fetch_articles_from_arxiv_api", fake_fetch),
+        patch("services.extractors.time.sleep"),
+    ):
+        fixed_page_size = AdaptivePageSize(page_size, page_size, page_size)
+        entries = fetch_article_entries(T0, end_time or minute(60), fixed_page_size)
+        ids = [entry[0].text.split("/abs/")[1][:-2] for entry in entries]
+    return ids, calls
+
+
+def test_pagination_cursor_slides_to_boundary_minute_and_remembers_its_ids():
+    cursor = PaginationCursor(minute(0, 30), minute(60))
+
+    cursor.advance([("a", minute(1)), ("b", minute(2, 5)), ("c", minute(2, 50))], 10, 3)
+
+    assert cursor.query_window() == (minute(2), minute(60))
+    assert cursor.seen_ids == {"b", "c"}
+    assert cursor.has_emitted("c")
+    assert not cursor.has_emitted("a")
+    assert not cursor.done
+
+
+def test_pagination_cursor_narrows_window_when_a_minute_overflows_a_page():
+    cursor = PaginationCursor(minute(5), minute(60))
+
+    cursor.advance([("a", minute(5)), ("b", minute(5, 1))], 10, 2)
+
+    assert cursor.query_window() == (minute(5), minute(5))
+    assert cursor.offset == 2
+
+    cursor.advance([("c", minute(5, 2))], 3, 2)
+
+    assert cursor.query_window() == (minute(6), minute(60))
+    assert cursor.offset == 0
+    assert cursor.seen_ids == set()
+
+
+def test_pagination_cursor_stops_when_page_holds_all_remaining_results():
+    cursor = PaginationCursor(minute(0), minute(60))
+
+    cursor.advance([("a", minute(1))], 1, 10)
+
+    assert cursor.done
+
+
+def test_pagination_cursor_stops_after_last_minute():
+    cursor = PaginationCursor(minute(5), minute(5))
+
+    cursor.advance([("a", minute(5)), ("b", minute(5))], 2, 2)
+    cursor.advance([], 2, 2)
+
+    assert cursor.done
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 7, 50])
+def test_fetch_article_entries_yields_every_entry_exactly_once(page_size):
+    # lots of entries share a handful of minutes, including ties larger than a page
+    records = [(f"2401.{i:05d}", minute(i // 9, i % 60)) for i in range(40)]
+    records += [(f"2402.{i:05d}", minute(20)) for i in range(12)]
+
+    ids, _ = fetch_ids(records, page_size)
+
+    counts = Counter(ids)
+    assert set(counts) == {id_ for id_, _ in records}
+    assert max(counts.values()) == 1
+
+
+def test_fetch_article_entries_does_not_stall_on_single_minute_overflow():
+    records = [(f"2401.{i:05d}", minute(0)) for i in range(10)]
+
+    ids, calls = fetch_ids(records, 3, end_time=minute(0))
+
+    assert sorted(ids) == sorted(id_ for id_, _ in records)
+    assert len(calls) == 4
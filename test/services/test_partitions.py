@@ -0,0 +1,73 @@
+from datetime import datetime
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+from services.partitions import YearPartitions, freeze_year, migrate_child_created_at
+
+
+@pytest.fixture
+def create_partition_mock():
+    with patch("services.partitions.create_year_partition") as mock:
+        yield mock
+
+
+def test_year_partitions_creates_each_year_once_for_every_table(create_partition_mock):
+    conn = Mock()
+    partitions = YearPartitions(conn, scheme="year", layout="array")
+
+    partitions.ensure(
+        [datetime(2021, 5, 1), datetime(2020, 1, 1), datetime(2021, 1, 1)]
+    )
+    partitions.ensure([datetime(2021, 12, 31)])
+
+    assert create_partition_mock.call_args_list == [
+        call(conn, table, year)
+        for year in (2020, 2021)
+        for table in ("Article", "Article_Category", "Article_Author", "KeywordCounts")
+    ]
+
+
+def test_year_partitions_is_noop_without_scheme(create_partition_mock):
+    partitions = YearPartitions(Mock(), scheme="none")
+
+    partitions.ensure([datetime(2021, 5, 1)])
+
+    create_partition_mock.assert_not_called()
+
+
+@patch("services.partitions.vacuum_freeze_tables")
+def test_freeze_year_vacuums_the_partitions_of_the_year(vacuum_mock):
+    conn = Mock()
+
+    freeze_year(conn, 2019, layout="rows")
+
+    vacuum_mock.assert_called_once_with(
+        conn,
+        [
+            "Article_y2019",
+            "Article_Category_y2019",
+            "Article_Author_y2019",
+            "KeywordOccurrence_y2019",
+        ],
+    )
+
+
+@patch("services.partitions.create_keyword_occurrence_view")
+@patch("services.partitions.drop_keyword_occurrence_view")
+@patch("services.partitions.add_created_at_column")
+def test_migrate_child_created_at_recreates_view_around_keyword_counts(
+    add_column_mock, drop_view_mock, create_view_mock
+):
+    conn = Mock()
+
+    migrate_child_created_at(conn, layout="array")
+
+    assert [c.args[1] for c in add_column_mock.call_args_list] == [
+        "Article_Category",
+        "Article_Author",
+        "KeywordCounts",
+    ]
+    drop_view_mock.assert_called_once_with(conn)
+    create_view_mock.assert_called_once_with(conn)
+    conn.run.assert_has_calls([call("START TRANSACTION;"), call("COMMIT;")])
@@ -0,0 +1,77 @@
+from unittest.mock import Mock, call, patch
+
+import pytest
+from pg8000 import DatabaseError
+
+from services.rate_limit import LocalRateLimiter, PgRateLimiter
+
+
+@pytest.fixture
+def sleep_mock():
+    with patch("services.rate_limit.time.sleep") as mock:
+        yield mock
+
+
+@pytest.fixture
+def monotonic_mock():
+    with patch("services.rate_limit.time.monotonic") as mock:
+        yield mock
+
+
+@pytest.fixture
+def claim_mock():
+    with patch("services.rate_limit.claim_rate_limit_slot") as mock:
+        yield mock
+
+
+def test_local_rate_limiter_does_not_wait_for_first_request(sleep_mock, monotonic_mock):
+    monotonic_mock.return_value = 100.0
+
+    LocalRateLimiter(3).wait()
+
+    sleep_mock.assert_not_called()
+
+
+def test_local_rate_limiter_waits_out_the_rest_of_the_interval(
+    sleep_mock, monotonic_mock
+):
+    limiter = LocalRateLimiter(3)
+    # first request at 100, second asked for at 101, third long after
+    monotonic_mock.side_effect = [100.0, 101.0, 103.0, 110.0]
+
+    limiter.wait()
+    limiter.wait()
+    limiter.wait()
+
+    assert sleep_mock.call_args_list == [call(2.0)]
+
+
+def test_pg_rate_limiter_sleeps_until_claimed_slot(sleep_mock, claim_mock):
+    conn = Mock()
+    limiter = PgRateLimiter("arxiv_api", 3, connection_factory=lambda: conn)
+    claim_mock.side_effect = [-0.001, 5.5]
+
+    limiter.wait()
+    limiter.wait()
+
+    assert claim_mock.call_args_list == [call(conn, "arxiv_api", 3)] * 2
+    assert sleep_mock.call_args_list == [call(5.5)]
+
+
+def test_pg_rate_limiter_falls_back_to_full_interval_on_db_error(
+    sleep_mock, claim_mock
+):
+    limiter = PgRateLimiter("arxiv_api", 3, connection_factory=Mock)
+    claim_mock.side_effect = DatabaseError("connection reset")
+
+    limiter.wait()
+
+    sleep_mock.assert_called_once_with(3)
+
+
+def test_pg_rate_limiter_closes_its_connection():
+    conn = Mock()
+
+    PgRateLimiter("arxiv_api", 3, connection_factory=lambda: conn).close()
+
+    conn.close.assert_called_once()
@@ -0,0 +1,49 @@
+from datetime import date, datetime
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+from services.refresh_trends import month_of, rebuild_trends, refresh_trends
+
+
+@pytest.fixture
+def refresh_months_mock():
+    with patch("services.refresh_trends.refresh_trends_for_months") as mock:
+        yield mock
+
+
+def test_month_of_truncates_to_first_of_month():
+    assert month_of(datetime(2024, 2, 29, 23, 59)) == date(2024, 2, 1)
+
+
+def test_refresh_trends_refreshes_unique_sorted_months_in_transaction(
+    refresh_months_mock,
+):
+    conn = Mock()
+    months = [date(2024, 3, 1), date(2024, 1, 1), date(2024, 3, 1)]
+
+    refresh_trends(conn, months)
+
+    refresh_months_mock.assert_called_once_with(
+        conn, [date(2024, 1, 1), date(2024, 3, 1)]
+    )
+    conn.run.assert_has_calls([call("START TRANSACTION;"), call("COMMIT;")])
+
+
+def test_refresh_trends_noop_without_months(refresh_months_mock):
+    conn = Mock()
+
+    refresh_trends(conn, set())
+
+    refresh_months_mock.assert_not_called()
+    conn.run.assert_not_called()
+
+
+@patch("services.refresh_trends.select_article_months")
+def test_rebuild_trends_refreshes_every_month(select_months_mock, refresh_months_mock):
+    conn = Mock()
+    select_months_mock.return_value = [date(2001, 1, 1)]
+
+    rebuild_trends(conn)
+
+    refresh_months_mock.assert_called_once_with(conn, [date(2001, 1, 1)])
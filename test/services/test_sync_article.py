@@ -1,10 +1,17 @@
+import xml.etree.ElementTree as ET
 from datetime import datetime
 from unittest.mock import Mock, patch
 
 import pytest
 
 from article import Article
-from services.sync_article import sync_article
+from arxiv.oai import (
+    OAI_DEFAULT_METADATA_PREFIX,
+    extract_oai_records,
+    parse_oai_record_to_article,
+)
+from services.sync_article import find_changed_articles, sync_article
+from utils.fingerprint import article_fingerprint
 
 
 @pytest.fixture
@@ -27,24 +34,25 @@ def update_mock():
 
 def test_sync_article_inserts_new_record(select_mock, insert_mock, update_mock):
     article = Article(
-        "geo/345", "Rocks rock", datetime(2000, 1, 1), datetime(2000, 1, 1)
+        "physics/0001345", "Rocks rock", datetime(2000, 1, 1), datetime(2000, 1, 1)
     )
 
     conn_mock = Mock()
     select_mock.return_value = None
 
-    sync_article(conn_mock, article)
+    inserted = sync_article(conn_mock, article)
 
+    assert inserted
     insert_mock.assert_called_once_with(conn_mock, article)
     update_mock.assert_not_called()
 
 
 def test_sync_article_updates_existing_record(select_mock, insert_mock, update_mock):
     old_record = Article(
-        "55.66", "Numbers are bad", datetime(2002, 2, 2), datetime(2002, 2, 2)
+        "0202.5566", "Numbers are bad", datetime(2002, 2, 2), datetime(2002, 2, 2)
     )
     new_record = Article(
-        "55.66",
+        "0202.5566",
         "Numbers are cool actually",
         datetime(2002, 2, 2),
         datetime(2005, 5, 15),
@@ -60,10 +68,40 @@ def test_sync_article_updates_existing_record(select_mock, insert_mock, update_m
         id_=old_record.id,
         title=new_record.title,
         updated_at=new_record.updated_at,
+        abstract=new_record.abstract,
+        content_hash=article_fingerprint(new_record),
     )
     insert_mock.assert_not_called()
 
 
+def test_sync_article_updates_api_record_from_default_oai_format(
+    select_mock, insert_mock, update_mock
+):
+    # as stored from the API, which timestamps articles to the second
+    api_record = Article(
+        "0704.0003",
+        "The evolution of the Earth-Moon system",
+        datetime(2007, 4, 1, 20, 46, 54),
+        datetime(2007, 4, 1, 20, 46, 54),
+    )
+    records = extract_oai_records(ET.parse("test/fixtures/oai_sample.xml").getroot())
+    oai_records = [
+        parse_oai_record_to_article(record)
+        for record in records
+        if record.find(f".//{{*}}{OAI_DEFAULT_METADATA_PREFIX}") is not None
+    ]
+
+    conn_mock = Mock()
+    select_mock.return_value = api_record
+
+    inserted = sync_article(conn_mock, oai_records[0])
+
+    assert not inserted
+    assert update_mock.call_args.kwargs["updated_at"] == datetime(
+        2008, 11, 8, 18, 17, 12
+    )
+
+
 def test_sync_article_errors_on_altered_created_at(
     select_mock, insert_mock, update_mock
 ):
@@ -100,3 +138,33 @@ def test_sync_article_errors_on_older_updated_at(select_mock, insert_mock, updat
 
     insert_mock.assert_not_called
     update_mock.assert_not_called
+
+
+@patch("services.sync_article.select_article_fingerprints")
+def test_find_changed_articles_skips_unchanged_articles(select_fingerprints_mock):
+    date = datetime(2010, 1, 1)
+    unchanged = Article("10.1", "Same", date, date)
+    retitled = Article("10.2", "New title", date, date)
+    newer = Article("10.3", "Same", date, datetime(2011, 1, 1))
+    new = Article("10.4", "Brand new", date, date)
+
+    conn_mock = Mock()
+    select_fingerprints_mock.return_value = {
+        "10.1": (date, article_fingerprint(unchanged)),
+        "10.2": (date, article_fingerprint(Article("10.2", "Old title", date, date))),
+        "10.3": (date, article_fingerprint(newer)),
+    }
+
+    actual = find_changed_articles(conn_mock, [unchanged, retitled, newer, new])
+
+    assert actual == [retitled, newer, new]
+    select_fingerprints_mock.assert_called_once_with(
+        conn_mock, ["10.1", "10.2", "10.3", "10.4"]
+    )
+
+
+def test_find_changed_articles_noop_on_empty_batch():
+    conn_mock = Mock()
+
+    assert find_changed_articles(conn_mock, []) == []
+    conn_mock.run.assert_not_called()
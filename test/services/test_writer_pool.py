@@ -0,0 +1,161 @@
+import threading
+from datetime import datetime
+from unittest.mock import Mock, call, patch
+
+import pytest
+from pg8000 import DatabaseError, InterfaceError
+
+from article import Article
+from services.writer_pool import WriterPool, route_article
+
+
+def make_article(id_: str) -> Article:
+    return Article(id_, f"Title {id_}", datetime(2020, 1, 1), datetime(2020, 1, 2))
+
+
+@pytest.fixture
+def write_mock():
+    with patch("services.batch_writer.write_article") as mock:
+        mock.return_value = True
+        yield mock
+
+
+def test_route_article_is_stable_and_in_range():
+    ids = [f"2001.{n:05d}" for n in range(200)]
+
+    routes = [route_article(id_, 4) for id_ in ids]
+
+    assert routes == [route_article(id_, 4) for id_ in ids]
+    assert set(routes) == {0, 1, 2, 3}
+
+
+def test_writer_pool_reports_results_in_submission_order(write_mock):
+    articles = [make_article(f"2001.{n:05d}") for n in range(50)]
+    connections = []
+
+    def connection_factory():
+        connections.append(Mock())
+        return connections[-1]
+
+    pool = WriterPool(4, connection_factory=connection_factory, batch_size=8)
+    for n, article in enumerate(articles):
+        pool.submit(article, n)
+    results = list(pool.results()) + list(pool.close())
+
+    assert [result.seq for result in results] == list(range(50))
+    assert [result.article for result in results] == articles
+    assert [result.payload for result in results] == list(range(50))
+    assert all(result.inserted for result in results)
+    assert len(connections) == 4
+    for conn in connections:
+        conn.close.assert_called_once()
+
+
+def test_writer_pool_writes_each_article_on_its_routed_worker(write_mock):
+    articles = [make_article(f"2001.{n:05d}") for n in range(30)]
+    written_on = {}
+    lock = threading.Lock()
+
+    def write(conn, article):
+        with lock:
+            written_on.setdefault(article.id, set()).add(conn)
+        return True
+
+    write_mock.side_effect = write
+    connections = [Mock() for _ in range(3)]
+    factory = Mock(side_effect=connections)
+
+    pool = WriterPool(3, connection_factory=factory)
+    # submit every article twice, as if it was updated between two pages
+    for article in articles + articles:
+        pool.submit(article)
+    list(pool.close())
+
+    assert all(len(conns) == 1 for conns in written_on.values())
+    # threads take connections in start order, so compare groupings only
+    groups = {}
+    for article in articles:
+        (conn,) = written_on[article.id]
+        groups.setdefault(conn, set()).add(route_article(article.id, 3))
+    assert all(len(routes) == 1 for routes in groups.values())
+
+
+def test_writer_pool_commits_batches_in_one_transaction(write_mock):
+    conn = Mock()
+    gate = threading.Event()
+    write_mock.side_effect = lambda conn, article: gate.wait() or True
+
+    pool = WriterPool(1, connection_factory=lambda: conn, batch_size=10)
+    # the first article blocks the worker while the rest queue up behind it
+    for n in range(5):
+        pool.submit(make_article(f"2001.{n:05d}"))
+    gate.set()
+    list(pool.close())
+
+    commits = [c for c in conn.run.call_args_list if c == call("COMMIT;")]
+    starts = [c for c in conn.run.call_args_list if c == call("START TRANSACTION;")]
+    assert len(commits) == len(starts)
+    assert len(commits) <= 2
+    assert pool.commits == len(commits)
+    assert write_mock.call_count == 5
+
+
+def test_writer_pool_isolates_failing_article_in_batch(write_mock):
+    conn = Mock()
+    gate = threading.Event()
+    bad_id = "2001.00002"
+
+    def write(conn, article):
+        gate.wait()
+        if article.id == bad_id:
+            raise DatabaseError("boom")
+        return True
+
+    write_mock.side_effect = write
+
+    pool = WriterPool(1, connection_factory=lambda: conn, batch_size=10)
+    for n in range(5):
+        pool.submit(make_article(f"2001.{n:05d}"))
+    gate.set()
+    results = list(pool.close())
+
+    assert [result.seq for result in results] == list(range(5))
+    rejected = [result for result in results if result.inserted is None]
+    assert [result.article.id for result in rejected] == [bad_id]
+    assert "boom" in rejected[0].error
+    conn.run.assert_any_call("ROLLBACK TO SAVEPOINT article;")
+    # the rest of the batch is still committed together
+    assert conn.run.call_args_list.count(call("COMMIT;")) <= 2
+
+
+def test_writer_pool_raises_error_of_worker_without_connection(write_mock):
+    def connection_factory():
+        raise InterfaceError("could not connect")
+
+    pool = WriterPool(2, connection_factory=connection_factory, batch_size=4)
+    while pool.error is None:
+        pass
+
+    with pytest.raises(InterfaceError):
+        pool.submit(make_article("2001.00001"))
+    with pytest.raises(InterfaceError):
+        list(pool.close())
+
+
+def test_writer_pool_close_raises_instead_of_hanging_on_failed_worker(write_mock):
+    conn = Mock()
+    write_mock.side_effect = InterfaceError("network error")
+
+    pool = WriterPool(1, connection_factory=lambda: conn, batch_size=4)
+    # more than the queue holds, so submitting relies on the failed worker emptying it
+    for n in range(20):
+        try:
+            pool.submit(make_article(f"2001.{n:05d}"))
+        except InterfaceError:
+            break
+
+    with pytest.raises(InterfaceError):
+        list(pool.results(block=True))
+    with pytest.raises(InterfaceError):
+        list(pool.close())
+    conn.close.assert_called_once()
@@ -1,8 +1,16 @@
-from datetime import datetime
+from datetime import date, datetime
 from unittest.mock import MagicMock, call, patch
 
+import pytest
+
 from article import Article
-from etl import DEFAULT_BACKFILL_START_DATE, etl_backfill, etl_backfill_auto
+from etl import (
+    DEFAULT_BACKFILL_START_DATE,
+    etl_backfill,
+    etl_backfill_auto,
+    ingest_scope,
+)
+from services.writer_pool import WriteResult
 
 DUMMY_DATE = datetime(2042, 4, 2)
 DUMMY_ARTICLE_1 = Article("id/001", "Title 1", DUMMY_DATE, DUMMY_DATE)
@@ -35,33 +43,352 @@ def test_etl_backfill(conn_init_mock, sync_mock, fetch_gen_mock):
     )
 
 
+@patch("etl.sync_article_authors")
+@patch("etl.refresh_trends")
+@patch("etl.find_changed_articles")
+@patch("etl.WriterPool")
+@patch("etl.Pg8000Connection")
+def test_etl_backfill_attributes_pool_writes_to_their_page(
+    conn_init_mock, pool_init_mock, find_changed_mock, refresh_mock, authors_mock
+):
+    pages = [[DUMMY_ARTICLE_1, DUMMY_ARTICLE_2], [DUMMY_ARTICLE_3]]
+    conn_mock = MagicMock()
+    conn_init_mock.return_value = conn_mock
+    find_changed_mock.side_effect = lambda conn, articles: articles
+    pool = pool_init_mock.return_value
+    pool.commits = 2
+
+    def reported(seqs: list[int], inserted: bool):
+        return [
+            WriteResult(seq, c.args[0], c.args[1], inserted, None)
+            for seq, c in enumerate(pool.submit.call_args_list)
+            if seq in seqs
+        ]
+
+    # the writes of the first page are only reported while the second is loaded
+    pool.results.side_effect = lambda: iter(
+        reported([0, 1], True) if pool.submit.call_count == 3 else []
+    )
+    pool.close.side_effect = lambda: iter(reported([2], False))
+
+    with patch.dict(
+        "etl.ARTICLE_SOURCES",
+        {"test": (lambda start, end, stats, rate_limiter: iter(pages), lambda a: a)},
+    ):
+        stats = etl_backfill(DUMMY_DATE, DUMMY_DATE, source="test", writers=2)
+
+    assert (stats.inserted, stats.updated, stats.commits) == (2, 1, 2)
+    page_inserts = [
+        c.kwargs
+        for c in conn_mock.run.call_args_list
+        if c.args[0].startswith("INSERT INTO IngestPage")
+    ]
+    assert page_inserts[0]["page"] == [1, 2]
+    assert page_inserts[0]["inserted"] == [2, 0]
+    assert page_inserts[0]["updated"] == [0, 1]
+
+
+@patch("etl.Pg8000Connection")
+@patch("etl.seed_ingest_checkpoint")
+@patch("etl.upsert_ingest_checkpoint")
+@patch("etl.select_ingest_checkpoint")
 @patch("etl.etl_backfill")
 @patch("etl.datetime")
-@patch("etl.select_most_recent_updated_at")
-def test_etl_backfill_auto(select_date_mock, datetime_mock, etl_mock):
+def test_etl_backfill_auto(
+    datetime_mock,
+    etl_mock,
+    select_checkpoint_mock,
+    upsert_mock,
+    seed_mock,
+    conn_init_mock,
+):
     expected_start = datetime(2025, 12, 1)
     expected_end = datetime(2026, 1, 1)
 
-    select_date_mock.return_value = expected_start
+    select_checkpoint_mock.return_value = expected_start
     datetime_mock.now.return_value = expected_end
 
     etl_backfill_auto()
 
-    etl_mock.assert_called_once_with(expected_start, expected_end)
+    # a database without checkpoints starts from its most recent article
+    seed_mock.assert_called_once_with(conn_init_mock.return_value, "all")
+    select_checkpoint_mock.assert_called_once_with(conn_init_mock.return_value, "all")
+    etl_mock.assert_called_once_with(
+        expected_start,
+        expected_end,
+        source="api",
+        categories=None,
+        rate_limiter=None,
+        profile=False,
+        profile_memory_every=0,
+    )
 
 
+@patch("etl.Pg8000Connection")
+@patch("etl.seed_ingest_checkpoint")
+@patch("etl.upsert_ingest_checkpoint")
+@patch("etl.select_ingest_checkpoint")
 @patch("etl.etl_backfill")
 @patch("etl.datetime")
-@patch("etl.select_most_recent_updated_at")
 def test_etl_backfill_auto_uses_default_with_empty_db(
-    select_date_mock, datetime_mock, etl_mock
+    datetime_mock,
+    etl_mock,
+    select_checkpoint_mock,
+    upsert_mock,
+    seed_mock,
+    conn_init_mock,
 ):
     expected_start = DEFAULT_BACKFILL_START_DATE
     expected_end = datetime(2026, 1, 1)
 
-    select_date_mock.return_value = None
+    select_checkpoint_mock.return_value = None
     datetime_mock.now.return_value = expected_end
 
     etl_backfill_auto()
 
-    etl_mock.assert_called_once_with(expected_start, expected_end)
+    etl_mock.assert_called_once_with(
+        expected_start,
+        expected_end,
+        source="api",
+        categories=None,
+        rate_limiter=None,
+        profile=False,
+        profile_memory_every=0,
+    )
+
+
+@patch("etl.Pg8000Connection")
+@patch("etl.seed_ingest_checkpoint")
+@patch("etl.upsert_ingest_checkpoint")
+@patch("etl.select_ingest_checkpoint")
+@patch("etl.etl_backfill")
+@patch("etl.datetime")
+def test_etl_backfill_auto_starts_new_scope_from_full_corpus_checkpoint(
+    datetime_mock,
+    etl_mock,
+    select_checkpoint_mock,
+    upsert_mock,
+    seed_mock,
+    conn_init_mock,
+):
+    corpus_checkpoint = datetime(2025, 6, 1)
+    select_checkpoint_mock.side_effect = lambda conn, scope: (
+        corpus_checkpoint if scope == "all" else None
+    )
+    datetime_mock.now.return_value = datetime(2026, 1, 1)
+
+    etl_backfill_auto(categories=["stat.ML"])
+
+    assert select_checkpoint_mock.call_args_list == [
+        call(conn_init_mock.return_value, "stat.ML"),
+        call(conn_init_mock.return_value, "all"),
+    ]
+    assert etl_mock.call_args.args[0] == corpus_checkpoint
+
+
+@patch("etl.sync_article_authors")
+@patch("etl.refresh_trends")
+@patch("etl.find_changed_articles")
+@patch("etl.sync_article")
+@patch("etl.Pg8000Connection")
+def test_etl_backfill_only_syncs_changed_articles(
+    conn_init_mock, sync_mock, find_changed_mock, refresh_mock, authors_mock
+):
+    pages = [[DUMMY_ARTICLE_1, DUMMY_ARTICLE_2], [DUMMY_ARTICLE_3]]
+    conn_mock = MagicMock()
+    conn_init_mock.return_value = conn_mock
+    find_changed_mock.side_effect = [[DUMMY_ARTICLE_2], [DUMMY_ARTICLE_3]]
+    # article 2 already existed, article 3 is new
+    sync_mock.side_effect = [False, True]
+
+    with patch.dict(
+        "etl.ARTICLE_SOURCES",
+        {"test": (lambda start, end, stats, rate_limiter: iter(pages), lambda a: a)},
+    ):
+        stats = etl_backfill(DUMMY_DATE, DUMMY_DATE, source="test")
+
+    assert sync_mock.call_args_list == [
+        call(conn_mock, DUMMY_ARTICLE_2),
+        call(conn_mock, DUMMY_ARTICLE_3),
+    ]
+    assert (stats.pages, stats.fetched) == (2, 3)
+    assert (stats.inserted, stats.updated, stats.skipped) == (1, 1, 1)
+    refresh_mock.assert_called_once_with(conn_mock, {date(2042, 4, 1)})
+    # every page is recorded in the ledger, with its own counts
+    page_inserts = [
+        c.kwargs
+        for c in conn_mock.run.call_args_list
+        if c.args[0].startswith("INSERT INTO IngestPage")
+    ]
+    assert len(page_inserts) == 1
+    assert page_inserts[0]["page"] == [1, 2]
+    assert page_inserts[0]["entries"] == [2, 1]
+    assert (page_inserts[0]["updated"], page_inserts[0]["inserted"]) == ([1, 0], [0, 1])
+    assert page_inserts[0]["skipped"] == [1, 0]
+    # authors are written once per page, for the articles synced in it
+    assert [c.args[1] for c in authors_mock.call_args_list] == [
+        [DUMMY_ARTICLE_2],
+        [DUMMY_ARTICLE_3],
+    ]
+
+
+@patch("etl.sync_article_authors")
+@patch("etl.refresh_trends")
+@patch("etl.find_changed_articles")
+@patch("etl.BatchWriter")
+@patch("etl.sync_article")
+@patch("etl.Pg8000Connection")
+def test_etl_backfill_batches_commits(
+    conn_init_mock,
+    sync_mock,
+    batch_writer_init_mock,
+    find_changed_mock,
+    refresh_mock,
+    authors_mock,
+):
+    pages = [[DUMMY_ARTICLE_1, DUMMY_ARTICLE_2], [DUMMY_ARTICLE_3]]
+    conn_mock = MagicMock()
+    conn_init_mock.return_value = conn_mock
+    find_changed_mock.side_effect = lambda conn, articles: articles
+    batch_writer = batch_writer_init_mock.return_value
+    batch_writer.write.side_effect = [True, False, True]
+    batch_writer.commits = 1
+
+    with patch.dict(
+        "etl.ARTICLE_SOURCES",
+        {"test": (lambda start, end, stats, rate_limiter: iter(pages), lambda a: a)},
+    ):
+        stats = etl_backfill(DUMMY_DATE, DUMMY_DATE, source="test", commit_every=50)
+
+    sync_mock.assert_not_called()
+    batch_writer_init_mock.assert_called_once_with(conn_mock, 50, 5.0)
+    assert batch_writer.write.call_count == 3
+    # at the end of each page (before its authors are written), and of the run
+    assert batch_writer.commit.call_count == 3
+    assert (stats.inserted, stats.updated, stats.commits) == (2, 1, 1)
+
+
+@patch("etl.sync_article_authors")
+@patch("etl.refresh_trends")
+@patch("etl.find_changed_articles")
+@patch("etl.sync_article")
+@patch("etl.Pg8000Connection")
+@patch("etl.seed_ingest_checkpoint")
+@patch("etl.upsert_ingest_checkpoint")
+@patch("etl.select_ingest_checkpoint")
+def test_etl_backfill_auto_moves_checkpoint_when_every_article_is_skipped(
+    select_checkpoint_mock,
+    upsert_mock,
+    seed_mock,
+    conn_init_mock,
+    sync_mock,
+    find_changed_mock,
+    refresh_mock,
+    authors_mock,
+):
+    newest = Article("id/004", "Title 4", DUMMY_DATE, datetime(2042, 4, 5))
+    pages = [[DUMMY_ARTICLE_1, newest], [DUMMY_ARTICLE_2]]
+    select_checkpoint_mock.return_value = datetime(2042, 4, 1)
+    # everything was already written by another scope
+    find_changed_mock.return_value = []
+
+    with patch.dict(
+        "etl.ARTICLE_SOURCES",
+        {
+            "api": (
+                lambda start, end, stats, rate_limiter, categories: iter(pages),
+                lambda a: a,
+            )
+        },
+    ):
+        stats = etl_backfill_auto(categories=["cs.*"])
+
+    sync_mock.assert_not_called()
+    assert stats.skipped == 3
+    upsert_mock.assert_called_once_with(
+        conn_init_mock.return_value, "cs.*", datetime(2042, 4, 5)
+    )
+
+
+@patch("etl.Pg8000Connection")
+@patch("etl.seed_ingest_checkpoint")
+@patch("etl.upsert_ingest_checkpoint")
+@patch("etl.select_ingest_checkpoint")
+@patch("etl.etl_backfill")
+@patch("etl.datetime")
+def test_etl_backfill_auto_resumes_scope_from_its_checkpoint(
+    datetime_mock,
+    etl_mock,
+    select_checkpoint_mock,
+    upsert_mock,
+    seed_mock,
+    conn_init_mock,
+):
+    checkpoint = datetime(2025, 12, 20)
+    expected_end = datetime(2026, 1, 1)
+    select_checkpoint_mock.return_value = checkpoint
+    datetime_mock.now.return_value = expected_end
+    etl_mock.return_value.watermark = datetime(2025, 12, 31)
+
+    etl_backfill_auto(categories=["stat.ML", "cs.*"])
+
+    select_checkpoint_mock.assert_called_once_with(
+        conn_init_mock.return_value, "cs.*,stat.ML"
+    )
+    etl_mock.assert_called_once_with(
+        checkpoint,
+        expected_end,
+        source="api",
+        categories=["stat.ML", "cs.*"],
+        rate_limiter=None,
+        profile=False,
+        profile_memory_every=0,
+    )
+    upsert_mock.assert_called_once_with(
+        conn_init_mock.return_value, "cs.*,stat.ML", datetime(2025, 12, 31)
+    )
+
+
+def test_ingest_scope_is_independent_of_category_order():
+    assert ingest_scope(None) == "all"
+    assert ingest_scope(["stat.ML", "cs.*"]) == ingest_scope(["cs.*", "stat.ML"])
+
+
+def test_etl_backfill_rejects_category_filter_for_oai():
+    with pytest.raises(ValueError):
+        etl_backfill(DUMMY_DATE, DUMMY_DATE, source="oai", categories=["cs.*"])
+
+
+@patch("etl.sync_article_authors")
+@patch("etl.refresh_trends")
+@patch("etl.find_changed_articles")
+@patch("etl.BatchWriter")
+@patch("etl.bulk_load_mode")
+@patch("etl.Pg8000Connection")
+def test_etl_backfill_bulk_mode_defers_indexes_and_batches_commits(
+    conn_init_mock,
+    bulk_mode_mock,
+    batch_writer_init_mock,
+    find_changed_mock,
+    refresh_mock,
+    authors_mock,
+):
+    conn_mock = MagicMock()
+    conn_init_mock.return_value = conn_mock
+    find_changed_mock.side_effect = lambda conn, articles: articles
+    batch_writer_init_mock.return_value.commits = 0
+    events = []
+    bulk_mode_mock.return_value.__enter__.side_effect = lambda: events.append("enter")
+    bulk_mode_mock.return_value.__exit__.side_effect = lambda *a: events.append("exit")
+    refresh_mock.side_effect = lambda *a: events.append("refresh")
+
+    with patch.dict(
+        "etl.ARTICLE_SOURCES",
+        {"test": (lambda start, end, stats, rate_limiter: iter([]), lambda a: a)},
+    ):
+        etl_backfill(DUMMY_DATE, DUMMY_DATE, source="test", bulk_mode=True)
+
+    bulk_mode_mock.assert_called_once_with(conn_mock)
+    batch_writer_init_mock.assert_called_once_with(conn_mock, 100, 5.0)
+    # trends are refreshed once indexes are back
+    assert events == ["enter", "exit", "refresh"]
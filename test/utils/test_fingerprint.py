@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from article import Article
+from utils.fingerprint import article_fingerprint
+
+DUMMY_DATE = datetime(2020, 1, 1)
+
+
+def test_article_fingerprint_ignores_category_order_and_updated_at():
+    article_1 = Article("1", "T", DUMMY_DATE, DUMMY_DATE, ["cs.LG", "stat.ML"], "A")
+    article_2 = Article(
+        "1", "T", DUMMY_DATE, datetime(2021, 1, 1), ["stat.ML", "cs.LG"], "A"
+    )
+
+    assert article_fingerprint(article_1) == article_fingerprint(article_2)
+
+
+def test_article_fingerprint_changes_with_content():
+    base = Article("1", "T", DUMMY_DATE, DUMMY_DATE, ["cs.LG"], "A")
+    variants = [
+        Article("1", "T2", DUMMY_DATE, DUMMY_DATE, ["cs.LG"], "A"),
+        Article("1", "T", DUMMY_DATE, DUMMY_DATE, ["cs.LG"], "A2"),
+        Article("1", "T", DUMMY_DATE, DUMMY_DATE, ["cs.AI"], "A"),
+        Article("1", "T", datetime(2019, 1, 1), DUMMY_DATE, ["cs.LG"], "A"),
+        Article("1", "T", DUMMY_DATE, DUMMY_DATE, ["cs.LG"], "A", ["Ada Lovelace"]),
+    ]
+
+    fingerprints = {article_fingerprint(a) for a in variants}
+
+    assert article_fingerprint(base) not in fingerprints
+    assert len(fingerprints) == len(variants)
+
+
+def test_article_fingerprint_depends_on_author_order():
+    authors = ["Ada Lovelace", "Alan Turing"]
+    article_1 = Article("1", "T", DUMMY_DATE, DUMMY_DATE, ["cs.LG"], "A", authors)
+    article_2 = Article(
+        "1", "T", DUMMY_DATE, DUMMY_DATE, ["cs.LG"], "A", list(reversed(authors))
+    )
+
+    assert article_fingerprint(article_1) != article_fingerprint(article_2)
@@ -0,0 +1,35 @@
+from utils.keywords import KEYWORD_TO_ID_DICT, count_keyword_occurrences
+
+
+def test_count_keyword_occurrences_counts_single_and_multi_token_phrases():
+    text = (
+        "Deep learning, deep-learning and Neural Nets: training neural networks "
+        "with gradient descent."
+    )
+
+    expected = {
+        KEYWORD_TO_ID_DICT["deep learning"]: 2,
+        KEYWORD_TO_ID_DICT["neural network"]: 2,
+        KEYWORD_TO_ID_DICT["training"]: 1,
+        KEYWORD_TO_ID_DICT["gradient descent"]: 1,
+    }
+
+    actual = count_keyword_occurrences(text)
+
+    assert actual == expected
+
+
+def test_count_keyword_occurrences_counts_overlapping_variants_separately():
+    # 'neural network' and 'convolutional neural network' are different keywords
+    text = "a convolutional neural network"
+
+    actual = count_keyword_occurrences(text)
+
+    assert actual == {
+        KEYWORD_TO_ID_DICT["cnn"]: 1,
+        KEYWORD_TO_ID_DICT["neural network"]: 1,
+    }
+
+
+def test_count_keyword_occurrences_empty_text():
+    assert count_keyword_occurrences("") == {}
@@ -0,0 +1,78 @@
+import json
+import logging
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from utils import logger
+from utils.logger import (
+    LOG,
+    JsonFormatter,
+    configure_logging,
+    flush_logging,
+    log_context,
+    set_log_stage,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    handlers = list(LOG.handlers)
+    yield
+    if logger._listener is not None:
+        logger._listener.stop()
+        logger._listener = None
+    LOG.handlers = handlers
+
+
+def read_records(path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_configure_logging_writes_json_records_with_context(tmp_path):
+    log_file = tmp_path / "nested" / "backfill.log"
+
+    with patch("utils.logger.LOG_FILE", str(log_file)):
+        configure_logging("file")
+    LOG.info("before run")
+    with log_context(run_id="run-1", stage="fetch"):
+        set_log_stage("load")
+        LOG.warning("during run")
+    flush_logging()
+
+    records = read_records(log_file)
+    assert [(r["message"], r["run_id"], r["stage"]) for r in records] == [
+        ("before run", None, None),
+        ("during run", "run-1", "load"),
+    ]
+    assert records[1]["level"] == "WARNING"
+
+
+def test_configure_logging_falls_back_to_stderr_when_file_unavailable(capsys):
+    with patch("utils.logger.os.makedirs", side_effect=OSError("read-only")):
+        configure_logging("file")
+    LOG.info("no log directory")
+    flush_logging()
+
+    assert json.loads(capsys.readouterr().err)["message"] == "no log directory"
+
+
+def test_configure_logging_rejects_unknown_sink():
+    with pytest.raises(ValueError):
+        configure_logging("kafka")
+
+
+def test_json_formatter_includes_exceptions():
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = logging.LogRecord(
+            "arxin", logging.ERROR, __file__, 1, "failed", None, sys.exc_info()
+        )
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "failed"
+    assert "RuntimeError: boom" in entry["exception"]
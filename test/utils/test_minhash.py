@@ -0,0 +1,63 @@
+import numpy as np
+
+from utils.minhash import (
+    MINHASH_BANDS,
+    MINHASH_PERMUTATIONS,
+    LshIndex,
+    band_buckets,
+    minhash_signature,
+    shingle_hashes,
+    signature_similarity,
+)
+
+ABSTRACT = (
+    "We propose a graph neural network for molecular property prediction which "
+    "aggregates messages along chemical bonds. On standard benchmarks the model "
+    "improves over message passing baselines while using fewer parameters, and an "
+    "ablation shows the contribution of each component of the architecture."
+)
+RESUBMITTED = ABSTRACT.replace("fewer parameters", "far fewer parameters")
+UNRELATED = (
+    "We measure the rotation curves of nearby dwarf galaxies and find that their "
+    "dark matter halos have cored rather than cusped density profiles."
+)
+
+
+def test_shingle_hashes_ignore_case_and_punctuation():
+    assert np.array_equal(
+        shingle_hashes("Graph neural networks!"),
+        shingle_hashes("graph, neural networks"),
+    )
+    assert len(shingle_hashes("one two")) == 1
+    assert len(shingle_hashes("...")) == 0
+
+
+def test_minhash_signature_is_deterministic():
+    signature = minhash_signature(ABSTRACT)
+
+    assert signature.dtype == np.uint32
+    assert len(signature) == MINHASH_PERMUTATIONS
+    assert np.array_equal(signature, minhash_signature(ABSTRACT))
+    assert minhash_signature("") is None
+
+
+def test_signature_similarity_separates_near_duplicates():
+    signature = minhash_signature(ABSTRACT)
+
+    assert signature_similarity(signature, minhash_signature(RESUBMITTED)) > 0.8
+    assert signature_similarity(signature, minhash_signature(UNRELATED)) < 0.1
+
+
+def test_lsh_index_finds_near_duplicates_only():
+    index = LshIndex()
+    for key, text in [("a", ABSTRACT), ("b", UNRELATED)]:
+        index.add(key, minhash_signature(text))
+    signature = minhash_signature(RESUBMITTED)
+    buckets = band_buckets(signature)
+
+    assert len(buckets) == MINHASH_BANDS
+    assert index.candidates(buckets) == {"a"}
+    key, similarity = index.best_match(signature, buckets, threshold=0.8)
+    assert key == "a"
+    assert similarity > 0.8
+    assert index.best_match(signature, buckets, threshold=1.0) is None
@@ -0,0 +1,38 @@
+import os
+from unittest.mock import patch
+
+from utils.profiling import RunProfiler
+
+
+def busy_work() -> list[bytes]:
+    return [bytes(1000) for _ in range(1000)]
+
+
+def test_run_profiler_writes_pstats_and_memory_reports(tmp_path):
+    with patch("utils.profiling.LOG") as log_mock:
+        with RunProfiler("run-1", memory_every=2, output_dir=str(tmp_path)) as profiler:
+            for page in range(1, 5):
+                kept = busy_work()
+                profiler.page_done(page)
+
+    assert kept
+    assert sorted(os.listdir(tmp_path)) == [
+        "run-1-page2.txt",
+        "run-1-page4.txt",
+        "run-1.pstats",
+        "run-1.txt",
+    ]
+    assert "busy_work" in (tmp_path / "run-1.txt").read_text()
+    assert "traced memory" in (tmp_path / "run-1-page4.txt").read_text()
+    assert "run-1.pstats" in log_mock.info.call_args.args[0]
+
+
+def test_disabled_run_profiler_writes_nothing(tmp_path):
+    output_dir = tmp_path / "profiles"
+
+    with RunProfiler(
+        "run-1", enabled=False, memory_every=1, output_dir=str(output_dir)
+    ) as profiler:
+        profiler.page_done(1)
+
+    assert not output_dir.exists()